@@ -1,98 +1,142 @@
-"""
-Aplicación Flask principal - Python Learning Platform
-"""
-from flask import Flask, render_template, session, redirect, url_for
-from flask_cors import CORS
-from config import Config
-from backend.routes import api
-import os
-
-
-def create_app():
-    """Factory para crear la aplicación Flask"""
-    
-    # Crear instancia de Flask
-    app = Flask(__name__)
-    
-    # Configuración
-    app.config.from_object(Config)
-    
-    # Habilitar CORS
-    CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
-    
-    # Registrar blueprints (rutas de la API)
-    app.register_blueprint(api)
-    
-    # ============================================
-    # RUTAS DEL FRONTEND (PÁGINAS HTML)
-    # ============================================
-    
-    @app.route('/')
-    def index():
-        """Página principal"""
-        if 'user_id' in session:
-            return redirect(url_for('course'))
-        return render_template('index.html')
-    
-    @app.route('/login')
-    def login_page():
-        """Página de login"""
-        if 'user_id' in session:
-            return redirect(url_for('course'))
-        return render_template('login.html')
-    
-    @app.route('/register')
-    def register_page():
-        """Página de registro"""
-        if 'user_id' in session:
-            return redirect(url_for('course'))
-        return render_template('register.html')
-    
-    @app.route('/course')
-    def course():
-        """Página del curso (requiere autenticación)"""
-        if 'user_id' not in session:
-            return redirect(url_for('login_page'))
-        return render_template('course.html', username=session.get('username'))
-    
-    @app.route('/lesson/<lesson_id>')
-    def lesson_detail(lesson_id):
-        """Página de detalle de lección"""
-        if 'user_id' not in session:
-            return redirect(url_for('login_page'))
-        return render_template('lesson.html', lesson_id=lesson_id)
-    
-    # ============================================
-    # MANEJADORES DE ERRORES
-    # ============================================
-    
-    @app.errorhandler(404)
-    def not_found(error):
-        """Página de error 404"""
-        return render_template('404.html'), 404
-    
-    @app.errorhandler(500)
-    def internal_error(error):
-        """Página de error 500"""
-        return render_template('500.html'), 500
-    
-    return app
-
-
-if __name__ == '__main__':
-    # Crear aplicación
-    app = create_app()
-    
-    # Ejecutar servidor
-    print("\n" + "="*60)
-    print("🚀 Python Learning Platform - Servidor iniciado")
-    print("="*60)
-    print(f"📍 URL: http://127.0.0.1:5000")
-    print(f"🔧 Modo: {'Desarrollo' if Config.DEBUG else 'Producción'}")
-    print("="*60 + "\n")
-    
-    app.run(
-        host='0.0.0.0',
-        port=5000,
-        debug=Config.DEBUG
+"""
+Aplicación Flask principal - Python Learning Platform
+"""
+from flask import Flask, render_template, session, redirect, url_for
+from flask_cors import CORS
+from config import Config
+from backend.routes import api
+from backend.firebase_service import firebase_service
+from backend.compression import init_compression
+from backend.metrics import init_metrics
+from backend.tracing import init_tracing
+from backend.profiling import init_profiling
+from backend.catalog_snapshot import init_catalog_snapshots
+import os
+import time
+
+
+def warm_up():
+    """
+    Abrir las conexiones del almacenamiento en este proceso
+    
+    Con un servidor que hace fork (gunicorn --preload) se llama desde el hook
+    post_fork de cada worker (ver gunicorn.conf.py), nunca antes del fork.
+    
+    Returns:
+        float or None: Segundos empleados o None si STORAGE_WARM_UP está desactivado
+    """
+    if not Config.STORAGE_WARM_UP:
+        return None
+    
+    start = time.perf_counter()
+    firebase_service.warm_up()
+    return time.perf_counter() - start
+
+
+def create_app():
+    """Factory para crear la aplicación Flask"""
+    
+    # Crear instancia de Flask
+    app = Flask(__name__)
+    
+    # Configuración
+    app.config.from_object(Config)
+    
+    # Habilitar CORS
+    CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
+    
+    # Registrar blueprints (rutas de la API)
+    app.register_blueprint(api)
+    
+    # Perfilado opcional con cProfile (primero, para que incluya los demás hooks)
+    init_profiling(app)
+    
+    # Métricas de latencia y del almacenamiento en /metrics (se registran antes
+    # que la compresión para que su tiempo cuente en la latencia)
+    init_metrics(app, firebase_service)
+    
+    # Trazas de las operaciones de Firestore de cada petición
+    init_tracing(app)
+    
+    # Comprimir respuestas JSON y HTML (gzip / brotli)
+    init_compression(app)
+    
+    # Caché inmutable para el catálogo precompilado (static/catalog/)
+    init_catalog_snapshots(app)
+    
+    # ============================================
+    # RUTAS DEL FRONTEND (PÁGINAS HTML)
+    # ============================================
+    
+    @app.route('/')
+    def index():
+        """Página principal"""
+        if 'user_id' in session:
+            return redirect(url_for('course'))
+        return render_template('index.html')
+    
+    @app.route('/login')
+    def login_page():
+        """Página de login"""
+        if 'user_id' in session:
+            return redirect(url_for('course'))
+        return render_template('login.html')
+    
+    @app.route('/register')
+    def register_page():
+        """Página de registro"""
+        if 'user_id' in session:
+            return redirect(url_for('course'))
+        return render_template('register.html')
+    
+    @app.route('/course')
+    def course():
+        """Página del curso (requiere autenticación)"""
+        if 'user_id' not in session:
+            return redirect(url_for('login_page'))
+        return render_template('course.html', username=session.get('username'))
+    
+    @app.route('/lesson/<lesson_id>')
+    def lesson_detail(lesson_id):
+        """Página de detalle de lección"""
+        if 'user_id' not in session:
+            return redirect(url_for('login_page'))
+        return render_template('lesson.html', lesson_id=lesson_id)
+    
+    # ============================================
+    # MANEJADORES DE ERRORES
+    # ============================================
+    
+    @app.errorhandler(404)
+    def not_found(error):
+        """Página de error 404"""
+        return render_template('404.html'), 404
+    
+    @app.errorhandler(500)
+    def internal_error(error):
+        """Página de error 500"""
+        return render_template('500.html'), 500
+    
+    return app
+
+
+if __name__ == '__main__':
+    # Crear aplicación y abrir las conexiones antes de la primera petición
+    app = create_app()
+    elapsed = warm_up()
+    
+    # Ejecutar servidor
+    print("\n" + "="*60)
+    print("🚀 Python Learning Platform - Servidor iniciado")
+    print("="*60)
+    print(f"📍 URL: http://127.0.0.1:5000")
+    print(f"🔧 Modo: {'Desarrollo' if Config.DEBUG else 'Producción'}")
+    if elapsed is not None:
+        print(f"🔥 Almacenamiento preparado en {elapsed * 1000:.0f} ms")
+    print("="*60 + "\n")
+    
+    app.run(
+        host='0.0.0.0',
+        port=5000,
+        debug=Config.DEBUG
     )
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Aplicación ASGI (Quart) - Python Learning Platform en modo asíncrono
+
+Alternativa a app.py para servir muchas peticiones concurrentes con pocos
+procesos: las vistas esperan a Firestore con await (firestore.AsyncClient,
+ver backend/async_storage.py) en lugar de bloquear un hilo del servidor cada
+una. Usa el mismo backend (STORAGE_BACKEND), las mismas respuestas
+(backend/api_common.py), la misma política de CORS y los mismos hooks de
+métricas, trazas, compresión y caché del catálogo que app.py.
+
+Uso (requiere pip install quart quart-cors hypercorn):
+    hypercorn asgi:app --bind 0.0.0.0:5000
+"""
+from quart import Quart, render_template, session, redirect, url_for
+from quart_cors import cors
+from config import Config
+from backend.async_routes import async_api
+from backend.async_storage import async_storage
+from backend.compression import init_compression_async
+from backend.metrics import init_metrics_async
+from backend.tracing import init_tracing_async
+from backend.catalog_snapshot import init_catalog_snapshots_async
+
+
+def create_asgi_app():
+    """Factory para crear la aplicación Quart"""
+    
+    # Crear instancia de Quart
+    app = Quart(__name__)
+    
+    # Configuración
+    app.config.from_object(Config)
+    
+    # Habilitar CORS (mismos orígenes y cookies que app.py)
+    app = cors(app, allow_origin=Config.CORS_ORIGINS, allow_credentials=True)
+    
+    # Registrar blueprints (rutas de la API)
+    app.register_blueprint(async_api)
+    
+    # Mismo orden que en app.py: métricas, trazas, compresión y catálogo
+    init_metrics_async(app, async_storage)
+    init_tracing_async(app)
+    init_compression_async(app)
+    init_catalog_snapshots_async(app)
+    
+    @app.before_serving
+    async def warm_up():
+        """Abrir las conexiones del almacenamiento en el proceso que sirve (ver app.warm_up)"""
+        if Config.STORAGE_WARM_UP:
+            await async_storage.warm_up()
+    
+    # ============================================
+    # RUTAS DEL FRONTEND (PÁGINAS HTML)
+    # ============================================
+    
+    @app.route('/')
+    async def index():
+        """Página principal"""
+        if 'user_id' in session:
+            return redirect(url_for('course'))
+        return await render_template('index.html')
+    
+    @app.route('/login')
+    async def login_page():
+        """Página de login"""
+        if 'user_id' in session:
+            return redirect(url_for('course'))
+        return await render_template('login.html')
+    
+    @app.route('/register')
+    async def register_page():
+        """Página de registro"""
+        if 'user_id' in session:
+            return redirect(url_for('course'))
+        return await render_template('register.html')
+    
+    @app.route('/course')
+    async def course():
+        """Página del curso (requiere autenticación)"""
+        if 'user_id' not in session:
+            return redirect(url_for('login_page'))
+        return await render_template('course.html', username=session.get('username'))
+    
+    @app.route('/lesson/<lesson_id>')
+    async def lesson_detail(lesson_id):
+        """Página de detalle de lección"""
+        if 'user_id' not in session:
+            return redirect(url_for('login_page'))
+        return await render_template('lesson.html', lesson_id=lesson_id)
+    
+    # ============================================
+    # MANEJADORES DE ERRORES
+    # ============================================
+    
+    @app.errorhandler(404)
+    async def not_found(error):
+        """Página de error 404"""
+        return await render_template('404.html'), 404
+    
+    @app.errorhandler(500)
+    async def internal_error(error):
+        """Página de error 500"""
+        return await render_template('500.html'), 500
+    
+    return app
+
+
+app = create_asgi_app()
@@ -0,0 +1,39 @@
+"""
+Acceso a los endpoints de operación (/metrics y el perfilado)
+
+Solo se permite a los usuarios de ADMIN_USERNAMES con sesión iniciada o a
+quien presente el token compartido configurado (para Prometheus o scripts).
+Nunca se decide por la dirección del cliente: detrás de nginx todas las
+peticiones llegan desde 127.0.0.1.
+"""
+from config import Config
+import hmac
+
+
+def is_admin(username):
+    """El usuario de la sesión es administrador (ADMIN_USERNAMES)"""
+    return username is not None and username in Config.ADMIN_USERNAMES
+
+
+def token_matches(provided, expected):
+    """
+    Comparar un token recibido con el configurado (en tiempo constante)
+    
+    Args:
+        provided (str or None): Token de la petición
+        expected (str): Token configurado ('' desactiva el acceso por token)
+    
+    Returns:
+        bool: True si coinciden
+    """
+    if not expected or not provided:
+        return False
+    return hmac.compare_digest(provided.encode('utf-8'), expected.encode('utf-8'))
+
+
+def bearer_token(authorization):
+    """Token de una cabecera 'Authorization: Bearer <token>' (None si no hay)"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' else None
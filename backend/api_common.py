@@ -0,0 +1,368 @@
+"""
+Lógica de los endpoints de la API común a los dos modos del servidor
+
+routes.py (Flask) y async_routes.py (Quart) solo leen la petición, llaman
+al almacenamiento (directamente o con await) y responden: la validación de
+los datos, los parámetros de paginación, los ETag, la copia del progreso en
+la sesión y el contenido de cada respuesta están aquí, sin depender de
+ninguno de los dos frameworks.
+"""
+from config import Config
+from backend.catalog import lesson_content_hash
+from backend.progress import new_progress, serialize_progress, snapshot_with_completion
+from backend import compression
+from backend.validators import validate_email, validate_password, validate_username
+import hashlib
+import time
+
+
+def error(message, status):
+    """
+    Respuesta de error de la API
+    
+    Returns:
+        tuple: (payload, status)
+    """
+    return {'success': False, 'message': message}, status
+
+
+# ============================================
+# AUTENTICACIÓN
+# ============================================
+
+def parse_registration(data):
+    """
+    Normalizar y validar los datos del registro
+    
+    Args:
+        data (dict or None): Body JSON de la petición
+    
+    Returns:
+        tuple: ((username, email, password), None) o (None, (payload, status)) si no son válidos
+    """
+    if not data:
+        return None, error('No se recibieron datos', 400)
+    
+    username = data.get('username', '').strip().lower()
+    email = data.get('email', '').strip().lower()
+    password = data.get('password', '')
+    
+    # Validar username
+    is_valid, message = validate_username(username)
+    if not is_valid:
+        return None, error(message, 400)
+    
+    # Validar email
+    if not validate_email(email):
+        return None, error('Formato de email inválido', 400)
+    
+    # Validar contraseña
+    is_valid, message = validate_password(password)
+    if not is_valid:
+        return None, error(message, 400)
+    
+    return (username, email, password), None
+
+
+def registration_response(user_id, username, email):
+    """Respuesta del registro correcto (201)"""
+    return {
+        'success': True,
+        'message': 'Usuario registrado exitosamente',
+        'user': {
+            'id': user_id,
+            'username': username,
+            'email': email
+        }
+    }, 201
+
+
+def parse_login(data):
+    """
+    Normalizar los datos del login
+    
+    Returns:
+        tuple: ((identifier, password), None) o (None, (payload, status)) si no hay datos
+    """
+    if not data:
+        return None, error('No se recibieron datos', 400)
+    
+    return (data.get('identifier', '').strip().lower(), data.get('password', '')), None
+
+
+def is_email(identifier):
+    """El identificador del login es un email (si no, es un nombre de usuario)"""
+    return '@' in identifier
+
+
+def login_response(user_data):
+    """Respuesta del login correcto (200)"""
+    return {
+        'success': True,
+        'message': 'Login exitoso',
+        'user': {
+            'id': user_data['uid'],
+            'username': user_data['username'],
+            'email': user_data['email']
+        }
+    }, 200
+
+
+def start_session(session, user_id, username, progress=None):
+    """
+    Guardar el usuario en la sesión
+    
+    Args:
+        session: Sesión de Flask o de Quart
+        progress (dict, optional): Progreso conocido (en el registro, el inicial).
+            Si no se indica, la copia de la sesión se crea con una lectura nueva
+            en la primera consulta del progreso (el perfil del login puede venir
+            de la caché)
+    """
+    session['user_id'] = user_id
+    session['username'] = username
+    if progress is not None:
+        store_progress_snapshot(session, progress)
+    else:
+        session.pop('progress', None)
+
+
+def new_user_progress():
+    """Progreso serializado de un usuario recién registrado"""
+    return serialize_progress(new_progress())
+
+
+def logout_response(username):
+    """Respuesta del cierre de sesión (200)"""
+    return {
+        'success': True,
+        'message': f'Hasta luego, {username}!'
+    }, 200
+
+
+def current_user_response(user_id, username, progress):
+    """Respuesta de /api/me (200)"""
+    return {
+        'success': True,
+        'user': {
+            'id': user_id,
+            'username': username,
+            'progress': progress
+        }
+    }, 200
+
+
+# ============================================
+# PROGRESO EN LA SESIÓN
+# ============================================
+
+def store_progress_snapshot(session, progress):
+    """Guardar en la sesión el progreso serializado (si el modo está activo)"""
+    if Config.SESSION_PROGRESS_SNAPSHOT:
+        session['progress'] = progress
+        session['progress_fetched_at'] = time.time()
+
+
+def has_progress_snapshot(session):
+    """Hay una copia del progreso en la sesión que se podría usar"""
+    return Config.SESSION_PROGRESS_SNAPSHOT and 'progress' in session
+
+
+def valid_progress_snapshot(session, known_version):
+    """
+    Copia del progreso de la sesión, si sigue siendo válida
+    
+    Se usa mientras su versión no sea anterior a la que conoce el
+    almacenamiento sin leer Firestore (progress_version) y no caduque.
+    PROGRESS_SNAPSHOT_TTL limita lo desfasada que puede quedar la copia por
+    escrituras hechas en otro proceso.
+    
+    Args:
+        session: Sesión de Flask o de Quart
+        known_version (int or None): StorageBackend.progress_version del usuario
+    
+    Returns:
+        dict or None: Progreso serializado o None si hay que leerlo
+    """
+    if not has_progress_snapshot(session):
+        return None
+    
+    snapshot = session['progress']
+    age = time.time() - session.get('progress_fetched_at', 0)
+    if age < Config.PROGRESS_SNAPSHOT_TTL and (known_version is None or snapshot.get('version', 0) >= known_version):
+        return snapshot
+    return None
+
+
+def update_progress_snapshot(session, lesson, progress):
+    """Actualizar la copia de la sesión tras completar una lección; si estaba desfasada se descarta"""
+    snapshot = snapshot_with_completion(session['progress'], lesson, progress)
+    if snapshot is None:
+        session.pop('progress', None)
+    elif snapshot is not session['progress']:
+        session['progress'] = snapshot
+
+
+def progress_response(progress):
+    """Respuesta de /api/progress (200)"""
+    return {
+        'success': True,
+        'progress': progress
+    }, 200
+
+
+def completion_response(success, message, progress):
+    """Respuesta de /api/progress/complete/<lesson_id>"""
+    if success:
+        return {
+            'success': True,
+            'message': '¡Lección completada! +10 puntos',
+            'progress': progress
+        }, 200
+    return error(message, 400)
+
+
+# ============================================
+# LECCIONES
+# ============================================
+
+def parse_lessons_query(args):
+    """
+    Parámetros de /api/lessons
+    
+    Args:
+        args: request.args
+    
+    Returns:
+        tuple: (query, None) con query = dict(category, limit, after, summary),
+            o (None, (payload, status)) si limit o after no son números
+    """
+    category = args.get('category')
+    summary = args.get('view', 'summary') != 'full'
+    
+    try:
+        limit = int(args.get('limit', Config.LESSONS_PAGE_SIZE))
+        after = args.get('after')
+        after = int(after) if after else None
+    except ValueError:
+        return None, error('Los parámetros limit y after deben ser números', 400)
+    
+    return {
+        'category': category,
+        'limit': max(1, min(limit, Config.LESSONS_MAX_PAGE_SIZE)),
+        'after': after,
+        'summary': summary
+    }, None
+
+
+def lessons_etag_parts(query):
+    """Partes del ETag de una página de lecciones (ruta y filtros)"""
+    return ('lessons', query['category'] or '', query['limit'], query['after'] or '',
+            'summary' if query['summary'] else 'full')
+
+
+def lesson_etag(version, *parts):
+    """
+    ETag fuerte de una respuesta de lecciones
+    
+    Depende de la versión del catálogo y de lo que se pidió (ruta y filtros),
+    así que se calcula sin leer el contenido de las lecciones.
+    
+    Returns:
+        str or None: ETag o None si no se conoce la versión del catálogo
+    """
+    if version is None:
+        return None
+    key = '|'.join((version,) + tuple(str(part) for part in parts))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def single_lesson_etag(lesson):
+    """
+    ETag de /api/lessons/<lesson_id> a partir del contenido de la propia lección
+    
+    No depende de la versión del catálogo, así que una lección que no está en
+    caché cuesta una sola lectura (la suya) y cambiar otra lección no invalida
+    su copia en el navegador.
+    
+    Returns:
+        str or None: ETag o None si la lección no existe
+    """
+    if not lesson:
+        return None
+    return lesson_etag(lesson_content_hash(lesson), 'lesson', lesson['id'])
+
+
+def is_not_modified(if_none_match, etag):
+    """El navegador ya tiene la versión actual (comparación débil: la versión comprimida lleva ETag débil)"""
+    return etag is not None and if_none_match.contains_weak(etag)
+
+
+def set_lesson_cache_headers(response, etag):
+    """Añadir ETag y Cache-Control a una respuesta de lecciones (200 o 304)"""
+    if etag is not None:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = Config.LESSON_CACHE_CONTROL
+    return response
+
+
+def lessons_page_response(lessons, next_cursor):
+    """Respuesta de /api/lessons (200)"""
+    return {
+        'success': True,
+        'lessons': lessons,
+        'count': len(lessons),
+        'next_cursor': next_cursor
+    }, 200
+
+
+def lesson_response(lesson):
+    """Respuesta de /api/lessons/<lesson_id> (200 o 404)"""
+    if lesson:
+        return {
+            'success': True,
+            'lesson': lesson
+        }, 200
+    return error('Lección no encontrada', 404)
+
+
+def catalog_unavailable_response():
+    """Respuesta de /api/lessons/catalog sin catálogo estático al día (404)"""
+    return error('Catálogo estático no disponible', 404)
+
+
+def categories_response():
+    """Respuesta de /api/lessons/categories (200)"""
+    return {
+        'success': True,
+        'categories': Config.LESSON_CATEGORIES
+    }, 200
+
+
+# ============================================
+# SALUD
+# ============================================
+
+def health_response(storage, **extra):
+    """
+    Respuesta de /api/health: estado de las cachés y de la compresión
+    
+    Args:
+        storage (StorageBackend): Backend de almacenamiento
+        **extra: Campos adicionales (por ejemplo el modo del servidor)
+    """
+    response = {
+        'success': True,
+        'message': 'API funcionando correctamente',
+        'version': '1.0.0',
+        **extra,
+        'lesson_cache': storage.lesson_cache.stats()
+    }
+    if hasattr(storage, 'user_cache'):
+        response['user_cache'] = storage.user_cache.stats()
+    response['compression'] = {
+        **compression.stats.snapshot(),
+        'encodings': compression.available_encodings(),
+        'cache': compression.compressed_cache.stats()
+    }
+    return response, 200
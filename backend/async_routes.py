@@ -0,0 +1,238 @@
+"""
+Rutas asíncronas de la API (modo ASGI con Quart, ver asgi.py)
+
+Mismos endpoints y respuestas que backend/routes.py: las dos versiones usan
+la lógica de backend/api_common.py y solo se diferencian en que aquí se
+espera al almacenamiento (backend/async_storage.py) con await.
+"""
+from quart import Blueprint, request, jsonify, session, current_app, redirect, url_for
+from backend.async_storage import async_storage
+from backend.progress import serialize_progress
+from backend.catalog_snapshot import CatalogSnapshots
+from backend import api_common
+from functools import wraps
+
+# Crear Blueprint para las rutas de la API
+async_api = Blueprint('api', __name__, url_prefix='/api')
+
+# Catálogo precompilado por import_lessons.py (static/catalog/)
+catalog_snapshots = CatalogSnapshots()
+
+
+def respond(result):
+    """Convertir el (payload, status) de api_common en una respuesta JSON"""
+    payload, status = result
+    return jsonify(payload), status
+
+
+# ============================================
+# DECORADOR DE AUTENTICACIÓN
+# ============================================
+
+def login_required(f):
+    """Decorador para proteger rutas que requieren autenticación"""
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return respond(api_common.error('Debes iniciar sesión', 401))
+        return await f(*args, **kwargs)
+    return decorated_function
+
+
+# ============================================
+# PROGRESO EN LA SESIÓN
+# ============================================
+
+async def load_user_progress(user_id):
+    """Progreso serializado del usuario actual (ver routes.load_user_progress)"""
+    if api_common.has_progress_snapshot(session):
+        snapshot = api_common.valid_progress_snapshot(session, await async_storage.progress_version(user_id))
+        if snapshot is not None:
+            return snapshot
+    
+    progress = serialize_progress(await async_storage.get_user_progress(user_id))
+    api_common.store_progress_snapshot(session, progress)
+    return progress
+
+
+# ============================================
+# ENDPOINTS DE AUTENTICACIÓN
+# ============================================
+
+@async_api.route('/register', methods=['POST'])
+async def register():
+    """Endpoint de registro de usuario (ver routes.register)"""
+    try:
+        fields, failure = api_common.parse_registration(await request.get_json())
+        if failure:
+            return respond(failure)
+        username, email, password = fields
+        
+        success, message, user_id = await async_storage.create_user(email, password, username)
+        
+        if success:
+            api_common.start_session(session, user_id, username, api_common.new_user_progress())
+            return respond(api_common.registration_response(user_id, username, email))
+        else:
+            return respond(api_common.error(message, 400))
+    
+    except Exception as e:
+        return respond(api_common.error(f'Error en el servidor: {str(e)}', 500))
+
+
+@async_api.route('/login', methods=['POST'])
+async def login():
+    """Endpoint de inicio de sesión (ver routes.login)"""
+    try:
+        fields, failure = api_common.parse_login(await request.get_json())
+        if failure:
+            return respond(failure)
+        identifier, password = fields
+        
+        if api_common.is_email(identifier):
+            success, message, user_data = await async_storage.verify_user(identifier, password)
+        else:
+            user = await async_storage.get_user_by_username(identifier)
+            if user:
+                success, message, user_data = await async_storage.verify_user(user['email'], password)
+            else:
+                return respond(api_common.error('Usuario no encontrado', 404))
+        
+        if success:
+            api_common.start_session(session, user_data['uid'], user_data['username'])
+            return respond(api_common.login_response(user_data))
+        else:
+            return respond(api_common.error(message, 401))
+    
+    except Exception as e:
+        return respond(api_common.error(f'Error en el servidor: {str(e)}', 500))
+
+
+@async_api.route('/logout', methods=['POST'])
+@login_required
+async def logout():
+    """Cerrar sesión"""
+    username = session.get('username', 'Usuario')
+    session.clear()
+    
+    return respond(api_common.logout_response(username))
+
+
+@async_api.route('/me', methods=['GET'])
+@login_required
+async def get_current_user():
+    """Obtener información del usuario actual"""
+    user_id = session.get('user_id')
+    progress = await load_user_progress(user_id)
+    
+    return respond(api_common.current_user_response(user_id, session.get('username'), progress))
+
+
+# ============================================
+# ENDPOINTS DE LECCIONES
+# ============================================
+
+async def lesson_etag(*parts):
+    """ETag de una respuesta de lecciones (ver api_common.lesson_etag)"""
+    return api_common.lesson_etag(await async_storage.catalog_version(), *parts)
+
+
+async def conditional_response(etag, build_response):
+    """
+    Responder 304 si el navegador ya tiene la versión actual (ver routes.conditional_response)
+    
+    Args:
+        etag (str or None): ETag de la respuesta
+        build_response (coroutine function): Construye la respuesta completa (payload, status)
+    """
+    if api_common.is_not_modified(request.if_none_match, etag):
+        response = current_app.response_class('', status=304)
+    else:
+        payload, status = await build_response()
+        response = jsonify(payload)
+        response.status_code = status
+        if status != 200:
+            return response
+    
+    return api_common.set_lesson_cache_headers(response, etag)
+
+
+@async_api.route('/lessons', methods=['GET'])
+@login_required
+async def get_lessons():
+    """Obtener una página de lecciones (mismos parámetros que routes.get_lessons)"""
+    query, failure = api_common.parse_lessons_query(request.args)
+    if failure:
+        return respond(failure)
+    
+    async def build_response():
+        return api_common.lessons_page_response(*await async_storage.get_lessons_page(**query))
+    
+    return await conditional_response(await lesson_etag(*api_common.lessons_etag_parts(query)), build_response)
+
+
+@async_api.route('/lessons/catalog', methods=['GET'])
+@login_required
+async def get_lessons_catalog():
+    """Redirigir al catálogo estático si está al día (ver routes.get_lessons_catalog)"""
+    version = await async_storage.catalog_version()
+    filename = catalog_snapshots.snapshot_file(request.args.get('category'), version) if version else None
+    
+    if filename is None:
+        return respond(api_common.catalog_unavailable_response())
+    
+    return redirect(url_for('static', filename=filename))
+
+
+@async_api.route('/lessons/<lesson_id>', methods=['GET'])
+@login_required
+async def get_lesson(lesson_id):
+    """Obtener una lección específica (admite If-None-Match con el ETag de su contenido)"""
+    lesson = await async_storage.get_lesson_by_id(lesson_id)
+    
+    async def build_response():
+        return api_common.lesson_response(lesson)
+    
+    return await conditional_response(api_common.single_lesson_etag(lesson), build_response)
+
+
+@async_api.route('/lessons/categories', methods=['GET'])
+@login_required
+async def get_categories():
+    """Obtener lista de categorías disponibles"""
+    return respond(api_common.categories_response())
+
+
+# ============================================
+# ENDPOINTS DE PROGRESO
+# ============================================
+
+@async_api.route('/progress', methods=['GET'])
+@login_required
+async def get_progress():
+    """Obtener progreso del usuario actual"""
+    return respond(api_common.progress_response(await load_user_progress(session.get('user_id'))))
+
+
+@async_api.route('/progress/complete/<lesson_id>', methods=['POST'])
+@login_required
+async def complete_lesson(lesson_id):
+    """Marcar una lección como completada"""
+    user_id = session.get('user_id')
+    
+    success, message, progress = await async_storage.complete_lesson(user_id, lesson_id)
+    
+    if success and api_common.has_progress_snapshot(session):
+        api_common.update_progress_snapshot(session, await async_storage.get_lesson_by_id(lesson_id), progress)
+    
+    return respond(api_common.completion_response(success, message, progress))
+
+
+# ============================================
+# ENDPOINT DE SALUD
+# ============================================
+
+@async_api.route('/health', methods=['GET'])
+async def health_check():
+    """Verificar que la API está funcionando"""
+    return respond(api_common.health_response(async_storage.backend, mode='asgi'))
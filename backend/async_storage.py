@@ -0,0 +1,460 @@
+"""
+Almacenamiento del modo ASGI (asgi.py)
+
+Con Firestore (STORAGE_BACKEND=firestore) las rutas esperan con await a
+firestore.AsyncClient (AsyncFirebaseService), de modo que un proceso tiene
+en curso tantas peticiones como lleguen mientras Firestore responde, sin un
+hilo por petición. Firebase Authentication (Admin SDK) solo tiene API
+bloqueante: esas llamadas, y todas las de los backends locales (memoria y
+SQLite, AsyncStorage), se ejecutan en un grupo de FIREBASE_MAX_WORKERS hilos
+por proceso.
+
+Los dos comparten con el modo síncrono la instancia del backend configurado
+(firebase_service): sus cachés, las consultas y los commits que construye
+FirebaseService y las trazas (el contexto de la petición se copia a los
+hilos). El cliente asíncrono y el grupo de hilos se crean en el primer uso
+dentro de cada proceso y se olvidan tras un fork.
+"""
+from firebase_admin import auth, firestore
+from google.api_core.exceptions import AlreadyExists, NotFound
+from config import Config
+from backend.catalog import SUMMARY_FIELDS
+from backend.firebase_service import FirebaseService, firebase_service, get_firebase_app
+from backend.progress import is_legacy_progress
+from backend import tracing
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import contextvars
+import copy
+import os
+import threading
+
+
+class AsyncStorage:
+    """Versión con await de los métodos de StorageBackend que usan las rutas (en el grupo de hilos)"""
+    
+    def __init__(self, backend, max_workers=None):
+        """
+        Args:
+            backend (StorageBackend): Backend síncrono
+            max_workers (int, optional): Hilos del grupo (por defecto Config.FIREBASE_MAX_WORKERS)
+        """
+        self.backend = backend
+        self.max_workers = max_workers or Config.FIREBASE_MAX_WORKERS
+        self._reset_executor()
+    
+    def _reset_executor(self):
+        """Olvidar el grupo de hilos (los hilos no se heredan en un fork)"""
+        self._executor_lock = threading.Lock()
+        self._executor = None
+    
+    def _after_fork(self):
+        """Olvidar en el hijo lo que se creó en el padre"""
+        self._reset_executor()
+    
+    @property
+    def executor(self):
+        """Grupo de hilos de este proceso (se crea en el primer uso)"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='storage'
+                    )
+        return self._executor
+    
+    async def _run(self, method, *args, **kwargs):
+        """Ejecutar un método bloqueante en el grupo de hilos con el contexto de la petición"""
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(context.run, method, *args, **kwargs))
+    
+    @property
+    def lesson_cache(self):
+        return self.backend.lesson_cache
+    
+    @property
+    def user_cache(self):
+        return self.backend.user_cache
+    
+    async def warm_up(self):
+        await self._run(self.backend.warm_up)
+    
+    async def create_user(self, email, password, username):
+        return await self._run(self.backend.create_user, email, password, username)
+    
+    async def verify_user(self, email, password):
+        return await self._run(self.backend.verify_user, email, password)
+    
+    async def get_user_by_username(self, username):
+        return await self._run(self.backend.get_user_by_username, username)
+    
+    async def catalog_version(self):
+        return await self._run(self.backend.catalog_version)
+    
+    async def get_lessons_page(self, category=None, limit=50, after=None, summary=False):
+        return await self._run(self.backend.get_lessons_page, category, limit, after, summary)
+    
+    async def get_lesson_by_id(self, lesson_id):
+        return await self._run(self.backend.get_lesson_by_id, lesson_id)
+    
+    async def complete_lesson(self, user_id, lesson_id):
+        return await self._run(self.backend.complete_lesson, user_id, lesson_id)
+    
+    async def progress_version(self, user_id):
+        return await self._run(self.backend.progress_version, user_id)
+    
+    async def get_user_progress(self, user_id):
+        return await self._run(self.backend.get_user_progress, user_id)
+
+
+class AsyncFirebaseService(AsyncStorage):
+    """
+    Operaciones de las rutas sobre firestore.AsyncClient
+    
+    Mismo comportamiento y mismas claves de caché que FirebaseService (cuya
+    instancia envuelve); solo Authentication pasa por el grupo de hilos.
+    """
+    
+    def __init__(self, service, max_workers=None):
+        """
+        Args:
+            service (FirebaseService): Servicio síncrono (cachés y operaciones de Authentication)
+            max_workers (int, optional): Hilos para Authentication (por defecto Config.FIREBASE_MAX_WORKERS)
+        """
+        super().__init__(service, max_workers)
+        self._reset_client()
+    
+    def _reset_client(self):
+        self._db = None
+        self._db_loop = None
+    
+    def _after_fork(self):
+        super()._after_fork()
+        self._reset_client()
+    
+    @property
+    def db(self):
+        """
+        Cliente asíncrono de Firestore de este proceso
+        
+        Se crea en el primer uso dentro del bucle de eventos que sirve las
+        peticiones: el canal gRPC asíncrono queda ligado a ese bucle (si el
+        bucle cambia se crea otro cliente).
+        """
+        loop = asyncio.get_running_loop()
+        if self._db is None or self._db_loop is not loop:
+            app = get_firebase_app()
+            self._db = firestore.AsyncClient(credentials=app.credential.get_credential(), project=app.project_id)
+            self._db_loop = loop
+        return self._db
+    
+    # ============================================
+    # OPERACIONES TRAZADAS (backend.tracing)
+    # ============================================
+    
+    @staticmethod
+    async def _get(ref):
+        """Leer un documento"""
+        with tracing.span('read', 'get', ref.parent.id, ref.path) as span:
+            snapshot = await ref.get()
+            span.documents = 1
+        return snapshot
+    
+    @staticmethod
+    async def _query(query, collection):
+        """Ejecutar una consulta y devolver todos sus documentos"""
+        with tracing.span('read', 'query', collection) as span:
+            documents = await query.get()
+            span.documents = len(documents)
+        return documents
+    
+    @staticmethod
+    async def _commit(batch, collection):
+        """Confirmar una escritura en lote"""
+        with tracing.span('write', 'commit', collection) as span:
+            span.documents = len(batch)
+            return await batch.commit()
+    
+    async def _auth(self, operation, *args, **kwargs):
+        """Llamada a Authentication (bloqueante) en el grupo de hilos"""
+        return await self._run(self.backend._auth, operation, *args, **kwargs)
+    
+    async def warm_up(self):
+        """Crear el cliente en el bucle del servidor con una lectura mínima y cargar la versión del catálogo"""
+        await self._query(self.db.collection(Config.LESSONS_COLLECTION).select([]).limit(1), Config.LESSONS_COLLECTION)
+        await self.catalog_version()
+    
+    # ============================================
+    # OPERACIONES DE AUTENTICACIÓN
+    # ============================================
+    
+    async def create_user(self, email, password, username):
+        """
+        Crear un nuevo usuario (ver FirebaseService.create_user)
+        
+        Returns:
+            tuple: (success, message, user_id)
+        """
+        service = self.backend
+        found, _ = service.user_cache.get(('username', username))
+        if found:
+            return False, "El usuario ya existe", None
+        
+        uid = self.db.collection(Config.USERS_COLLECTION).document().id
+        service.unknown_user_cache.delete(('username', username))
+        service.unknown_user_cache.delete(('email', email))
+        
+        try:
+            await self._auth('create_user', uid=uid, email=email, password=password, display_name=username)
+        except auth.EmailAlreadyExistsError:
+            return False, "El email ya está registrado", None
+        except Exception as e:
+            return False, f"Error al crear usuario: {str(e)}", None
+        
+        try:
+            await self._commit(
+                FirebaseService.user_profile_batch(self.db, uid, email, username),
+                Config.USERS_COLLECTION
+            )
+        except AlreadyExists:
+            # Compensación: el nombre ya estaba reservado
+            await self._run(service._delete_auth_user, uid)
+            return False, "El usuario ya existe", None
+        except Exception as e:
+            await self._run(service._delete_auth_user, uid)
+            return False, f"Error al crear usuario: {str(e)}", None
+        
+        return True, "Usuario registrado exitosamente", uid
+    
+    async def verify_user(self, email, password):
+        """
+        Verificar credenciales de usuario (ver FirebaseService.verify_user)
+        
+        Returns:
+            tuple: (success, message, user_data)
+        """
+        service = self.backend
+        found, _ = service.unknown_user_cache.get(('email', email))
+        if found:
+            return False, "Email no registrado", None
+        
+        try:
+            user = await self._auth('get_user_by_email', email)
+            user_data = await self._get_user_profile(user.uid)
+            
+            if user_data is not None:
+                user_data['uid'] = user.uid
+                return True, "Login exitoso", user_data
+            else:
+                return False, "Usuario no encontrado en la base de datos", None
+        
+        except auth.UserNotFoundError:
+            service.unknown_user_cache.set(('email', email), True)
+            return False, "Email no registrado", None
+        except Exception as e:
+            return False, f"Error al verificar usuario: {str(e)}", None
+    
+    async def _get_user_profile(self, uid):
+        """Perfil de Firestore de un usuario, desde la caché si está disponible"""
+        found, profile = self.backend.user_cache.get(('profile', uid))
+        if not found:
+            user_doc = await self._get(self.db.collection(Config.USERS_COLLECTION).document(uid))
+            if not user_doc.exists:
+                return None
+            profile = user_doc.to_dict()
+            self.backend.user_cache.set(('profile', uid), profile)
+        return copy.deepcopy(profile)
+    
+    async def get_user_by_username(self, username):
+        """
+        Buscar usuario en el índice usernames/{username} (ver FirebaseService.get_user_by_username)
+        
+        Returns:
+            dict or None: username, uid y email del usuario o None si no existe
+        """
+        service = self.backend
+        found, _ = service.unknown_user_cache.get(('username', username))
+        if found:
+            return None
+        
+        found, user_data = service.user_cache.get(('username', username))
+        if found:
+            return dict(user_data)
+        
+        try:
+            entry = await self._get(self.db.collection(Config.USERNAMES_COLLECTION).document(username))
+            
+            if entry.exists:
+                user_data = entry.to_dict()
+                user_data['username'] = username
+                service.user_cache.set(('username', username), user_data)
+                return dict(user_data)
+            
+            service.unknown_user_cache.set(('username', username), True)
+            return None
+        
+        except Exception as e:
+            print(f"Error al buscar usuario: {str(e)}")
+            return None
+    
+    # ============================================
+    # OPERACIONES DE LECCIONES
+    # ============================================
+    
+    async def catalog_version(self):
+        """
+        Versión actual del catálogo (ver StorageBackend.catalog_version)
+        
+        Returns:
+            str or None: Versión del catálogo o None si no se pudo consultar
+        """
+        cache_key = ('version',)
+        found, cached = self.backend.lesson_cache.get(cache_key)
+        if found:
+            return cached
+        
+        try:
+            document = await self._get(
+                self.db.collection(Config.METADATA_COLLECTION).document(Config.CATALOG_METADATA_DOCUMENT)
+            )
+            version = (document.to_dict() or {}).get('version') if document.exists else None
+            if version is None:
+                # Catálogo escrito antes de metadata/catalog: lo calcula y guarda el servicio síncrono
+                return await self._run(self.backend.catalog_version)
+            self.backend.lesson_cache.set(cache_key, version)
+            return version
+        except Exception as e:
+            print(f"Error al calcular la versión del catálogo: {str(e)}")
+            return None
+    
+    async def get_lessons_page(self, category=None, limit=50, after=None, summary=False):
+        """
+        Obtener una página de lecciones (ver StorageBackend.get_lessons_page)
+        
+        Returns:
+            tuple: (lessons, next_cursor) con next_cursor None en la última página
+        """
+        cache_key = ('page', category, limit, after, summary)
+        found, cached = self.backend.lesson_cache.get(cache_key)
+        if found:
+            return cached
+        
+        fields = SUMMARY_FIELDS if summary else None
+        try:
+            # Se pide una lección de más para saber si hay otra página
+            query = FirebaseService.lessons_page_query(self.db, category, limit + 1, after, fields)
+            lessons = [
+                FirebaseService.lesson_from_document(lesson, fields)
+                for lesson in await self._query(query, Config.LESSONS_COLLECTION)
+            ]
+            next_cursor = lessons[limit - 1]['numero_leccion'] if len(lessons) > limit else None
+            result = (lessons[:limit], next_cursor)
+            self.backend.lesson_cache.set(cache_key, result)
+            return result
+        except Exception as e:
+            print(f"Error al obtener lecciones: {str(e)}")
+            return [], None
+    
+    async def get_lesson_by_id(self, lesson_id):
+        """
+        Obtener una lección específica (ver StorageBackend.get_lesson_by_id)
+        
+        Returns:
+            dict or None: Datos de la lección
+        """
+        cache_key = ('lesson', lesson_id)
+        found, cached = self.backend.lesson_cache.get(cache_key)
+        if found:
+            return cached
+        
+        try:
+            lesson = await self._get(self.db.collection(Config.LESSONS_COLLECTION).document(lesson_id))
+            if not lesson.exists:
+                return None
+            result = FirebaseService.lesson_from_document(lesson)
+            self.backend.lesson_cache.set(cache_key, result)
+            return result
+        except Exception as e:
+            print(f"Error al obtener lección: {str(e)}")
+            return None
+    
+    # ============================================
+    # OPERACIONES DE PROGRESO DEL USUARIO
+    # ============================================
+    
+    async def complete_lesson(self, user_id, lesson_id):
+        """
+        Marcar una lección como completada con un único commit, sin lecturas
+        (ver FirebaseService._complete_lesson)
+        
+        Returns:
+            tuple: (success, message, progress)
+        """
+        service = self.backend
+        lesson = await self.get_lesson_by_id(lesson_id)
+        if lesson is None:
+            return False, "Lección no encontrada", None
+        
+        batch, transforms = FirebaseService.completion_batch(self.db, user_id, lesson)
+        try:
+            write_results = await self._commit(batch, Config.USERS_COLLECTION)
+        except AlreadyExists:
+            # Ya estaba completada: no se escribió nada
+            return True, "Sin cambios", service.progress_summary(await self.get_user_progress(user_id))
+        except NotFound:
+            return False, "Usuario no encontrado", None
+        except Exception as e:
+            return False, f"Error al actualizar progreso: {str(e)}", None
+        
+        service.invalidate_user(user_id)
+        progress = FirebaseService.completion_summary(lesson, transforms, write_results)
+        service._remember_progress_version(user_id, progress)
+        return True, "Progreso actualizado", progress
+    
+    async def progress_version(self, user_id):
+        """Versión del progreso conocida por este proceso (sin consultar Firestore)"""
+        return self.backend.progress_version(user_id)
+    
+    async def get_user_progress(self, user_id):
+        """
+        Obtener el progreso de un usuario (ver StorageBackend.get_user_progress)
+        
+        Returns:
+            dict: Progreso del usuario (formato de backend.progress)
+        """
+        try:
+            user = await self._get(self.db.collection(Config.USERS_COLLECTION).document(user_id))
+            if not user.exists:
+                return {}
+            
+            progress = user.to_dict().get('progress', {})
+            if is_legacy_progress(progress):
+                # Conversión de un usuario sin migrar (una vez): la guarda el servicio síncrono
+                return await self._run(self.backend.get_user_progress, user_id)
+            self.backend._remember_progress_version(user_id, progress)
+            return progress
+        except Exception as e:
+            print(f"Error al obtener progreso: {str(e)}")
+            return {}
+
+
+def create_async_storage(backend):
+    """
+    Almacenamiento del modo asíncrono para un backend
+    
+    Returns:
+        AsyncStorage: AsyncFirebaseService para Firestore, AsyncStorage para memoria y SQLite
+    """
+    if isinstance(backend, FirebaseService):
+        return AsyncFirebaseService(backend)
+    return AsyncStorage(backend)
+
+
+# Instancia del modo asíncrono sobre el backend configurado
+async_storage = create_async_storage(firebase_service)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=async_storage._after_fork)
@@ -0,0 +1,85 @@
+"""
+Identidad de las lecciones del catálogo
+
+Cada lección tiene un ID de documento determinista (categoría + número) y un
+hash de su contenido, de modo que reimportar el mismo CSV produce los mismos
+documentos y solo hay que escribir los que cambiaron.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+
+
+# Campos que forman el contenido de una lección (los que se comparan al sincronizar)
+CONTENT_FIELDS = ('numero_leccion', 'titulo', 'descripcion', 'ejemplos_codigo', 'categoria', 'url')
+
+# Campos de la vista resumida de los listados (sin descripcion ni ejemplos_codigo)
+SUMMARY_FIELDS = ('numero_leccion', 'titulo', 'categoria')
+
+
+def slugify(text):
+    """Convertir un texto en un identificador ASCII en minúsculas ('Python Básico' -> 'python-basico')"""
+    ascii_text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', ascii_text.lower()).strip('-')
+
+
+def lesson_document_id(lesson):
+    """
+    ID de documento determinista de una lección
+    
+    Args:
+        lesson (dict): Datos de la lección (categoria y numero_leccion)
+    
+    Returns:
+        str: ID como 'python-basico-0007'
+    """
+    return f"{slugify(lesson['categoria'])}-{int(lesson['numero_leccion']):04d}"
+
+
+def project_lesson(lesson, fields):
+    """
+    Quedarse solo con algunos campos de una lección (el id se conserva)
+    
+    Los campos internos del documento (content_hash) nunca salen de aquí.
+    
+    Args:
+        lesson (dict): Lección completa
+        fields (tuple or None): Campos a conservar (None conserva los de CONTENT_FIELDS)
+    
+    Returns:
+        dict: Lección con los campos pedidos
+    """
+    fields = CONTENT_FIELDS if fields is None else fields
+    projected = {field: lesson[field] for field in fields if field in lesson}
+    projected['id'] = lesson['id']
+    return projected
+
+
+def lesson_content_hash(lesson):
+    """
+    Hash del contenido de una lección
+    
+    Args:
+        lesson (dict): Datos de la lección
+    
+    Returns:
+        str: Hash SHA-256 abreviado (16 caracteres hexadecimales)
+    """
+    content = {field: lesson.get(field) for field in CONTENT_FIELDS}
+    serialized = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:16]
+
+
+def catalog_version(lesson_hashes):
+    """
+    Versión de todo el catálogo a partir del hash de cada lección
+    
+    Args:
+        lesson_hashes (dict): {lesson_id: content_hash}
+    
+    Returns:
+        str: Hash SHA-256 abreviado (16 caracteres hexadecimales)
+    """
+    serialized = json.dumps(sorted(lesson_hashes.items()), ensure_ascii=False)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:16]
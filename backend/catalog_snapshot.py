@@ -0,0 +1,259 @@
+"""
+Catálogo de lecciones precompilado en archivos estáticos
+
+import_lessons.py escribe en static/catalog/ un JSON con el listado de todas
+las lecciones y uno por categoría (la vista resumida de /api/lessons). El
+nombre de cada archivo lleva el hash de su contenido, así que nunca cambia y
+se puede servir con caché inmutable; manifest.json indica qué archivos
+corresponden a la versión actual del catálogo.
+
+Junto a cada archivo se guardan sus versiones comprimidas (.json.gz, y
+.json.br si brotli está instalado) al máximo nivel, una sola vez al generarlo.
+La aplicación sirve la que acepte el navegador (Accept-Encoding): el hook de
+compresión no toca los archivos estáticos.
+"""
+from config import Config
+from backend import compression
+from backend.catalog import slugify
+import hashlib
+import json
+import os
+
+
+MANIFEST_FILENAME = 'manifest.json'
+
+# Prefijo de los archivos del catálogo (los únicos con caché inmutable)
+SNAPSHOT_PREFIX = 'lessons-'
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Niveles de las versiones precomprimidas (se comprimen una vez, al generar el catálogo)
+PRECOMPRESSION_LEVELS = {'br': 11, 'gzip': 9}
+
+
+def _snapshot_body(lessons, version):
+    """JSON de un archivo del catálogo (misma forma que una página de /api/lessons)"""
+    body = {
+        'success': True,
+        'lessons': lessons,
+        'count': len(lessons),
+        'next_cursor': None,
+        'version': version
+    }
+    return json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _write_snapshot(directory, name, body):
+    """
+    Escribir un archivo con el hash del contenido en el nombre, y sus versiones
+    comprimidas, y devolver ese nombre
+    """
+    filename = f"{SNAPSHOT_PREFIX}{name}-{hashlib.sha256(body).hexdigest()[:16]}.json"
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(body)
+    
+    for encoding in compression.available_encodings():
+        variant = path + compression.PRECOMPRESSED_SUFFIXES[encoding]
+        if not os.path.exists(variant):
+            with open(variant, 'wb') as f:
+                f.write(compression.compress(body, encoding, PRECOMPRESSION_LEVELS[encoding]))
+    return filename
+
+
+def _base_filename(filename):
+    """Nombre del archivo sin la extensión de su versión comprimida"""
+    base, extension = os.path.splitext(filename)
+    return base if extension in compression.PRECOMPRESSED_SUFFIXES.values() else filename
+
+
+def write_catalog_snapshots(lessons, version, directory=None):
+    """
+    Generar los archivos del catálogo y el manifiesto
+    
+    Se conservan los archivos de la versión anterior (por si algún navegador
+    los está pidiendo) y se borran los más antiguos.
+    
+    Args:
+        lessons (list): Lecciones en vista resumida, ordenadas por número
+        version (str): Versión del catálogo (StorageBackend.catalog_version)
+        directory (str, optional): Carpeta de destino (por defecto Config.CATALOG_SNAPSHOT_DIR)
+    
+    Returns:
+        dict: Manifiesto con la versión y el archivo de cada categoría ('' es el catálogo completo)
+    """
+    directory = directory or Config.CATALOG_SNAPSHOT_DIR
+    os.makedirs(directory, exist_ok=True)
+    
+    by_category = {}
+    for lesson in lessons:
+        by_category.setdefault(lesson.get('categoria', ''), []).append(lesson)
+    
+    files = {'': _write_snapshot(directory, 'all', _snapshot_body(lessons, version))}
+    for category, category_lessons in by_category.items():
+        body = _snapshot_body(category_lessons, version)
+        files[category] = _write_snapshot(directory, slugify(category) or 'sin-categoria', body)
+    
+    previous = load_catalog_manifest(directory)
+    manifest = {'version': version, 'files': files}
+    
+    manifest_path = os.path.join(directory, MANIFEST_FILENAME)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    
+    # Borrar los archivos (y sus versiones comprimidas) que no son de esta versión ni de la anterior
+    keep = set(files.values()) | set((previous or {}).get('files', {}).values())
+    for filename in os.listdir(directory):
+        if filename.startswith(SNAPSHOT_PREFIX) and _base_filename(filename) not in keep:
+            os.remove(os.path.join(directory, filename))
+    
+    return manifest
+
+
+def load_catalog_manifest(directory=None):
+    """
+    Leer el manifiesto del catálogo estático
+    
+    Returns:
+        dict or None: Manifiesto o None si no se ha generado
+    """
+    path = os.path.join(directory or Config.CATALOG_SNAPSHOT_DIR, MANIFEST_FILENAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _static_path(path):
+    """Ruta de un archivo relativa a la carpeta static (para url_for)"""
+    return os.path.relpath(path, Config.STATIC_DIR).replace(os.sep, '/')
+
+
+class CatalogSnapshots:
+    """Acceso al manifiesto desde la API (se relee solo si el archivo cambia)"""
+    
+    def __init__(self, directory=None):
+        self.directory = directory or Config.CATALOG_SNAPSHOT_DIR
+        self._mtime = None
+        self._manifest = None
+    
+    def snapshot_file(self, category, version):
+        """
+        Archivo del catálogo para una categoría, si está al día
+        
+        Args:
+            category (str or None): Categoría (None para el catálogo completo)
+            version (str): Versión actual del catálogo
+        
+        Returns:
+            str or None: Ruta relativa a static/ o None si hay que usar la base de datos
+        """
+        manifest = self._load()
+        if not manifest or manifest.get('version') != version:
+            return None
+        
+        filename = manifest.get('files', {}).get(category or '')
+        if filename is None:
+            return None
+        
+        return _static_path(os.path.join(self.directory, filename))
+    
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(os.path.join(self.directory, MANIFEST_FILENAME))
+        except OSError:
+            return None
+        
+        if mtime != self._mtime:
+            self._manifest = load_catalog_manifest(self.directory)
+            self._mtime = mtime
+        return self._manifest
+
+
+def _snapshot_url_prefix(app):
+    """Prefijo de las URL de los archivos del catálogo estático"""
+    return f"{app.static_url_path}/{_static_path(Config.CATALOG_SNAPSHOT_DIR)}/{SNAPSHOT_PREFIX}"
+
+
+def precompressed_variant(path, prefix, accept_encodings):
+    """
+    Versión comprimida de un archivo del catálogo que acepta el navegador
+    
+    Args:
+        path (str): Ruta de la petición
+        prefix (str): Prefijo de las URL del catálogo (_snapshot_url_prefix)
+        accept_encodings: request.accept_encodings de Werkzeug
+    
+    Returns:
+        tuple or None: (ruta del archivo comprimido, codificación) o None si
+        hay que servir el original
+    """
+    if not Config.COMPRESSION_ENABLED or not path.startswith(prefix):
+        return None
+    
+    filename = SNAPSHOT_PREFIX + path[len(prefix):]
+    if os.path.basename(filename) != filename or not filename.endswith('.json'):
+        return None
+    
+    snapshot_path = os.path.join(Config.CATALOG_SNAPSHOT_DIR, filename)
+    for encoding, suffix in compression.PRECOMPRESSED_SUFFIXES.items():
+        if accept_encodings[encoding] > 0 and os.path.isfile(snapshot_path + suffix):
+            return snapshot_path + suffix, encoding
+    return None
+
+
+def _snapshot_headers(response):
+    """Caché inmutable (en los 200) y Vary: Accept-Encoding de los archivos del catálogo"""
+    if response.status_code == 200:
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_catalog_snapshots(app):
+    """Servir los archivos del catálogo precomprimidos y con caché inmutable"""
+    from flask import request, send_file
+    
+    prefix = _snapshot_url_prefix(app)
+    
+    @app.before_request
+    def serve_precompressed_snapshot():
+        variant = precompressed_variant(request.path, prefix, request.accept_encodings)
+        if variant is None:
+            return None
+        path, encoding = variant
+        response = send_file(path, mimetype='application/json')
+        response.headers['Content-Encoding'] = encoding
+        return response
+    
+    @app.after_request
+    def cache_catalog_snapshots(response):
+        if request.path.startswith(prefix):
+            return _snapshot_headers(response)
+        return response
+
+
+def init_catalog_snapshots_async(app):
+    """Lo mismo que init_catalog_snapshots para la aplicación Quart (asgi.py)"""
+    from quart import request, send_file
+    
+    prefix = _snapshot_url_prefix(app)
+    
+    @app.before_request
+    async def serve_precompressed_snapshot():
+        variant = precompressed_variant(request.path, prefix, request.accept_encodings)
+        if variant is None:
+            return None
+        path, encoding = variant
+        response = await send_file(path, mimetype='application/json', conditional=True)
+        response.headers['Content-Encoding'] = encoding
+        return response
+    
+    @app.after_request
+    async def cache_catalog_snapshots(response):
+        if request.path.startswith(prefix):
+            return _snapshot_headers(response)
+        return response
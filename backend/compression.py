@@ -0,0 +1,222 @@
+"""
+Compresión de las respuestas (JSON de la API y páginas HTML)
+
+Se negocia con Accept-Encoding: brotli si el paquete está instalado y el
+navegador lo acepta, y gzip en otro caso. Las respuestas con ETag (las de
+lecciones) son iguales para todos los usuarios, así que sus bytes comprimidos
+se guardan en caché y cada versión se comprime una sola vez. Los archivos
+estáticos no pasan por aquí: el catálogo precompilado se guarda ya
+comprimido (ver backend/catalog_snapshot.py).
+
+Todas las respuestas que podrían ir comprimidas, también los 304, llevan
+Vary: Accept-Encoding para que una caché compartida no sirva un validador de
+una codificación a quien pidió otra.
+"""
+from config import Config
+from backend.storage import TTLCache
+import gzip
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+
+# Tipos de contenido que merece la pena comprimir
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain'
+}
+
+
+class CompressionStats:
+    """Contadores de la compresión: bytes ahorrados y CPU empleada"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+    
+    def record(self, bytes_in, bytes_out, cpu_seconds):
+        """Registrar una respuesta comprimida (cpu_seconds es 0 si salió de la caché)"""
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_seconds += cpu_seconds
+    
+    def record_skipped(self):
+        """Registrar una respuesta enviada sin comprimir"""
+        with self._lock:
+            self.responses += 1
+    
+    def snapshot(self):
+        """
+        Obtener los contadores actuales
+        
+        Returns:
+            dict: Respuestas, bytes antes y después, ratio y CPU media por respuesta
+        """
+        with self._lock:
+            return {
+                'responses': self.responses + self.compressed,
+                'compressed': self.compressed,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'bytes_saved': self.bytes_in - self.bytes_out,
+                'ratio': round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else 1.0,
+                'cpu_ms_per_response': round(self.cpu_seconds * 1000 / self.compressed, 4) if self.compressed else 0.0
+            }
+
+
+# Extensión de los archivos precomprimidos, en orden de preferencia (para servir
+# un .br no hace falta el paquete brotli, solo para generarlo)
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+stats = CompressionStats()
+compressed_cache = TTLCache(Config.COMPRESSION_CACHE_TTL, Config.COMPRESSION_CACHE_MAX_ENTRIES)
+
+
+def available_encodings():
+    """Codificaciones soportadas, en orden de preferencia"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings):
+    """
+    Elegir la codificación según Accept-Encoding
+    
+    Args:
+        accept_encodings: request.accept_encodings de Werkzeug
+    
+    Returns:
+        str or None: 'br', 'gzip' o None si no se acepta ninguna
+    """
+    for encoding in available_encodings():
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level=None):
+    """
+    Comprimir unos bytes
+    
+    Args:
+        data (bytes): Contenido original
+        encoding (str): 'br' o 'gzip'
+        level (int, optional): Nivel de compresión (por defecto el de Config)
+    
+    Returns:
+        bytes: Contenido comprimido
+    """
+    if encoding == 'br':
+        quality = Config.BROTLI_QUALITY if level is None else level
+        return brotli.compress(data, quality=quality)
+    
+    level = Config.COMPRESSION_LEVEL if level is None else level
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _compressible(response):
+    """La respuesta es un 200 de un tipo que merece la pena comprimir y aún sin comprimir"""
+    return (response.status_code == 200
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def _compress_body(response, data, accept_encodings):
+    """
+    Comprimir el cuerpo ya leído de una respuesta (común a Flask y Quart)
+    
+    Returns:
+        Response: La misma respuesta (comprimida o no)
+    """
+    response.vary.add('Accept-Encoding')
+    
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None or len(data) < Config.COMPRESSION_MIN_SIZE:
+        stats.record_skipped()
+        return response
+    
+    etag, _ = response.get_etag()
+    cache_key = (etag, encoding)
+    found, compressed = compressed_cache.get(cache_key) if etag else (False, None)
+    
+    cpu_seconds = 0.0
+    if not found:
+        start = time.thread_time()
+        compressed = compress(data, encoding)
+        cpu_seconds = time.thread_time() - start
+        if etag:
+            compressed_cache.set(cache_key, compressed)
+    
+    stats.record(len(data), len(compressed), cpu_seconds)
+    
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        # Como hace nginx: la versión comprimida tiene un ETag débil
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def compress_response(response, accept_encodings):
+    """
+    Comprimir una respuesta si el navegador lo admite y merece la pena
+    
+    Args:
+        response (Response): Respuesta de Flask
+        accept_encodings: request.accept_encodings de Werkzeug
+    
+    Returns:
+        Response: La misma respuesta (comprimida o no)
+    """
+    if response.status_code == 304:
+        response.vary.add('Accept-Encoding')
+        return response
+    if response.direct_passthrough or not _compressible(response):
+        return response
+    return _compress_body(response, response.get_data(), accept_encodings)
+
+
+async def compress_response_async(response, accept_encodings):
+    """Lo mismo que compress_response para una respuesta de Quart (get_data es una corrutina)"""
+    if response.status_code == 304:
+        response.vary.add('Accept-Encoding')
+        return response
+    # Solo cuerpos en memoria: los archivos y los streams se envían tal cual
+    if not isinstance(response.response, response.data_body_class) or not _compressible(response):
+        return response
+    return _compress_body(response, await response.get_data(), accept_encodings)
+
+
+def init_compression(app):
+    """Activar la compresión de respuestas en la aplicación"""
+    from flask import request
+    
+    @app.after_request
+    def compress_after_request(response):
+        if not Config.COMPRESSION_ENABLED:
+            return response
+        return compress_response(response, request.accept_encodings)
+
+
+def init_compression_async(app):
+    """Activar la compresión de respuestas en la aplicación Quart (asgi.py)"""
+    from quart import request
+    
+    @app.after_request
+    async def compress_after_request(response):
+        if not Config.COMPRESSION_ENABLED:
+            return response
+        return await compress_response_async(response, request.accept_encodings)
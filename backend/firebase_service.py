@@ -1,325 +1,744 @@
-"""
-Servicio de conexión y operaciones con Firebase
-"""
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
-from config import Config
-import os
-
-
-class FirebaseService:
-    """Servicio singleton para manejar la conexión con Firebase"""
-    
-    _instance = None
-    _initialized = False
-    
-    def __new__(cls):
-        """Patrón Singleton - solo una instancia de Firebase"""
-        if cls._instance is None:
-            cls._instance = super(FirebaseService, cls).__new__(cls)
-        return cls._instance
-    
-    def __init__(self):
-        """Inicializar la conexión con Firebase"""
-        if not FirebaseService._initialized:
-            self._initialize_firebase()
-            FirebaseService._initialized = True
-    
-    def _initialize_firebase(self):
-        """Inicializar Firebase Admin SDK"""
-        try:
-            # Verificar que el archivo de credenciales existe
-            if not os.path.exists(Config.FIREBASE_CREDENTIALS):
-                raise FileNotFoundError(
-                    f"⚠️  No se encontró el archivo de credenciales: {Config.FIREBASE_CREDENTIALS}\n"
-                    f"Por favor, sigue la GUIA_CONFIGURACION_FIREBASE.md"
-                )
-            
-            # Inicializar Firebase con las credenciales
-            cred = credentials.Certificate(Config.FIREBASE_CREDENTIALS)
-            firebase_admin.initialize_app(cred)
-            
-            # Obtener referencia a Firestore
-            self.db = firestore.client()
-            
-            print("✅ Firebase inicializado correctamente")
-            
-        except Exception as e:
-            print(f"❌ Error al inicializar Firebase: {str(e)}")
-            raise
-    
-    # ============================================
-    # OPERACIONES DE AUTENTICACIÓN
-    # ============================================
-    
-    def create_user(self, email, password, username):
-        """
-        Crear un nuevo usuario en Firebase Authentication y Firestore
-        
-        Args:
-            email (str): Email del usuario
-            password (str): Contraseña
-            username (str): Nombre de usuario
-            
-        Returns:
-            tuple: (success, message, user_id)
-        """
-        try:
-            # Crear usuario en Firebase Authentication
-            user = auth.create_user(
-                email=email,
-                password=password,
-                display_name=username
-            )
-            
-            # Guardar información adicional en Firestore
-            self.db.collection(Config.USERS_COLLECTION).document(user.uid).set({
-                'username': username,
-                'email': email,
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'progress': {
-                    'completed_lessons': [],
-                    'current_level': 'Python Básico',
-                    'total_points': 0
-                }
-            })
-            
-            return True, "Usuario registrado exitosamente", user.uid
-            
-        except auth.EmailAlreadyExistsError:
-            return False, "El email ya está registrado", None
-        except Exception as e:
-            return False, f"Error al crear usuario: {str(e)}", None
-    
-    def verify_user(self, email, password):
-        """
-        Verificar credenciales de usuario
-        
-        Nota: Firebase Admin SDK no permite verificar contraseñas directamente.
-        En producción, esto se hace desde el cliente con Firebase Auth SDK.
-        Esta función es un placeholder para mantener compatibilidad con tu código.
-        
-        Args:
-            email (str): Email del usuario
-            password (str): Contraseña
-            
-        Returns:
-            tuple: (success, message, user_data)
-        """
-        try:
-            # Obtener usuario por email
-            user = auth.get_user_by_email(email)
-            
-            # En una app real, la verificación de contraseña se hace en el cliente
-            # Aquí retornamos los datos del usuario si existe
-            user_doc = self.db.collection(Config.USERS_COLLECTION).document(user.uid).get()
-            
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
-                user_data['uid'] = user.uid
-                return True, "Login exitoso", user_data
-            else:
-                return False, "Usuario no encontrado en la base de datos", None
-                
-        except auth.UserNotFoundError:
-            return False, "Email no registrado", None
-        except Exception as e:
-            return False, f"Error al verificar usuario: {str(e)}", None
-    
-    def get_user_by_username(self, username):
-        """
-        Buscar usuario por nombre de usuario
-        
-        Args:
-            username (str): Nombre de usuario
-            
-        Returns:
-            dict or None: Datos del usuario o None si no existe
-        """
-        try:
-            users = self.db.collection(Config.USERS_COLLECTION).where(
-                'username', '==', username
-            ).limit(1).get()
-            
-            if users:
-                user_data = users[0].to_dict()
-                user_data['uid'] = users[0].id
-                return user_data
-            return None
-            
-        except Exception as e:
-            print(f"Error al buscar usuario: {str(e)}")
-            return None
-    
-    def user_exists(self, username=None, email=None):
-        """
-        Verificar si un usuario o email ya existe
-        
-        Args:
-            username (str, optional): Nombre de usuario
-            email (str, optional): Email
-            
-        Returns:
-            bool: True si existe, False si no
-        """
-        try:
-            if username:
-                return self.get_user_by_username(username) is not None
-            
-            if email:
-                try:
-                    auth.get_user_by_email(email)
-                    return True
-                except auth.UserNotFoundError:
-                    return False
-            
-            return False
-            
-        except Exception as e:
-            print(f"Error al verificar existencia: {str(e)}")
-            return False
-    
-    # ============================================
-    # OPERACIONES DE LECCIONES
-    # ============================================
-    
-    def add_lesson(self, lesson_data):
-        """
-        Agregar una lección a Firestore
-        
-        Args:
-            lesson_data (dict): Datos de la lección
-            
-        Returns:
-            tuple: (success, message, lesson_id)
-        """
-        try:
-            doc_ref = self.db.collection(Config.LESSONS_COLLECTION).add(lesson_data)
-            return True, "Lección agregada exitosamente", doc_ref[1].id
-        except Exception as e:
-            return False, f"Error al agregar lección: {str(e)}", None
-    
-    def get_lessons_by_category(self, category):
-        """
-        Obtener lecciones por categoría
-        
-        Args:
-            category (str): Categoría (Python Básico, Intermedio, Avanzado)
-            
-        Returns:
-            list: Lista de lecciones
-        """
-        try:
-            lessons = self.db.collection(Config.LESSONS_COLLECTION).where(
-                'categoria', '==', category
-            ).order_by('numero_leccion').get()
-            
-            return [
-                {**lesson.to_dict(), 'id': lesson.id}
-                for lesson in lessons
-            ]
-        except Exception as e:
-            print(f"Error al obtener lecciones: {str(e)}")
-            return []
-    
-    def get_all_lessons(self):
-        """
-        Obtener todas las lecciones
-        
-        Returns:
-            list: Lista de todas las lecciones
-        """
-        try:
-            lessons = self.db.collection(Config.LESSONS_COLLECTION).order_by(
-                'numero_leccion'
-            ).get()
-            
-            return [
-                {**lesson.to_dict(), 'id': lesson.id}
-                for lesson in lessons
-            ]
-        except Exception as e:
-            print(f"Error al obtener lecciones: {str(e)}")
-            return []
-    
-    def get_lesson_by_id(self, lesson_id):
-        """
-        Obtener una lección específica
-        
-        Args:
-            lesson_id (str): ID de la lección
-            
-        Returns:
-            dict or None: Datos de la lección
-        """
-        try:
-            lesson = self.db.collection(Config.LESSONS_COLLECTION).document(lesson_id).get()
-            if lesson.exists:
-                return {**lesson.to_dict(), 'id': lesson.id}
-            return None
-        except Exception as e:
-            print(f"Error al obtener lección: {str(e)}")
-            return None
-    
-    # ============================================
-    # OPERACIONES DE PROGRESO DEL USUARIO
-    # ============================================
-    
-    def update_user_progress(self, user_id, lesson_id, completed=True):
-        """
-        Actualizar el progreso de un usuario
-        
-        Args:
-            user_id (str): ID del usuario
-            lesson_id (str): ID de la lección
-            completed (bool): Si completó la lección
-            
-        Returns:
-            tuple: (success, message)
-        """
-        try:
-            user_ref = self.db.collection(Config.USERS_COLLECTION).document(user_id)
-            user_doc = user_ref.get()
-            
-            if not user_doc.exists:
-                return False, "Usuario no encontrado"
-            
-            user_data = user_doc.to_dict()
-            progress = user_data.get('progress', {})
-            completed_lessons = progress.get('completed_lessons', [])
-            
-            if completed and lesson_id not in completed_lessons:
-                completed_lessons.append(lesson_id)
-                progress['completed_lessons'] = completed_lessons
-                progress['total_points'] = progress.get('total_points', 0) + 10
-                
-                user_ref.update({'progress': progress})
-                return True, "Progreso actualizado"
-            
-            return True, "Sin cambios"
-            
-        except Exception as e:
-            return False, f"Error al actualizar progreso: {str(e)}"
-    
-    def get_user_progress(self, user_id):
-        """
-        Obtener el progreso de un usuario
-        
-        Args:
-            user_id (str): ID del usuario
-            
-        Returns:
-            dict: Progreso del usuario
-        """
-        try:
-            user = self.db.collection(Config.USERS_COLLECTION).document(user_id).get()
-            if user.exists:
-                return user.to_dict().get('progress', {})
-            return {}
-        except Exception as e:
-            print(f"Error al obtener progreso: {str(e)}")
-            return {}
-
-
-# Crear instancia global
-firebase_service = FirebaseService()
\ No newline at end of file
+"""
+Servicio de conexión y operaciones con Firebase
+"""
+import firebase_admin
+from firebase_admin import credentials, firestore, auth
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1.field_path import FieldPath
+from config import Config
+from backend.storage import StorageBackend, TTLCache
+from backend.catalog import project_lesson
+from backend.progress import CompletionBitmap, is_legacy_progress, migrate_legacy_progress
+from backend.local_storage import MemoryStorage, SQLiteStorage
+from backend import tracing
+import copy
+import os
+import threading
+
+
+# Protege la inicialización de la aplicación de Firebase entre hilos
+_app_lock = threading.Lock()
+
+
+def get_firebase_app():
+    """
+    Aplicación de Firebase Admin SDK del proceso (se inicializa una sola vez)
+    
+    La comparten el servicio síncrono y el asíncrono.
+    
+    Returns:
+        firebase_admin.App: Aplicación por defecto
+    """
+    with _app_lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            pass
+        
+        # Verificar que el archivo de credenciales existe
+        if not os.path.exists(Config.FIREBASE_CREDENTIALS):
+            raise FileNotFoundError(
+                f"⚠️  No se encontró el archivo de credenciales: {Config.FIREBASE_CREDENTIALS}\n"
+                f"Por favor, sigue la GUIA_CONFIGURACION_FIREBASE.md"
+            )
+        
+        # Inicializar Firebase con las credenciales
+        cred = credentials.Certificate(Config.FIREBASE_CREDENTIALS)
+        return firebase_admin.initialize_app(cred)
+
+
+class FirebaseService(StorageBackend):
+    """
+    Servicio singleton para manejar la conexión con Firebase
+    
+    Crear la instancia no abre ninguna conexión: el cliente de Firestore (un
+    canal gRPC, que no sobrevive a un fork) se crea en el primer uso dentro de
+    cada proceso, o antes con warm_up() desde el hook post-fork del servidor
+    (ver gunicorn.conf.py).
+    """
+    
+    _instance = None
+    _initialized = False
+    _lock = threading.Lock()
+    
+    def __new__(cls):
+        """Patrón Singleton - solo una instancia de Firebase (seguro entre hilos)"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(FirebaseService, cls).__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        """Preparar las cachés (la conexión con Firebase se abre en el primer uso)"""
+        if FirebaseService._initialized:
+            return
+        with FirebaseService._lock:
+            if FirebaseService._initialized:
+                return
+            super().__init__()
+            # Búsquedas del login: ('username', nombre) -> índice, ('profile', uid) -> perfil
+            self.user_cache = TTLCache(Config.USER_CACHE_TTL, Config.USER_CACHE_MAX_ENTRIES)
+            # Identificadores que no existen: ('username', nombre) y ('email', email)
+            self.unknown_user_cache = TTLCache(Config.USER_NEGATIVE_CACHE_TTL, Config.USER_CACHE_MAX_ENTRIES)
+            self._reset_connections()
+            FirebaseService._initialized = True
+    
+    def _reset_connections(self):
+        """Olvidar el cliente de Firestore (también en el hijo tras un fork)"""
+        self._connection_lock = threading.Lock()
+        self._db = None
+    
+    @classmethod
+    def _after_fork_in_child(cls):
+        if cls._instance is not None and cls._initialized:
+            cls._instance._reset_connections()
+    
+    @property
+    def firebase_app(self):
+        """Aplicación de Firebase Admin SDK (la usan las llamadas a Authentication)"""
+        return get_firebase_app()
+    
+    @property
+    def db(self):
+        """Cliente de Firestore de este proceso (se crea en el primer uso)"""
+        if self._db is None:
+            with self._connection_lock:
+                if self._db is None:
+                    self._db = self._initialize_firebase()
+        return self._db
+    
+    def _initialize_firebase(self):
+        """
+        Inicializar Firebase Admin SDK y crear el cliente de Firestore
+        
+        No se usa firestore.client(): guarda el cliente en la aplicación de
+        Firebase y, tras un fork, el hijo heredaría el canal del padre.
+        """
+        try:
+            app = get_firebase_app()
+            db = firestore.Client(credentials=app.credential.get_credential(), project=app.project_id)
+            
+            print("✅ Firebase inicializado correctamente")
+            return db
+        
+        except Exception as e:
+            print(f"❌ Error al inicializar Firebase: {str(e)}")
+            raise
+    
+    def warm_up(self):
+        """Abrir la conexión con Firestore con una lectura mínima y cargar la versión del catálogo"""
+        self._query(self.db.collection(Config.LESSONS_COLLECTION).select([]).limit(1), Config.LESSONS_COLLECTION)
+        self.catalog_version()
+    
+    # ============================================
+    # OPERACIONES TRAZADAS (backend.tracing)
+    # ============================================
+    
+    @staticmethod
+    def _get(ref, transaction=None):
+        """Leer un documento (dentro de transaction si se indica)"""
+        with tracing.span('read', 'get', ref.parent.id, ref.path) as span:
+            snapshot = ref.get(transaction=transaction) if transaction else ref.get()
+            span.documents = 1
+        return snapshot
+    
+    @staticmethod
+    def _query(query, collection):
+        """Ejecutar una consulta y devolver todos sus documentos"""
+        with tracing.span('read', 'query', collection) as span:
+            documents = query.get()
+            span.documents = len(documents)
+        return documents
+    
+    @staticmethod
+    def _stream(query, collection):
+        """Recorrer una consulta grande sin cargarla entera en memoria"""
+        with tracing.span('read', 'stream', collection) as span:
+            for document in query.stream():
+                span.documents += 1
+                yield document
+    
+    @staticmethod
+    def _commit(batch, collection):
+        """Confirmar una escritura en lote"""
+        with tracing.span('write', 'commit', collection) as span:
+            span.documents = len(batch)
+            return batch.commit()
+    
+    def _auth(self, operation, *args, **kwargs):
+        """Llamar a una función de firebase_admin.auth con la aplicación del servicio"""
+        with tracing.span('auth', operation, 'auth'):
+            return getattr(auth, operation)(*args, app=self.firebase_app, **kwargs)
+    
+    # ============================================
+    # OPERACIONES DE AUTENTICACIÓN
+    # ============================================
+    
+    def create_user(self, email, password, username):
+        """
+        Crear un nuevo usuario en Firebase Authentication y Firestore
+        
+        Sin comprobaciones previas: primero se crea el usuario en Authentication,
+        que rechaza el email repetido (EmailAlreadyExistsError) sin tocar
+        Firestore, y después se guarda el perfil con la reserva de
+        usernames/{username}, que usa create en el mismo commit y rechaza el
+        nombre repetido. Si el perfil no se puede guardar se elimina el usuario
+        de Authentication.
+        
+        Los nombres que ya están en la caché de usuarios se rechazan sin
+        llamar a Firebase.
+        
+        Args:
+            email (str): Email del usuario
+            password (str): Contraseña
+            username (str): Nombre de usuario
+        
+        Returns:
+            tuple: (success, message, user_id)
+        """
+        found, _ = self.user_cache.get(('username', username))
+        if found:
+            return False, "El usuario ya existe", None
+        
+        uid = self.db.collection(Config.USERS_COLLECTION).document().id
+        self.unknown_user_cache.delete(('username', username))
+        self.unknown_user_cache.delete(('email', email))
+        
+        try:
+            self._auth(
+                'create_user',
+                uid=uid,
+                email=email,
+                password=password,
+                display_name=username
+            )
+        except auth.EmailAlreadyExistsError:
+            return False, "El email ya está registrado", None
+        except Exception as e:
+            return False, f"Error al crear usuario: {str(e)}", None
+        
+        try:
+            self._write_user_profile(uid, email, username)
+        except AlreadyExists:
+            # Compensación: el nombre ya estaba reservado
+            self._delete_auth_user(uid)
+            return False, "El usuario ya existe", None
+        except Exception as e:
+            self._delete_auth_user(uid)
+            return False, f"Error al crear usuario: {str(e)}", None
+        
+        return True, "Usuario registrado exitosamente", uid
+    
+    def _write_user_profile(self, uid, email, username):
+        """Reservar el nombre de usuario y guardar el perfil en un único commit"""
+        self._commit(self.user_profile_batch(self.db, uid, email, username), Config.USERS_COLLECTION)
+    
+    @classmethod
+    def user_profile_batch(cls, db, uid, email, username):
+        """
+        Lote con la reserva usernames/{username} (create) y el perfil del usuario
+        
+        Args:
+            db: Cliente de Firestore (síncrono o asíncrono)
+        """
+        batch = db.batch()
+        batch.create(
+            db.collection(Config.USERNAMES_COLLECTION).document(username),
+            {'uid': uid, 'email': email}
+        )
+        batch.set(
+            db.collection(Config.USERS_COLLECTION).document(uid),
+            cls.new_user_document(username, email, firestore.SERVER_TIMESTAMP)
+        )
+        return batch
+    
+    def _delete_auth_user(self, uid):
+        """Deshacer la creación de un usuario en Authentication"""
+        try:
+            self._auth('delete_user', uid)
+        except Exception as e:
+            print(f"Error al eliminar usuario {uid} de Authentication: {str(e)}")
+    
+    def verify_user(self, email, password):
+        """
+        Verificar credenciales de usuario
+        
+        Nota: Firebase Admin SDK no permite verificar contraseñas directamente.
+        En producción, esto se hace desde el cliente con Firebase Auth SDK.
+        Esta función es un placeholder para mantener compatibilidad con tu código.
+        
+        El perfil de Firestore sale de la caché de usuarios, así que un login
+        habitual solo consulta Authentication; los emails desconocidos se
+        recuerdan un tiempo (USER_NEGATIVE_CACHE_TTL) y no consultan nada.
+        
+        Args:
+            email (str): Email del usuario
+            password (str): Contraseña
+        
+        Returns:
+            tuple: (success, message, user_data)
+        """
+        found, _ = self.unknown_user_cache.get(('email', email))
+        if found:
+            return False, "Email no registrado", None
+        
+        try:
+            # Obtener usuario por email
+            user = self._auth('get_user_by_email', email)
+            
+            # En una app real, la verificación de contraseña se hace en el cliente
+            # Aquí retornamos los datos del usuario si existe
+            user_data = self._get_user_profile(user.uid)
+            
+            if user_data is not None:
+                user_data['uid'] = user.uid
+                return True, "Login exitoso", user_data
+            else:
+                return False, "Usuario no encontrado en la base de datos", None
+        
+        except auth.UserNotFoundError:
+            self.unknown_user_cache.set(('email', email), True)
+            return False, "Email no registrado", None
+        except Exception as e:
+            return False, f"Error al verificar usuario: {str(e)}", None
+    
+    def _get_user_profile(self, uid):
+        """Perfil de Firestore de un usuario, desde la caché si está disponible"""
+        found, profile = self.user_cache.get(('profile', uid))
+        if not found:
+            user_doc = self._get(self.db.collection(Config.USERS_COLLECTION).document(uid))
+            if not user_doc.exists:
+                return None
+            profile = user_doc.to_dict()
+            self.user_cache.set(('profile', uid), profile)
+        return copy.deepcopy(profile)
+    
+    def invalidate_user(self, uid):
+        """Descartar el perfil en caché de un usuario tras modificarlo"""
+        self.user_cache.delete(('profile', uid))
+    
+    def get_user_by_username(self, username):
+        """
+        Buscar usuario por nombre de usuario
+        
+        Lectura directa del índice usernames/{username}, sin consultas. Los
+        resultados (también los nombres que no existen) se guardan en caché.
+        
+        Args:
+            username (str): Nombre de usuario
+        
+        Returns:
+            dict or None: username, uid y email del usuario o None si no existe
+        """
+        found, _ = self.unknown_user_cache.get(('username', username))
+        if found:
+            return None
+        
+        found, user_data = self.user_cache.get(('username', username))
+        if found:
+            return dict(user_data)
+        
+        try:
+            entry = self._get(self.db.collection(Config.USERNAMES_COLLECTION).document(username))
+            
+            if entry.exists:
+                user_data = entry.to_dict()
+                user_data['username'] = username
+                self.user_cache.set(('username', username), user_data)
+                return dict(user_data)
+            
+            self.unknown_user_cache.set(('username', username), True)
+            return None
+        
+        except Exception as e:
+            print(f"Error al buscar usuario: {str(e)}")
+            return None
+    
+    def migrate_username_index(self):
+        """
+        Crear las entradas del índice usernames para los usuarios existentes
+        
+        Los usuarios registrados antes del índice no tienen entrada y no se
+        encontrarían por nombre. Se puede repetir sin efectos.
+        
+        Returns:
+            tuple: (success, message, indexed_users)
+        """
+        indexed = 0
+        try:
+            users = self._stream(
+                self.db.collection(Config.USERS_COLLECTION).select(['username', 'email']),
+                Config.USERS_COLLECTION
+            )
+            usernames = self.db.collection(Config.USERNAMES_COLLECTION)
+            
+            batch = self.db.batch()
+            pending = 0
+            for user in users:
+                user_data = user.to_dict() or {}
+                if not user_data.get('username'):
+                    continue
+                
+                batch.set(
+                    usernames.document(user_data['username']),
+                    {'uid': user.id, 'email': user_data.get('email', '')}
+                )
+                pending += 1
+                indexed += 1
+                
+                if pending == self.MAX_BATCH_SIZE:
+                    self._commit(batch, Config.USERNAMES_COLLECTION)
+                    batch = self.db.batch()
+                    pending = 0
+            
+            if pending:
+                self._commit(batch, Config.USERNAMES_COLLECTION)
+            
+            return True, "Índice de usuarios creado", indexed
+        except Exception as e:
+            return False, f"Error al crear el índice de usuarios: {str(e)}", indexed
+        finally:
+            self.unknown_user_cache.clear()
+    
+    def email_exists(self, email):
+        """
+        Verificar si un email ya está registrado en Firebase Authentication
+        
+        Args:
+            email (str): Email
+        
+        Returns:
+            bool: True si existe
+        """
+        try:
+            self._auth('get_user_by_email', email)
+            return True
+        except auth.UserNotFoundError:
+            return False
+    
+    # ============================================
+    # OPERACIONES DE LECCIONES
+    # ============================================
+    
+    def _insert_lesson(self, lesson_data):
+        """Agregar una lección a Firestore y devolver su ID"""
+        with tracing.span('write', 'add', Config.LESSONS_COLLECTION) as span:
+            doc_ref = self.db.collection(Config.LESSONS_COLLECTION).add(lesson_data)
+            span.documents = 1
+        return doc_ref[1].id
+    
+    def _new_lesson_id(self):
+        """Generar un ID automático de Firestore (sin round trip)"""
+        return self.db.collection(Config.LESSONS_COLLECTION).document().id
+    
+    def _write_lessons_chunk(self, items):
+        """Guardar un bloque de lecciones con un único commit por lotes"""
+        collection = self.db.collection(Config.LESSONS_COLLECTION)
+        batch = self.db.batch()
+        for lesson_id, lesson_data in items:
+            batch.set(collection.document(lesson_id), lesson_data)
+        self._commit(batch, Config.LESSONS_COLLECTION)
+    
+    def _delete_lesson(self, lesson_id):
+        """Eliminar una lección de Firestore"""
+        with tracing.span('write', 'delete', Config.LESSONS_COLLECTION) as span:
+            self.db.collection(Config.LESSONS_COLLECTION).document(lesson_id).delete()
+            span.documents = 1
+    
+    def _delete_lessons_chunk(self, lesson_ids):
+        """Eliminar un bloque de lecciones con un único commit por lotes"""
+        collection = self.db.collection(Config.LESSONS_COLLECTION)
+        batch = self.db.batch()
+        for lesson_id in lesson_ids:
+            batch.delete(collection.document(lesson_id))
+        self._commit(batch, Config.LESSONS_COLLECTION)
+    
+    def _iter_lesson_id_pages(self, category, page_size):
+        """Recorrer solo las referencias de las lecciones, paginando con un cursor"""
+        query = self.db.collection(Config.LESSONS_COLLECTION).select([])
+        if category:
+            query = query.where('categoria', '==', category)
+        query = query.order_by('__name__').limit(page_size)
+        
+        last_document = None
+        while True:
+            page_query = query.start_after(last_document) if last_document else query
+            documents = self._query(page_query, Config.LESSONS_COLLECTION)
+            if not documents:
+                return
+            
+            yield [document.id for document in documents]
+            
+            if len(documents) < page_size:
+                return
+            last_document = documents[-1]
+    
+    def _fetch_lesson_hashes(self):
+        """Consultar solo el content_hash de cada lección (proyección de un campo)"""
+        documents = self._stream(
+            self.db.collection(Config.LESSONS_COLLECTION).select(['content_hash']),
+            Config.LESSONS_COLLECTION
+        )
+        return {
+            document.id: (document.to_dict() or {}).get('content_hash')
+            for document in documents
+        }
+    
+    def _catalog_metadata_ref(self):
+        return self.db.collection(Config.METADATA_COLLECTION).document(Config.CATALOG_METADATA_DOCUMENT)
+    
+    def _fetch_catalog_version(self):
+        """Leer metadata/catalog (una lectura)"""
+        document = self._get(self._catalog_metadata_ref())
+        return (document.to_dict() or {}).get('version') if document.exists else None
+    
+    def _store_catalog_version(self, version):
+        with tracing.span('write', 'set', Config.METADATA_COLLECTION) as span:
+            self._catalog_metadata_ref().set({'version': version, 'updated_at': firestore.SERVER_TIMESTAMP})
+            span.documents = 1
+    
+    def _fetch_lessons_by_category(self, category, fields=None):
+        """Consultar en Firestore las lecciones de una categoría"""
+        query = self.db.collection(Config.LESSONS_COLLECTION).where(
+            'categoria', '==', category
+        ).order_by('numero_leccion')
+        if fields:
+            query = query.select(fields)
+        
+        return [
+            project_lesson({**lesson.to_dict(), 'id': lesson.id}, fields)
+            for lesson in self._query(query, Config.LESSONS_COLLECTION)
+        ]
+    
+    def _fetch_all_lessons(self, fields=None):
+        """Consultar en Firestore todas las lecciones"""
+        query = self.db.collection(Config.LESSONS_COLLECTION).order_by('numero_leccion')
+        if fields:
+            query = query.select(fields)
+        
+        return [
+            project_lesson({**lesson.to_dict(), 'id': lesson.id}, fields)
+            for lesson in self._query(query, Config.LESSONS_COLLECTION)
+        ]
+    
+    def _fetch_lessons_page(self, category, limit, after, fields=None):
+        """Consultar en Firestore una página de lecciones (cursor sobre numero_leccion)"""
+        query = self.lessons_page_query(self.db, category, limit, after, fields)
+        return [self.lesson_from_document(lesson, fields) for lesson in self._query(query, Config.LESSONS_COLLECTION)]
+    
+    @staticmethod
+    def lessons_page_query(db, category, limit, after, fields=None):
+        """Consulta de una página de lecciones (db síncrono o asíncrono)"""
+        query = db.collection(Config.LESSONS_COLLECTION)
+        if category:
+            query = query.where('categoria', '==', category)
+        query = query.order_by('numero_leccion')
+        if fields:
+            # Proyección: Firestore solo envía estos campos
+            query = query.select(fields)
+        if after is not None:
+            query = query.start_after({'numero_leccion': after})
+        return query.limit(limit)
+    
+    @staticmethod
+    def lesson_from_document(document, fields=None):
+        """Lección de la API a partir de un documento de Firestore"""
+        return project_lesson({**document.to_dict(), 'id': document.id}, fields)
+    
+    def _fetch_lesson(self, lesson_id):
+        """Consultar en Firestore una lección por ID"""
+        lesson = self._get(self.db.collection(Config.LESSONS_COLLECTION).document(lesson_id))
+        return self.lesson_from_document(lesson) if lesson.exists else None
+    
+    # ============================================
+    # OPERACIONES DE PROGRESO DEL USUARIO
+    # ============================================
+    
+    def _complete_lesson(self, user_id, lesson):
+        """
+        Marcar una lección como completada con un único commit, sin lecturas
+        
+        El commit crea el marcador users/{uid}/completions/{numero_leccion}
+        con create (falla si ya existe) y actualiza el progreso con
+        transformaciones en el servidor: Increment del bit de la lección en su
+        palabra de completed_words, de su categoría, de los contadores y de la
+        versión. Si la lección ya estaba completada se rechaza el commit entero
+        (AlreadyExists), así que los puntos nunca se suman dos veces aunque
+        haya peticiones concurrentes, y el bit nunca se suma sobre sí mismo.
+        Los nuevos valores llegan en la respuesta del commit.
+        
+        El progreso del usuario debe estar en el formato actual:
+        migrate_progress.py lo convierte y get_user_progress convierte al
+        leerlo (en /api/me, antes de completar nada) al que se quedara sin migrar.
+        
+        Args:
+            user_id (str): ID del usuario
+            lesson (dict): Lección completada
+        
+        Returns:
+            tuple: (success, message, progress)
+        """
+        batch, transforms = self.completion_batch(self.db, user_id, lesson)
+        
+        try:
+            write_results = self._commit(batch, Config.USERS_COLLECTION)
+        except AlreadyExists:
+            # Ya estaba completada: no se escribió nada
+            return True, "Sin cambios", self.progress_summary(self.get_user_progress(user_id))
+        except NotFound:
+            return False, "Usuario no encontrado", None
+        except Exception as e:
+            return False, f"Error al actualizar progreso: {str(e)}", None
+        
+        self.invalidate_user(user_id)
+        return True, "Progreso actualizado", self.completion_summary(lesson, transforms, write_results)
+    
+    @classmethod
+    def completion_batch(cls, db, user_id, lesson):
+        """
+        Commit de una lección completada (ver _complete_lesson)
+        
+        Args:
+            db: Cliente de Firestore (síncrono o asíncrono)
+        
+        Returns:
+            tuple: (batch, transforms) con las transformaciones del progreso por ruta
+        """
+        user_ref = db.collection(Config.USERS_COLLECTION).document(user_id)
+        word, bit = CompletionBitmap.word_of(lesson['numero_leccion'])
+        
+        transforms = {
+            FieldPath('progress', 'completed_words', word).to_api_repr(): firestore.Increment(bit),
+            cls._category_path(lesson): firestore.Increment(1),
+            'progress.completed_count': firestore.Increment(1),
+            'progress.total_points': firestore.Increment(cls.POINTS_PER_LESSON),
+            'progress.version': firestore.Increment(1)
+        }
+        
+        batch = db.batch()
+        batch.create(cls._completion_marker_ref(user_ref, lesson), cls._completion_marker(lesson))
+        batch.update(user_ref, transforms)
+        return batch, transforms
+    
+    @classmethod
+    def completion_summary(cls, lesson, transforms, write_results):
+        """Resumen del progreso (progress_summary) con los resultados de las transformaciones del commit"""
+        # Los resultados de las transformaciones vuelven ordenados por ruta
+        ordered_paths = sorted(transforms, key=lambda path: FieldPath.from_api_repr(path).parts)
+        results = dict(zip(ordered_paths, write_results[-1].transform_results))
+        return {
+            'total_points': results['progress.total_points'].integer_value,
+            'completed_count': results['progress.completed_count'].integer_value,
+            'category_counts': {lesson['categoria']: results[cls._category_path(lesson)].integer_value},
+            'version': results['progress.version'].integer_value
+        }
+    
+    @staticmethod
+    def _category_path(lesson):
+        return FieldPath('progress', 'category_counts', lesson['categoria']).to_api_repr()
+    
+    @staticmethod
+    def _completion_marker_ref(user_ref, lesson):
+        """Marcador de una lección completada (su ID es el número de la lección)"""
+        return user_ref.collection(Config.COMPLETIONS_SUBCOLLECTION).document(str(lesson['numero_leccion']))
+    
+    @staticmethod
+    def _completion_marker(lesson):
+        """Documento marcador de una lección completada"""
+        return {
+            'lesson_id': lesson['id'],
+            'categoria': lesson['categoria'],
+            'numero_leccion': lesson['numero_leccion']
+        }
+    
+    def _migration_writes(self, batch, user_ref, progress, completed_lessons):
+        """Añadir a batch el progreso convertido y un marcador por lección completada"""
+        batch.update(user_ref, {'progress': progress})
+        for lesson in completed_lessons:
+            batch.set(self._completion_marker_ref(user_ref, lesson), self._completion_marker(lesson))
+    
+    def _save_migrated_progress(self, user_id, progress, completed_lessons):
+        """Guardar el progreso convertido al leerlo, con sus marcadores (un commit)"""
+        user_ref = self.db.collection(Config.USERS_COLLECTION).document(user_id)
+        batch = self.db.batch()
+        self._migration_writes(batch, user_ref, progress, completed_lessons)
+        self._commit(batch, Config.USERS_COLLECTION)
+        self.invalidate_user(user_id)
+    
+    def migrate_progress(self):
+        """
+        Convertir el progreso de los usuarios antiguos al formato compacto
+        
+        Sustituye la lista completed_lessons (o completed_ordinals, o el bitmap
+        en base64) por las palabras del bitmap y los contadores por categoría
+        (backend.progress), y crea el marcador de cada lección completada para
+        que complete_lesson la reconozca sin leer el progreso. Los usuarios ya
+        migrados se saltan, así que se puede repetir sin efectos.
+        
+        Returns:
+            tuple: (success, message, migrated_users)
+        """
+        migrated = 0
+        try:
+            catalog = self.get_all_lessons()
+            users = self._stream(self.db.collection(Config.USERS_COLLECTION).select(['progress']), Config.USERS_COLLECTION)
+            
+            batch = self.db.batch()
+            for user in users:
+                progress = (user.to_dict() or {}).get('progress', {})
+                if not is_legacy_progress(progress):
+                    continue
+                
+                compact_progress, completed_lessons = migrate_legacy_progress(progress, catalog)
+                if len(batch) + 1 + len(completed_lessons) > self.MAX_BATCH_SIZE:
+                    self._commit(batch, Config.USERS_COLLECTION)
+                    batch = self.db.batch()
+                self._migration_writes(batch, user.reference, compact_progress, completed_lessons)
+                migrated += 1
+            
+            if len(batch):
+                self._commit(batch, Config.USERS_COLLECTION)
+            
+            return True, "Progreso migrado", migrated
+        except Exception as e:
+            return False, f"Error al migrar progreso: {str(e)}", migrated
+        finally:
+            self.user_cache.clear()
+    
+    def _fetch_user_progress(self, user_id):
+        user = self._get(self.db.collection(Config.USERS_COLLECTION).document(user_id))
+        if user.exists:
+            return user.to_dict().get('progress', {})
+        return None
+
+
+def create_storage_backend(name=None):
+    """
+    Crear el backend de almacenamiento configurado
+    
+    Args:
+        name (str, optional): 'firestore', 'memory' o 'sqlite' (por defecto Config.STORAGE_BACKEND)
+    
+    Returns:
+        StorageBackend: Instancia del backend
+    """
+    name = (name or Config.STORAGE_BACKEND).lower()
+    
+    if name == 'firestore':
+        return FirebaseService()
+    if name == 'memory':
+        return MemoryStorage()
+    if name == 'sqlite':
+        return SQLiteStorage(Config.SQLITE_DATABASE)
+    
+    raise ValueError(f"Backend de almacenamiento desconocido: {name}")
+
+
+# Tras un fork el hijo abre su propia conexión con Firestore
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=FirebaseService._after_fork_in_child)
+
+
+# Crear instancia global (no se conecta hasta el primer uso)
+firebase_service = create_storage_backend()
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Lectura y normalización de lecciones desde archivos CSV
+
+Dos caminos equivalentes:
+- iter_lessons_csv: generador fila a fila con el módulo csv (memoria constante,
+  no necesita pandas).
+- read_lessons_dataframe: versión vectorizada con pandas, que recorta y limpia
+  los valores vacíos por columnas en lugar de fila a fila.
+"""
+import csv
+
+
+# Longitud máxima de los campos largos de cada lección
+DESCRIPTION_MAX_CHARS = 500
+CODE_MAX_CHARS = 1000
+
+# Valores por defecto cuando la columna falta o la celda está vacía
+DEFAULT_TITLE = 'Sin título'
+DEFAULT_CATEGORY = 'Python Básico'
+TEXT_DEFAULTS = {
+    'titulo': DEFAULT_TITLE,
+    'descripcion': '',
+    'ejemplos_codigo': '',
+    'categoria': DEFAULT_CATEGORY,
+    'url': ''
+}
+
+
+def normalize_lesson(row, index):
+    """
+    Convertir una fila del CSV en una lección lista para guardar
+    
+    Args:
+        row (dict): Fila con los valores como texto (None o '' si están vacíos)
+        index (int): Posición de la fila en el archivo (desde 0)
+    
+    Returns:
+        dict: Datos de la lección
+    """
+    numero = row.get('numero_leccion')
+    return {
+        'numero_leccion': int(float(numero)) if numero else index + 1,
+        'titulo': row.get('titulo') or DEFAULT_TITLE,
+        'descripcion': (row.get('descripcion') or '')[:DESCRIPTION_MAX_CHARS],
+        'ejemplos_codigo': (row.get('ejemplos_codigo') or '')[:CODE_MAX_CHARS],
+        'categoria': row.get('categoria') or DEFAULT_CATEGORY,
+        'url': row.get('url') or ''
+    }
+
+
+def iter_lessons_csv(filepath):
+    """
+    Recorrer un CSV devolviendo lecciones normalizadas una a una
+    
+    Args:
+        filepath (str): Ruta del archivo CSV
+    
+    Yields:
+        dict: Datos de cada lección
+    """
+    with open(filepath, encoding='utf-8-sig', newline='') as csv_file:
+        for index, row in enumerate(csv.DictReader(csv_file)):
+            yield normalize_lesson(row, index)
+
+
+def read_lessons_dataframe(filepath):
+    """
+    Leer un CSV completo con pandas y normalizarlo con operaciones por columna
+    
+    Args:
+        filepath (str): Ruta del archivo CSV
+    
+    Returns:
+        list: Lecciones normalizadas
+    """
+    import pandas as pd
+    
+    # Solo las celdas vacías cuentan como NaN ("None", "NA"... son texto válido)
+    df = pd.read_csv(
+        filepath,
+        encoding='utf-8-sig',
+        dtype=str,
+        keep_default_na=False,
+        na_values=['']
+    )
+    
+    # Columnas ausentes: se crean con su valor por defecto
+    for name, default in TEXT_DEFAULTS.items():
+        if name not in df:
+            df[name] = default
+    
+    fallback_numbers = pd.Series(range(1, len(df) + 1), index=df.index)
+    numbers = (
+        pd.to_numeric(df['numero_leccion'], errors='coerce').fillna(fallback_numbers)
+        if 'numero_leccion' in df else fallback_numbers
+    )
+    
+    normalized = pd.DataFrame({
+        'numero_leccion': numbers.astype(int),
+        'titulo': df['titulo'].fillna(DEFAULT_TITLE),
+        'descripcion': df['descripcion'].fillna('').str.slice(0, DESCRIPTION_MAX_CHARS),
+        'ejemplos_codigo': df['ejemplos_codigo'].fillna('').str.slice(0, CODE_MAX_CHARS),
+        'categoria': df['categoria'].fillna(DEFAULT_CATEGORY),
+        'url': df['url'].fillna('')
+    })
+    
+    return normalized.to_dict('records')
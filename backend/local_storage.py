@@ -0,0 +1,548 @@
+"""
+Backends de almacenamiento locales (memoria y SQLite)
+
+Implementan la misma interfaz que FirebaseService sin credenciales ni red,
+para desarrollo, pruebas de carga y medir el coste propio de la aplicación.
+"""
+from config import Config
+from backend.storage import StorageBackend
+from backend.catalog import project_lesson
+from backend.progress import new_progress, is_legacy_progress, migrate_legacy_progress, apply_completion
+from werkzeug.security import generate_password_hash, check_password_hash
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import threading
+import sqlite3
+import copy
+import json
+import uuid
+
+
+def _new_id():
+    """Generar un ID aleatorio con el mismo formato que los IDs automáticos de Firestore"""
+    return uuid.uuid4().hex[:20]
+
+
+def _hash_password(password):
+    """Hash de una contraseña con el método de LOCAL_PASSWORD_HASH_METHOD"""
+    return generate_password_hash(password, method=Config.LOCAL_PASSWORD_HASH_METHOD)
+
+
+class MemoryStorage(StorageBackend):
+    """Almacenamiento en la memoria del proceso (se pierde al reiniciar)"""
+    
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.RLock()
+        self._users = {}
+        self._password_hashes = {}
+        self._uid_by_username = {}
+        self._uid_by_email = {}
+        self._lessons = {}
+        self._catalog_version = None
+    
+    # ============================================
+    # OPERACIONES DE AUTENTICACIÓN
+    # ============================================
+    
+    def create_user(self, email, password, username):
+        """
+        Crear un nuevo usuario en memoria
+        
+        Returns:
+            tuple: (success, message, user_id)
+        """
+        password_hash = _hash_password(password)
+        
+        with self._lock:
+            if username in self._uid_by_username:
+                return False, "El usuario ya existe", None
+            if email in self._uid_by_email:
+                return False, "El email ya está registrado", None
+            
+            uid = _new_id()
+            self._users[uid] = self.new_user_document(username, email, datetime.now(timezone.utc))
+            self._password_hashes[uid] = password_hash
+            self._uid_by_username[username] = uid
+            self._uid_by_email[email] = uid
+        
+        return True, "Usuario registrado exitosamente", uid
+    
+    def verify_user(self, email, password):
+        """
+        Verificar credenciales de usuario
+        
+        Returns:
+            tuple: (success, message, user_data)
+        """
+        with self._lock:
+            uid = self._uid_by_email.get(email)
+            if uid is None:
+                return False, "Email no registrado", None
+            user_data = copy.deepcopy(self._users[uid])
+            password_hash = self._password_hashes[uid]
+        
+        if not check_password_hash(password_hash, password):
+            return False, "Contraseña incorrecta", None
+        
+        user_data['uid'] = uid
+        return True, "Login exitoso", user_data
+    
+    def get_user_by_username(self, username):
+        """
+        Buscar usuario por nombre de usuario
+        
+        Returns:
+            dict or None: username, uid y email del usuario o None si no existe
+        """
+        with self._lock:
+            uid = self._uid_by_username.get(username)
+            if uid is None:
+                return None
+            return {'username': username, 'uid': uid, 'email': self._users[uid]['email']}
+    
+    def email_exists(self, email):
+        """Verificar si un email ya está registrado"""
+        with self._lock:
+            return email in self._uid_by_email
+    
+    # ============================================
+    # OPERACIONES DE LECCIONES
+    # ============================================
+    
+    def _insert_lesson(self, lesson_data):
+        lesson_id = _new_id()
+        with self._lock:
+            self._lessons[lesson_id] = dict(lesson_data)
+        return lesson_id
+    
+    def _new_lesson_id(self):
+        return _new_id()
+    
+    def _write_lessons_chunk(self, items):
+        with self._lock:
+            for lesson_id, lesson_data in items:
+                self._lessons[lesson_id] = dict(lesson_data)
+    
+    def _delete_lesson(self, lesson_id):
+        with self._lock:
+            self._lessons.pop(lesson_id, None)
+    
+    def _iter_lesson_id_pages(self, category, page_size):
+        with self._lock:
+            lesson_ids = [
+                lesson_id for lesson_id, lesson in self._lessons.items()
+                if category is None or lesson.get('categoria') == category
+            ]
+        for start in range(0, len(lesson_ids), page_size):
+            yield lesson_ids[start:start + page_size]
+    
+    def _fetch_lesson_hashes(self):
+        with self._lock:
+            return {
+                lesson_id: lesson.get('content_hash')
+                for lesson_id, lesson in self._lessons.items()
+            }
+    
+    def _fetch_catalog_version(self):
+        return self._catalog_version
+    
+    def _store_catalog_version(self, version):
+        self._catalog_version = version
+    
+    def _sorted_lessons(self, category=None):
+        with self._lock:
+            lessons = [
+                {**lesson, 'id': lesson_id}
+                for lesson_id, lesson in self._lessons.items()
+                if category is None or lesson.get('categoria') == category
+            ]
+        return sorted(lessons, key=lambda lesson: lesson.get('numero_leccion', 0))
+    
+    def _fetch_lessons_by_category(self, category, fields=None):
+        return [project_lesson(lesson, fields) for lesson in self._sorted_lessons(category)]
+    
+    def _fetch_all_lessons(self, fields=None):
+        return [project_lesson(lesson, fields) for lesson in self._sorted_lessons()]
+    
+    def _fetch_lessons_page(self, category, limit, after, fields=None):
+        lessons = self._sorted_lessons(category)
+        if after is not None:
+            lessons = [lesson for lesson in lessons if lesson.get('numero_leccion', 0) > after]
+        return [project_lesson(lesson, fields) for lesson in lessons[:limit]]
+    
+    def _fetch_lesson(self, lesson_id):
+        with self._lock:
+            lesson = self._lessons.get(lesson_id)
+            if lesson is None:
+                return None
+            return project_lesson({**lesson, 'id': lesson_id}, None)
+    
+    # ============================================
+    # OPERACIONES DE PROGRESO DEL USUARIO
+    # ============================================
+    
+    def _complete_lesson(self, user_id, lesson):
+        """
+        Marcar una lección como completada
+        
+        Returns:
+            tuple: (success, message, progress)
+        """
+        with self._lock:
+            user_data = self._users.get(user_id)
+            if user_data is None:
+                return False, "Usuario no encontrado", None
+            
+            progress = user_data.setdefault('progress', new_progress())
+            if is_legacy_progress(progress):
+                progress, _ = migrate_legacy_progress(progress, self.get_all_lessons())
+                user_data['progress'] = progress
+            
+            changed = apply_completion(progress, lesson)
+            return True, "Progreso actualizado" if changed else "Sin cambios", self.progress_summary(progress)
+    
+    def migrate_progress(self):
+        """
+        Convertir el progreso de los usuarios antiguos al formato compacto
+        
+        Returns:
+            tuple: (success, message, migrated_users)
+        """
+        catalog = self.get_all_lessons()
+        migrated = 0
+        with self._lock:
+            for user_data in self._users.values():
+                progress = user_data.get('progress', {})
+                if is_legacy_progress(progress):
+                    user_data['progress'], _ = migrate_legacy_progress(progress, catalog)
+                    migrated += 1
+        return True, "Progreso migrado", migrated
+    
+    def _fetch_user_progress(self, user_id):
+        with self._lock:
+            user_data = self._users.get(user_id)
+            if user_data is None:
+                return None
+            return copy.deepcopy(user_data.get('progress', {}))
+    
+    def progress_version(self, user_id):
+        """Versión guardada del progreso (sin copiar el documento)"""
+        with self._lock:
+            user_data = self._users.get(user_id)
+            if user_data is None:
+                return None
+            return user_data.get('progress', {}).get('version', 0)
+
+
+class SQLiteStorage(StorageBackend):
+    """Almacenamiento persistente en un archivo SQLite"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            uid TEXT PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
+            email TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            progress TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS lessons (
+            id TEXT PRIMARY KEY,
+            numero_leccion INTEGER,
+            categoria TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_lessons_numero ON lessons (numero_leccion);
+        CREATE INDEX IF NOT EXISTS idx_lessons_categoria ON lessons (categoria, numero_leccion);
+        CREATE TABLE IF NOT EXISTS metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+    
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Ruta del archivo SQLite (':memory:' para una base temporal)
+        """
+        super().__init__()
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+    
+    @contextmanager
+    def _transaction(self):
+        """Ejecutar un bloque en una transacción exclusiva de escritura"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            else:
+                self._conn.execute('COMMIT')
+    
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+    
+    @staticmethod
+    def _user_from_row(row):
+        return {
+            'username': row['username'],
+            'email': row['email'],
+            'created_at': row['created_at'],
+            'progress': json.loads(row['progress']),
+            'uid': row['uid']
+        }
+    
+    @staticmethod
+    def _lesson_from_row(row):
+        return {**json.loads(row['data']), 'id': row['id']}
+    
+    # ============================================
+    # OPERACIONES DE AUTENTICACIÓN
+    # ============================================
+    
+    def create_user(self, email, password, username):
+        """
+        Crear un nuevo usuario en SQLite
+        
+        Returns:
+            tuple: (success, message, user_id)
+        """
+        uid = _new_id()
+        document = self.new_user_document(username, email, datetime.now(timezone.utc).isoformat())
+        
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    'INSERT INTO users (uid, username, email, password_hash, created_at, progress) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (uid, username, email, _hash_password(password),
+                     document['created_at'], json.dumps(document['progress']))
+                )
+            return True, "Usuario registrado exitosamente", uid
+        
+        except sqlite3.IntegrityError as e:
+            if 'email' in str(e):
+                return False, "El email ya está registrado", None
+            return False, "El usuario ya existe", None
+        except Exception as e:
+            return False, f"Error al crear usuario: {str(e)}", None
+    
+    def verify_user(self, email, password):
+        """
+        Verificar credenciales de usuario
+        
+        Returns:
+            tuple: (success, message, user_data)
+        """
+        try:
+            rows = self._query('SELECT * FROM users WHERE email = ?', (email,))
+            if not rows:
+                return False, "Email no registrado", None
+            
+            if not check_password_hash(rows[0]['password_hash'], password):
+                return False, "Contraseña incorrecta", None
+            
+            return True, "Login exitoso", self._user_from_row(rows[0])
+        
+        except Exception as e:
+            return False, f"Error al verificar usuario: {str(e)}", None
+    
+    def get_user_by_username(self, username):
+        """
+        Buscar usuario por nombre de usuario
+        
+        Returns:
+            dict or None: username, uid y email del usuario o None si no existe
+        """
+        try:
+            rows = self._query('SELECT uid, email FROM users WHERE username = ?', (username,))
+            if not rows:
+                return None
+            return {'username': username, 'uid': rows[0]['uid'], 'email': rows[0]['email']}
+        except Exception as e:
+            print(f"Error al buscar usuario: {str(e)}")
+            return None
+    
+    def email_exists(self, email):
+        """Verificar si un email ya está registrado"""
+        return bool(self._query('SELECT 1 FROM users WHERE email = ?', (email,)))
+    
+    # ============================================
+    # OPERACIONES DE LECCIONES
+    # ============================================
+    
+    def _insert_lesson(self, lesson_data):
+        lesson_id = _new_id()
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO lessons (id, numero_leccion, categoria, data) VALUES (?, ?, ?, ?)',
+                (lesson_id, lesson_data.get('numero_leccion'), lesson_data.get('categoria'),
+                 json.dumps(lesson_data, ensure_ascii=False))
+            )
+        return lesson_id
+    
+    def _new_lesson_id(self):
+        return _new_id()
+    
+    def _write_lessons_chunk(self, items):
+        with self._transaction() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO lessons (id, numero_leccion, categoria, data) VALUES (?, ?, ?, ?)',
+                [
+                    (lesson_id, lesson_data.get('numero_leccion'), lesson_data.get('categoria'),
+                     json.dumps(lesson_data, ensure_ascii=False))
+                    for lesson_id, lesson_data in items
+                ]
+            )
+    
+    def _delete_lesson(self, lesson_id):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM lessons WHERE id = ?', (lesson_id,))
+    
+    def _delete_lessons_chunk(self, lesson_ids):
+        with self._transaction() as conn:
+            conn.executemany('DELETE FROM lessons WHERE id = ?', [(lesson_id,) for lesson_id in lesson_ids])
+    
+    def _iter_lesson_id_pages(self, category, page_size):
+        last_id = ''
+        while True:
+            if category:
+                rows = self._query(
+                    'SELECT id FROM lessons WHERE categoria = ? AND id > ? ORDER BY id LIMIT ?',
+                    (category, last_id, page_size)
+                )
+            else:
+                rows = self._query(
+                    'SELECT id FROM lessons WHERE id > ? ORDER BY id LIMIT ?',
+                    (last_id, page_size)
+                )
+            if not rows:
+                return
+            
+            yield [row['id'] for row in rows]
+            last_id = rows[-1]['id']
+    
+    def _fetch_lesson_hashes(self):
+        rows = self._query("SELECT id, json_extract(data, '$.content_hash') AS content_hash FROM lessons")
+        return {row['id']: row['content_hash'] for row in rows}
+    
+    def _fetch_catalog_version(self):
+        rows = self._query("SELECT value FROM metadata WHERE key = 'catalog_version'")
+        return rows[0]['value'] if rows else None
+    
+    def _store_catalog_version(self, version):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO metadata (key, value) VALUES ('catalog_version', ?)",
+                (version,)
+            )
+    
+    def _fetch_lessons_by_category(self, category, fields=None):
+        rows = self._query(
+            'SELECT id, data FROM lessons WHERE categoria = ? ORDER BY numero_leccion',
+            (category,)
+        )
+        return [project_lesson(self._lesson_from_row(row), fields) for row in rows]
+    
+    def _fetch_all_lessons(self, fields=None):
+        rows = self._query('SELECT id, data FROM lessons ORDER BY numero_leccion')
+        return [project_lesson(self._lesson_from_row(row), fields) for row in rows]
+    
+    def _fetch_lessons_page(self, category, limit, after, fields=None):
+        conditions, params = [], []
+        if category:
+            conditions.append('categoria = ?')
+            params.append(category)
+        if after is not None:
+            conditions.append('numero_leccion > ?')
+            params.append(after)
+        
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+        rows = self._query(
+            f'SELECT id, data FROM lessons {where}ORDER BY numero_leccion LIMIT ?',
+            (*params, limit)
+        )
+        return [project_lesson(self._lesson_from_row(row), fields) for row in rows]
+    
+    def _fetch_lesson(self, lesson_id):
+        rows = self._query('SELECT id, data FROM lessons WHERE id = ?', (lesson_id,))
+        return project_lesson(self._lesson_from_row(rows[0]), None) if rows else None
+    
+    # ============================================
+    # OPERACIONES DE PROGRESO DEL USUARIO
+    # ============================================
+    
+    def _complete_lesson(self, user_id, lesson):
+        """
+        Marcar una lección como completada en una transacción
+        
+        Returns:
+            tuple: (success, message, progress)
+        """
+        try:
+            catalog = self.get_all_lessons()
+            with self._transaction() as conn:
+                row = conn.execute('SELECT progress FROM users WHERE uid = ?', (user_id,)).fetchone()
+                if row is None:
+                    return False, "Usuario no encontrado", None
+                
+                progress = json.loads(row['progress'])
+                migrated = is_legacy_progress(progress)
+                if migrated:
+                    progress, _ = migrate_legacy_progress(progress, catalog)
+                changed = apply_completion(progress, lesson)
+                
+                if changed or migrated:
+                    conn.execute(
+                        'UPDATE users SET progress = ? WHERE uid = ?',
+                        (json.dumps(progress), user_id)
+                    )
+            return True, "Progreso actualizado" if changed else "Sin cambios", self.progress_summary(progress)
+        
+        except Exception as e:
+            return False, f"Error al actualizar progreso: {str(e)}", None
+    
+    def migrate_progress(self):
+        """
+        Convertir el progreso de los usuarios antiguos al formato compacto
+        
+        Returns:
+            tuple: (success, message, migrated_users)
+        """
+        try:
+            catalog = self.get_all_lessons()
+            migrated = 0
+            with self._transaction() as conn:
+                rows = conn.execute('SELECT uid, progress FROM users').fetchall()
+                for row in rows:
+                    progress = json.loads(row['progress'])
+                    if not is_legacy_progress(progress):
+                        continue
+                    progress, _ = migrate_legacy_progress(progress, catalog)
+                    conn.execute(
+                        'UPDATE users SET progress = ? WHERE uid = ?',
+                        (json.dumps(progress), row['uid'])
+                    )
+                    migrated += 1
+            return True, "Progreso migrado", migrated
+        except Exception as e:
+            return False, f"Error al migrar progreso: {str(e)}", 0
+    
+    def _fetch_user_progress(self, user_id):
+        rows = self._query('SELECT progress FROM users WHERE uid = ?', (user_id,))
+        return json.loads(rows[0]['progress']) if rows else None
+    
+    def progress_version(self, user_id):
+        """Versión guardada del progreso (sin leer el resto del documento)"""
+        rows = self._query("SELECT json_extract(progress, '$.version') AS version FROM users WHERE uid = ?", (user_id,))
+        return (rows[0]['version'] or 0) if rows else None
@@ -0,0 +1,573 @@
+"""
+Métricas de la aplicación en formato de exposición de Prometheus (/metrics)
+
+Registra por endpoint la latencia (histograma), las respuestas por código de
+estado y las peticiones en curso, y por método del backend de almacenamiento
+el número de llamadas y su duración.
+
+Cada proceso acumula sus métricas en memoria. Con varios workers (gunicorn)
+se define METRICS_DIR: cada worker vuelca ahí su copia cada
+METRICS_FLUSH_INTERVAL segundos y /metrics suma las de todos los procesos.
+El archivo de cada worker lleva su PID y el instante en que arrancó, así
+que un worker nuevo que reutiliza un PID no pisa las métricas del anterior.
+Los contadores e histogramas de los workers terminados se suman a un único
+archivo agregado (retired-metrics.json) y sus archivos se borran, en el hook
+child_exit de gunicorn o al servir /metrics.
+
+/metrics solo responde a los administradores (ADMIN_USERNAMES) con sesión
+iniciada o con 'Authorization: Bearer <METRICS_TOKEN>' (ver backend/access.py).
+"""
+from config import Config
+from backend import access
+from contextlib import contextmanager
+from functools import wraps
+import glob
+import contextvars
+import inspect
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # sin fcntl (Windows) no se agregan los workers terminados
+    fcntl = None
+
+
+# Límites superiores de los histogramas de latencia (segundos)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Nombre, tipo y descripción de cada métrica
+METRICS = {
+    'http_requests_total': ('counter', 'Respuestas por endpoint, método y código de estado'),
+    'http_request_duration_seconds': ('histogram', 'Latencia de las peticiones por endpoint'),
+    'http_requests_in_progress': ('gauge', 'Peticiones en curso por endpoint'),
+    'storage_calls_total': ('counter', 'Llamadas a métodos del backend de almacenamiento'),
+    'storage_call_duration_seconds': ('histogram', 'Duración de las llamadas al backend de almacenamiento')
+}
+
+# Contadores e histogramas acumulados de los workers terminados (en METRICS_DIR)
+RETIRED_FILE = 'retired-metrics.json'
+
+
+class MetricsRegistry:
+    """Contadores, gauges e histogramas de un proceso (seguro entre hilos)"""
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._last_flush = 0.0
+        self.reset()
+    
+    def reset(self):
+        """Vaciar las métricas (también en el hijo tras un fork)"""
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.filename = _metrics_filename(os.getpid())
+    
+    def inc(self, name, labels, value=1):
+        """Sumar a un contador"""
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def add(self, name, labels, value):
+        """Sumar (o restar) a un gauge"""
+        key = (name, labels)
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+    
+    def observe(self, name, labels, seconds):
+        """Registrar una duración en un histograma"""
+        key = (name, labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # Cuenta por tramo (el último es +Inf) y suma de las duraciones
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+    
+    def snapshot(self):
+        """
+        Copia de las métricas serializable en JSON
+        
+        Returns:
+            dict: counters, gauges e histograms como listas [nombre, etiquetas, valor]
+        """
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'gauges': [[name, list(labels), value] for (name, labels), value in self.gauges.items()],
+                'histograms': [[name, list(labels), [list(counts), total]]
+                               for (name, labels), (counts, total) in self.histograms.items()]
+            }
+    
+    def flush(self, directory, interval=0):
+        """Volcar la copia de este proceso en directory (como mucho una vez por intervalo)"""
+        now = time.monotonic()
+        if now - self._last_flush < interval:
+            return
+        self._last_flush = now
+        
+        path = os.path.join(directory, self.filename)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+
+def _process_start(pid):
+    """Instante de arranque de un proceso (ticks desde el arranque del sistema, de /proc) o None"""
+    try:
+        with open(f'/proc/{pid}/stat', encoding='ascii') as f:
+            # Campo 22 de stat; el nombre del proceso (campo 2) puede llevar espacios
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _metrics_filename(pid):
+    """Archivo de un proceso en METRICS_DIR: metrics-<pid>-<arranque>.json"""
+    started = _process_start(pid) or str(int(time.time() * 1000))
+    return f"metrics-{pid}-{started}.json"
+
+
+def _parse_filename(filename):
+    """
+    PID y arranque de un archivo de métricas
+    
+    Returns:
+        tuple: (pid, arranque), con arranque None en los archivos metrics-<pid>.json anteriores
+    """
+    pid, _, started = filename[len('metrics-'):-len('.json')].partition('-')
+    return int(pid), started or None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _process_alive(pid, started):
+    """Sigue vivo el proceso que escribió el archivo (mismo PID y mismo arranque)"""
+    current = _process_start(pid)
+    if current is None or started is None:
+        # Sin /proc (o archivo antiguo) solo se puede comprobar el PID
+        return _pid_alive(pid)
+    return current == started
+
+
+@contextmanager
+def _directory_lock(directory):
+    """Bloqueo exclusivo de METRICS_DIR entre procesos (lectura y agregación)"""
+    with open(os.path.join(directory, 'metrics.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load_snapshot(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _retire(directory, paths):
+    """
+    Sumar los contadores e histogramas de los archivos paths a RETIRED_FILE y borrarlos
+    
+    Se llama con el bloqueo de directory tomado.
+    """
+    retired_path = os.path.join(directory, RETIRED_FILE)
+    snapshots = [_load_snapshot(retired_path) or {'counters': [], 'gauges': [], 'histograms': []}]
+    for path in paths:
+        snapshot = _load_snapshot(path)
+        if snapshot is not None:
+            # Las peticiones en curso de un proceso terminado ya no existen
+            snapshot['gauges'] = []
+            snapshots.append(snapshot)
+    
+    merged = _merge(snapshots)
+    with open(retired_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(_as_snapshot(merged), f)
+    os.replace(retired_path + '.tmp', retired_path)
+    
+    for path in paths:
+        for leftover in (path, path + '.tmp'):
+            try:
+                os.remove(leftover)
+            except FileNotFoundError:
+                pass
+
+
+def retire_worker(pid, directory=None):
+    """
+    Agregar y borrar el archivo de un worker que acaba de terminar
+    
+    Lo llama el proceso maestro de gunicorn (child_exit en gunicorn.conf.py).
+    
+    Args:
+        pid (int): PID del worker terminado
+        directory (str, optional): Carpeta de las métricas (por defecto Config.METRICS_DIR)
+    """
+    directory = directory or Config.METRICS_DIR
+    if not directory or fcntl is None or not os.path.isdir(directory):
+        return
+    with _directory_lock(directory):
+        paths = [
+            path for path in glob.glob(os.path.join(directory, 'metrics-*.json'))
+            if _parse_filename(os.path.basename(path))[0] == pid
+        ]
+        if paths:
+            _retire(directory, paths)
+
+
+def collect(registry, directory=None):
+    """
+    Sumar las métricas de este proceso, las volcadas por los demás y las de
+    los procesos ya terminados
+    
+    Los archivos de procesos terminados se agregan antes a RETIRED_FILE y se
+    borran: sus contadores e histogramas se conservan (son totales
+    acumulados) y sus gauges se descartan.
+    
+    Returns:
+        dict: Métricas sumadas por tipo ({(nombre, etiquetas): valor})
+    """
+    snapshots = [registry.snapshot()]
+    if not directory:
+        return _merge(snapshots)
+    
+    if fcntl is None:
+        snapshots.extend(_read_directory(directory, registry.filename))
+        return _merge(snapshots)
+    
+    with _directory_lock(directory):
+        dead = [
+            path for path in glob.glob(os.path.join(directory, 'metrics-*.json'))
+            if os.path.basename(path) != registry.filename
+            and not _process_alive(*_parse_filename(os.path.basename(path)))
+        ]
+        if dead:
+            _retire(directory, dead)
+        snapshots.extend(_read_directory(directory, registry.filename))
+    return _merge(snapshots)
+
+
+def _read_directory(directory, own_file):
+    """Copias volcadas por los demás procesos y el agregado de los terminados"""
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')) + [os.path.join(directory, RETIRED_FILE)]:
+        filename = os.path.basename(path)
+        if filename == own_file:
+            continue
+        snapshot = _load_snapshot(path)
+        if snapshot is None:
+            continue
+        if filename != RETIRED_FILE and not _process_alive(*_parse_filename(filename)):
+            snapshot['gauges'] = []
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def _merge(snapshots):
+    """Sumar varias copias de MetricsRegistry.snapshot()"""
+    merged = {'counters': {}, 'gauges': {}, 'histograms': {}}
+    for snapshot in snapshots:
+        for kind in ('counters', 'gauges'):
+            for name, labels, value in snapshot[kind]:
+                key = (name, tuple(tuple(label) for label in labels))
+                merged[kind][key] = merged[kind].get(key, 0) + value
+        for name, labels, (counts, total) in snapshot['histograms']:
+            key = (name, tuple(tuple(label) for label in labels))
+            current = merged['histograms'].setdefault(key, [[0] * len(counts), 0.0])
+            current[0] = [a + b for a, b in zip(current[0], counts)]
+            current[1] += total
+    return merged
+
+
+def _as_snapshot(merged):
+    """Métricas sumadas (_merge) con la forma serializable de MetricsRegistry.snapshot()"""
+    return {
+        kind: [[name, [list(label) for label in labels], list(value) if kind == 'histograms' else value]
+               for (name, labels), value in merged[kind].items()]
+        for kind in ('counters', 'gauges', 'histograms')
+    }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def render(metrics, buckets=LATENCY_BUCKETS):
+    """
+    Texto en formato de exposición de Prometheus
+    
+    Args:
+        metrics (dict): Resultado de collect()
+        buckets (tuple): Límites de los histogramas
+    
+    Returns:
+        str: Cuerpo de la respuesta de /metrics
+    """
+    by_name = {}
+    for kind in ('counters', 'gauges', 'histograms'):
+        for (name, labels), value in metrics[kind].items():
+            by_name.setdefault(name, []).append((labels, value))
+    
+    lines = []
+    for name, (metric_type, description) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in sorted(by_name.get(name, []), key=lambda item: item[0]):
+            if metric_type != 'histogram':
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(tuple(buckets) + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+if hasattr(os, 'register_at_fork'):
+    # Cada worker empieza con sus propias métricas
+    os.register_at_fork(after_in_child=registry.reset)
+
+
+def instrument_storage(backend):
+    """
+    Medir las llamadas a los métodos públicos de un backend de almacenamiento
+    
+    Sustituye en la instancia cada método por una envoltura que cuenta las
+    llamadas (con outcome 'ok' o 'error' si lanza una excepción) y registra
+    su duración. Los métodos estáticos y las propiedades no se tocan.
+    
+    Solo se mide la llamada más externa de cada petición: los métodos
+    públicos que llama otro método público (get_lesson_by_id dentro de
+    complete_lesson, catalog_version dentro de get_lessons_page, el backend
+    síncrono dentro de AsyncStorage...) ya están incluidos en su duración y
+    no se cuentan otra vez. Los métodos async se miden hasta que terminan.
+    
+    Args:
+        backend (StorageBackend or AsyncStorage): Instancia a medir (se modifica en el sitio)
+    
+    Returns:
+        StorageBackend or AsyncStorage: La misma instancia
+    """
+    if getattr(backend, '_metrics_instrumented', False):
+        return backend
+    
+    for name in dir(type(backend)):
+        if name.startswith('_') or not inspect.isfunction(inspect.getattr_static(type(backend), name)):
+            continue
+        setattr(backend, name, _timed(name, getattr(backend, name)))
+    
+    backend._metrics_instrumented = True
+    return backend
+
+
+# Llamada medida en curso (las anidadas no se cuentan). Es un ContextVar:
+# cada hilo y cada tarea de asyncio tiene el suyo, y AsyncStorage lo copia
+# al hilo que ejecuta el backend síncrono
+_storage_call = contextvars.ContextVar('storage_call', default=False)
+
+
+def _record_storage_call(labels, start, outcome):
+    registry.observe('storage_call_duration_seconds', labels, time.perf_counter() - start)
+    registry.inc('storage_calls_total', labels + (('outcome', outcome),))
+
+
+def _timed(name, method):
+    labels = (('method', name),)
+    
+    if inspect.iscoroutinefunction(method):
+        @wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            if _storage_call.get():
+                return await method(*args, **kwargs)
+            
+            token = _storage_call.set(True)
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = await method(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                _storage_call.reset(token)
+                _record_storage_call(labels, start, outcome)
+        return async_wrapper
+    
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        if _storage_call.get():
+            return method(*args, **kwargs)
+        
+        token = _storage_call.set(True)
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = method(*args, **kwargs)
+            outcome = 'ok'
+            return result
+        finally:
+            _storage_call.reset(token)
+            _record_storage_call(labels, start, outcome)
+    return wrapper
+
+
+def is_authorized(authorization, username):
+    """
+    /metrics solo para administradores o con el token de METRICS_TOKEN
+    
+    Args:
+        authorization (str or None): Cabecera Authorization ('Bearer <token>')
+        username (str or None): Usuario de la sesión
+    """
+    return access.is_admin(username) or access.token_matches(access.bearer_token(authorization), Config.METRICS_TOKEN)
+
+
+def start_request_metrics(endpoint):
+    """
+    Contar una petición en curso
+    
+    Returns:
+        float: Instante de inicio (para finish_request_metrics)
+    """
+    registry.add('http_requests_in_progress', (('endpoint', endpoint),), 1)
+    return time.perf_counter()
+
+
+def record_response_metrics(endpoint, method, status_code, start):
+    """Registrar la latencia y el código de estado de una respuesta"""
+    labels = (('endpoint', endpoint), ('method', method))
+    registry.observe('http_request_duration_seconds', labels, time.perf_counter() - start)
+    registry.inc('http_requests_total', labels + (('status', str(status_code)),))
+
+
+def finish_request_metrics(endpoint):
+    """Descontar la petición en curso y volcar las métricas si hay METRICS_DIR"""
+    if endpoint is not None:
+        registry.add('http_requests_in_progress', (('endpoint', endpoint),), -1)
+    if Config.METRICS_DIR:
+        registry.flush(Config.METRICS_DIR, Config.METRICS_FLUSH_INTERVAL)
+
+
+def metrics_body():
+    """Métricas de todos los procesos en formato de Prometheus"""
+    return render(collect(registry, Config.METRICS_DIR))
+
+
+def init_metrics(app, storage):
+    """
+    Registrar las métricas de las peticiones y el endpoint /metrics
+    
+    Args:
+        app (Flask): Aplicación
+        storage (StorageBackend): Backend cuyos métodos se miden
+    """
+    if not Config.METRICS_ENABLED:
+        return
+    
+    from flask import g, request, session
+    
+    instrument_storage(storage)
+    if Config.METRICS_DIR:
+        os.makedirs(Config.METRICS_DIR, exist_ok=True)
+    
+    @app.before_request
+    def start_request_metrics_hook():
+        # Solo la regla de la ruta (no la URL) para no multiplicar las series
+        g.metrics_endpoint = request.endpoint or 'sin_ruta'
+        g.metrics_start = start_request_metrics(g.metrics_endpoint)
+    
+    @app.after_request
+    def record_request_metrics(response):
+        endpoint = g.get('metrics_endpoint')
+        if endpoint is not None:
+            record_response_metrics(endpoint, request.method, response.status_code, g.metrics_start)
+        return response
+    
+    @app.teardown_request
+    def finish_request_metrics_hook(error):
+        finish_request_metrics(g.pop('metrics_endpoint', None))
+    
+    @app.route('/metrics')
+    def metrics():
+        """Métricas de todos los procesos en formato de Prometheus (ver is_authorized)"""
+        if not is_authorized(request.headers.get('Authorization'), session.get('username')):
+            return app.response_class('Acceso denegado\n', status=403, content_type=CONTENT_TYPE)
+        return app.response_class(metrics_body(), content_type=CONTENT_TYPE)
+
+
+def init_metrics_async(app, storage):
+    """
+    Lo mismo que init_metrics para la aplicación Quart (asgi.py)
+    
+    Args:
+        app (Quart): Aplicación
+        storage (AsyncStorage): Almacenamiento del modo asíncrono cuyos métodos se miden
+    """
+    if not Config.METRICS_ENABLED:
+        return
+    
+    from quart import g, request, session
+    
+    instrument_storage(storage)
+    if Config.METRICS_DIR:
+        os.makedirs(Config.METRICS_DIR, exist_ok=True)
+    
+    @app.before_request
+    async def start_request_metrics_hook():
+        g.metrics_endpoint = request.endpoint or 'sin_ruta'
+        g.metrics_start = start_request_metrics(g.metrics_endpoint)
+    
+    @app.after_request
+    async def record_request_metrics(response):
+        endpoint = g.get('metrics_endpoint')
+        if endpoint is not None:
+            record_response_metrics(endpoint, request.method, response.status_code, g.metrics_start)
+        return response
+    
+    @app.teardown_request
+    async def finish_request_metrics_hook(error):
+        finish_request_metrics(g.pop('metrics_endpoint', None))
+    
+    @app.route('/metrics')
+    async def metrics():
+        """Métricas de todos los procesos en formato de Prometheus (ver is_authorized)"""
+        if not is_authorized(request.headers.get('Authorization'), session.get('username')):
+            return app.response_class('Acceso denegado\n', status=403, content_type=CONTENT_TYPE)
+        return app.response_class(metrics_body(), content_type=CONTENT_TYPE)
@@ -0,0 +1,205 @@
+"""
+Perfilado de peticiones con cProfile (modo opcional para staging o local)
+
+Con PROFILING_ENABLED se perfila:
+- cualquier petición que lo pida con la cabecera X-Profile: 1 o ?profile=1,
+  solo con sesión de un usuario de ADMIN_USERNAMES o con la cabecera
+  X-Profile-Token igual a PROFILE_TOKEN (nunca por la dirección del cliente:
+  detrás de nginx todas llegan desde 127.0.0.1);
+- una fracción PROFILE_SAMPLE_RATE de todas las peticiones.
+
+Por cada petición perfilada se escriben en PROFILE_DIR dos archivos con el
+endpoint en el nombre: <...>.prof (pstats, para snakeviz o pstats.Stats) y
+<...>.collapsed (pilas colapsadas para flamegraph.pl o speedscope). Al
+terminar la petición solo se vuelca el .prof; el .collapsed se genera en un
+hilo aparte, o a mano con:
+    python -m backend.profiling profiles/<...>.prof
+
+Sin PROFILING_ENABLED no se registra ningún hook, así que el coste es nulo.
+"""
+from config import Config
+from backend import access
+from concurrent.futures import ThreadPoolExecutor
+import cProfile
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+
+
+# Solo una petición perfilada a la vez (cProfile no admite varios perfiles activos)
+_profile_lock = threading.Lock()
+
+# Hilo que genera los .collapsed fuera de las peticiones (se crea en el primer uso)
+_collapse_executor = None
+
+
+def _reset_collapse_executor():
+    global _collapse_executor
+    _collapse_executor = None
+
+
+def is_authorized(profile_token, username):
+    """
+    Perfilar a petición solo como administrador o con el token de PROFILE_TOKEN
+    
+    Args:
+        profile_token (str or None): Cabecera X-Profile-Token
+        username (str or None): Usuario de la sesión
+    """
+    return access.is_admin(username) or access.token_matches(profile_token, Config.PROFILE_TOKEN)
+
+
+def _frame_name(function):
+    filename, line, name = function
+    if filename == '~':
+        # Funciones integradas: '<built-in method ...>'
+        return name.replace(';', ':')
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(';', ':')
+
+
+def collapsed_stacks(stats, max_depth=64, max_paths=None):
+    """
+    Pilas colapsadas a partir de las estadísticas de cProfile
+    
+    cProfile guarda el grafo de llamadas (quién llama a quién), no cada pila,
+    así que las pilas se reconstruyen como hace gprof2dot: el tiempo propio de
+    cada función se reparte entre sus llamantes en proporción al tiempo
+    acumulado que aporta cada uno.
+    
+    El número de caminos crece de forma exponencial con los llamantes de
+    cada función, así que se limita: las ramas de menos de 1 µs no se
+    expanden y, pasados max_paths caminos, cada rama se corta donde está (su
+    tiempo se conserva en una pila más corta).
+    
+    Args:
+        stats (pstats.Stats): Estadísticas de una petición
+        max_depth (int): Profundidad máxima de las pilas
+        max_paths (int, optional): Caminos expandidos como máximo (por defecto PROFILE_MAX_PATHS)
+    
+    Returns:
+        dict: {"raiz;...;funcion": microsegundos}
+    """
+    entries = stats.stats
+    stacks = {}
+    budget = [max_paths or Config.PROFILE_MAX_PATHS]
+    
+    def add_paths(function, suffix, weight, visited):
+        callers = entries[function][4]
+        total = sum(caller_stats[3] for caller_stats in callers.values())
+        budget[0] -= 1
+        if (not callers or total <= 0 or len(suffix) >= max_depth or weight < 1e-6
+                or budget[0] <= 0):
+            key = ';'.join(reversed(suffix))
+            stacks[key] = stacks.get(key, 0) + weight
+            return
+        for caller, caller_stats in callers.items():
+            if caller in visited or caller not in entries:
+                continue
+            add_paths(caller, suffix + [_frame_name(caller)], weight * caller_stats[3] / total,
+                      visited | {caller})
+    
+    for function, (_, _, own_time, _, _) in entries.items():
+        if own_time > 0:
+            add_paths(function, [_frame_name(function)], own_time, {function})
+    
+    return {stack: int(seconds * 1_000_000) for stack, seconds in stacks.items() if seconds * 1_000_000 >= 1}
+
+
+def write_collapsed(prof_path):
+    """
+    Generar el .collapsed de un .prof ya guardado
+    
+    Returns:
+        str: Ruta del archivo .collapsed
+    """
+    stacks = collapsed_stacks(pstats.Stats(prof_path))
+    path = os.path.splitext(prof_path)[0] + '.collapsed'
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        for stack, microseconds in sorted(stacks.items()):
+            f.write(f"{stack} {microseconds}\n")
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def write_profile(profile, endpoint, directory=None, collapse=True):
+    """
+    Guardar el perfil de una petición (.prof) y encargar su .collapsed
+    
+    Args:
+        collapse (bool): Generar el .collapsed en el hilo de fondo (False: solo el .prof)
+    
+    Returns:
+        str: Ruta del archivo .prof
+    """
+    global _collapse_executor
+    
+    directory = directory or Config.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    
+    tag = re.sub(r'[^A-Za-z0-9_.-]+', '_', endpoint)
+    base = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{tag}")
+    
+    profile.dump_stats(base + '.prof')
+    if collapse:
+        if _collapse_executor is None:
+            _collapse_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile-collapse')
+        _collapse_executor.submit(write_collapsed, base + '.prof')
+    return base + '.prof'
+
+
+def init_profiling(app):
+    """Registrar el perfilado de peticiones (solo con PROFILING_ENABLED)"""
+    if not Config.PROFILING_ENABLED:
+        return
+    
+    from flask import g, request, session
+    
+    @app.before_request
+    def start_profile():
+        requested = request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'
+        if requested and not is_authorized(request.headers.get('X-Profile-Token'), session.get('username')):
+            requested = False
+        if not requested and random.random() >= Config.PROFILE_SAMPLE_RATE:
+            return
+        if not _profile_lock.acquire(blocking=False):
+            return
+        
+        g.profile = cProfile.Profile()
+        g.profile_requested = requested
+        g.profile.enable()
+    
+    @app.after_request
+    def add_profile_header(response):
+        if g.get('profile_requested'):
+            # El archivo se escribe al final (teardown); su nombre lleva el endpoint
+            response.headers['X-Profile-Endpoint'] = request.endpoint or 'sin_ruta'
+        return response
+    
+    @app.teardown_request
+    def finish_profile(error):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        profile.disable()
+        try:
+            path = write_profile(profile, request.endpoint or 'sin_ruta')
+            app.logger.info("Perfil de %s %s guardado en %s", request.method, request.path, path)
+        except Exception as e:
+            app.logger.warning("No se pudo guardar el perfil: %s", e)
+        finally:
+            _profile_lock.release()
+
+
+if hasattr(os, 'register_at_fork'):
+    # El hilo de fondo no se hereda en los workers
+    os.register_at_fork(after_in_child=_reset_collapse_executor)
+
+
+if __name__ == "__main__":
+    # Generar a mano el .collapsed de uno o varios .prof
+    for prof_path in sys.argv[1:]:
+        print(write_collapsed(prof_path))
@@ -0,0 +1,269 @@
+"""
+Representación compacta del progreso de los usuarios
+
+El progreso guarda las lecciones completadas como un bitmap (un bit por
+número de lección, numero_leccion) partido en palabras de 32 bits y un
+contador por categoría, en lugar de la lista de IDs completed_lessons:
+    
+    {
+        'completed_words': {'0': 134},
+        'category_counts': {'Python Básico': 3},
+        'completed_count': 3,
+        'total_points': 30,
+        'current_level': 'Python Básico',
+        'version': 3
+    }
+
+Las palabras permiten marcar una lección en el servidor sin leer antes el
+progreso: sumar 1 << bit a su palabra (Increment en Firestore) equivale a
+activar el bit siempre que no estuviera activo, y eso lo garantiza el
+marcador de la lección completada (ver FirebaseService._complete_lesson).
+El navegador recibe el mismo bitmap en base64 (serialize_progress; un
+catálogo de mil lecciones ocupa menos de 200 caracteres), de modo que
+"¿está completada?" y "¿cuántas por categoría?" se responden en O(1) tanto
+en el servidor como en el cliente. Una lección se identifica por su número,
+que no cambia al reconstruir el catálogo (su ID de documento sí puede
+cambiar).
+
+version aumenta con cada lección completada; permite saber si una copia del
+progreso (por ejemplo la guardada en la sesión) sigue al día.
+"""
+import base64
+
+
+# Puntos otorgados por cada lección completada
+POINTS_PER_LESSON = 10
+
+# Bits por palabra de completed_words (caben en un entero de Firestore)
+WORD_BITS = 32
+
+
+class CompletionBitmap:
+    """Conjunto de números de lección completados, un bit por lección"""
+    
+    def __init__(self, data=b''):
+        self._bits = bytearray(data)
+    
+    @classmethod
+    def from_ordinals(cls, ordinals):
+        """Construir el bitmap a partir de una lista de números de lección"""
+        bitmap = cls()
+        for ordinal in ordinals:
+            bitmap.add(ordinal)
+        return bitmap
+    
+    @classmethod
+    def from_base64(cls, encoded):
+        """Reconstruir el bitmap enviado por to_base64"""
+        return cls(base64.b64decode(encoded or ''))
+    
+    @classmethod
+    def from_words(cls, words):
+        """Reconstruir el bitmap guardado por to_words ({'índice': palabra})"""
+        data = bytearray()
+        for index, word in (words or {}).items():
+            start = int(index) * (WORD_BITS // 8)
+            if start + WORD_BITS // 8 > len(data):
+                data.extend(bytes(start + WORD_BITS // 8 - len(data)))
+            data[start:start + WORD_BITS // 8] = int(word).to_bytes(WORD_BITS // 8, 'little')
+        return cls(bytes(data).rstrip(b'\0'))
+    
+    @staticmethod
+    def word_of(ordinal):
+        """
+        Palabra y valor del bit de un número de lección
+        
+        Returns:
+            tuple: (clave de la palabra en completed_words, 1 << bit)
+        """
+        index, bit = divmod(int(ordinal), WORD_BITS)
+        return str(index), 1 << bit
+    
+    def add(self, ordinal):
+        """Marcar un número de lección"""
+        index, bit = divmod(int(ordinal), 8)
+        if index >= len(self._bits):
+            self._bits.extend(bytes(index + 1 - len(self._bits)))
+        self._bits[index] |= 1 << bit
+    
+    def __contains__(self, ordinal):
+        index, bit = divmod(int(ordinal), 8)
+        return index < len(self._bits) and bool(self._bits[index] & (1 << bit))
+    
+    def __len__(self):
+        return sum(bin(byte).count('1') for byte in self._bits)
+    
+    def __iter__(self):
+        """Números de lección marcados, de menor a mayor"""
+        for index, byte in enumerate(self._bits):
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield index * 8 + bit
+    
+    def to_base64(self):
+        """Serializar el bitmap (el bit n está en el byte n // 8, posición n % 8)"""
+        return base64.b64encode(bytes(self._bits)).decode('ascii')
+    
+    def to_words(self):
+        """Palabras de WORD_BITS bits distintas de cero, con el índice como clave"""
+        width = WORD_BITS // 8
+        words = {}
+        for start in range(0, len(self._bits), width):
+            word = int.from_bytes(bytes(self._bits[start:start + width]).ljust(width, b'\0'), 'little')
+            if word:
+                words[str(start // width)] = word
+        return words
+
+
+def new_progress():
+    """
+    Progreso inicial de un usuario recién registrado
+    
+    Returns:
+        dict: Progreso vacío
+    """
+    return {
+        'completed_words': {},
+        'category_counts': {},
+        'completed_count': 0,
+        'current_level': 'Python Básico',
+        'total_points': 0,
+        'version': 0
+    }
+
+
+def is_legacy_progress(progress):
+    """Indica si el progreso conserva un formato anterior (lista de IDs o de números, o el bitmap en base64)"""
+    return any(key in progress for key in ('completed_lessons', 'completed_ordinals', 'completed_bitmap'))
+
+
+def completed_ordinals(progress):
+    """Números de lección completados de un progreso compacto, de menor a mayor"""
+    return list(CompletionBitmap.from_words(progress.get('completed_words')))
+
+
+def migrate_legacy_progress(progress, catalog):
+    """
+    Convertir un progreso con completed_lessons, completed_ordinals o
+    completed_bitmap al formato actual
+    
+    También sirve para documentos mixtos (lista de IDs más lecciones
+    completadas después): se unen todos. Las lecciones que ya no existen en
+    el catálogo se descartan; los puntos acumulados se conservan tal cual.
+    
+    Args:
+        progress (dict): Progreso en el formato anterior
+        catalog (list): Todas las lecciones (con id, numero_leccion y categoria)
+    
+    Returns:
+        tuple: (progress, completed_lessons) con el nuevo progreso y las lecciones completadas
+    """
+    lessons_by_id = {lesson['id']: lesson for lesson in catalog}
+    lessons_by_ordinal = {lesson['numero_leccion']: lesson for lesson in catalog}
+    
+    completed = {}
+    ordinals = list(CompletionBitmap.from_base64(progress.get('completed_bitmap')))
+    ordinals += completed_ordinals(progress) + list(progress.get('completed_ordinals', []))
+    for ordinal in ordinals:
+        if ordinal in lessons_by_ordinal:
+            completed[ordinal] = lessons_by_ordinal[ordinal]
+    for lesson_id in progress.get('completed_lessons', []):
+        lesson = lessons_by_id.get(lesson_id)
+        if lesson is not None:
+            completed.setdefault(lesson['numero_leccion'], lesson)
+    
+    migrated = new_progress()
+    migrated['current_level'] = progress.get('current_level', migrated['current_level'])
+    migrated['total_points'] = progress.get('total_points', 0)
+    migrated['version'] = progress.get('version', 0)
+    
+    category_counts = migrated['category_counts']
+    for lesson in completed.values():
+        category_counts[lesson['categoria']] = category_counts.get(lesson['categoria'], 0) + 1
+    
+    migrated['completed_words'] = CompletionBitmap.from_ordinals(completed).to_words()
+    migrated['completed_count'] = len(completed)
+    return migrated, list(completed.values())
+
+
+def apply_completion(progress, lesson):
+    """
+    Marcar una lección como completada dentro de un progreso compacto
+    
+    Los backends locales deduplican aquí, por número de lección: completar
+    otra vez una lección ya marcada no cambia nada (Firestore lo hace con el
+    marcador de la lección, sin leer el progreso).
+    
+    Args:
+        progress (dict): Progreso del usuario (se modifica en el sitio)
+        lesson (dict): Lección completada (numero_leccion y categoria)
+    
+    Returns:
+        bool: True si el progreso cambió
+    """
+    bitmap = CompletionBitmap.from_words(progress.get('completed_words'))
+    if lesson['numero_leccion'] in bitmap:
+        return False
+    
+    bitmap.add(lesson['numero_leccion'])
+    progress['completed_words'] = bitmap.to_words()
+    category_counts = progress.setdefault('category_counts', {})
+    category_counts[lesson['categoria']] = category_counts.get(lesson['categoria'], 0) + 1
+    progress['completed_count'] = progress.get('completed_count', 0) + 1
+    progress['total_points'] = progress.get('total_points', 0) + POINTS_PER_LESSON
+    progress['version'] = progress.get('version', 0) + 1
+    return True
+
+
+def serialize_progress(progress):
+    """
+    Progreso tal como lo recibe el navegador
+    
+    Args:
+        progress (dict): Progreso compacto
+    
+    Returns:
+        dict: Contadores y completed_bitmap en base64
+    """
+    return {
+        'completed_bitmap': CompletionBitmap.from_words(progress.get('completed_words')).to_base64(),
+        'category_counts': progress.get('category_counts', {}),
+        'completed_count': progress.get('completed_count', 0),
+        'current_level': progress.get('current_level', 'Python Básico'),
+        'total_points': progress.get('total_points', 0),
+        'version': progress.get('version', 0)
+    }
+
+
+def snapshot_with_completion(snapshot, lesson, summary):
+    """
+    Aplicar una lección completada a un progreso serializado (serialize_progress)
+    
+    Args:
+        snapshot (dict): Progreso serializado que se tenía antes de completar
+        lesson (dict): Lección completada (numero_leccion y categoria)
+        summary (dict): Resumen devuelto al completar (progress_summary, con version)
+    
+    Returns:
+        dict or None: Progreso actualizado, o None si la copia estaba desfasada
+        (otra escritura cambió la versión entre medias)
+    """
+    version = snapshot.get('version', 0)
+    if summary.get('version') == version:
+        return snapshot
+    if summary.get('version') != version + 1:
+        return None
+    
+    bitmap = CompletionBitmap.from_base64(snapshot.get('completed_bitmap'))
+    bitmap.add(lesson['numero_leccion'])
+    category_counts = dict(snapshot.get('category_counts', {}))
+    category_counts.update(summary.get('category_counts', {}))
+    
+    return {
+        **snapshot,
+        'completed_bitmap': bitmap.to_base64(),
+        'category_counts': category_counts,
+        'completed_count': summary['completed_count'],
+        'total_points': summary['total_points'],
+        'version': summary['version']
+    }
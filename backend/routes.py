@@ -1,321 +1,294 @@
-"""
-Rutas y endpoints de la API Flask
-"""
-from flask import Blueprint, request, jsonify, session
-from backend.firebase_service import firebase_service
-from backend.validators import validate_email, validate_password, validate_username
-from functools import wraps
-
-# Crear Blueprint para las rutas de la API
-api = Blueprint('api', __name__, url_prefix='/api')
-
-
-# ============================================
-# DECORADOR DE AUTENTICACIÓN
-# ============================================
-
-def login_required(f):
-    """Decorador para proteger rutas que requieren autenticación"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({
-                'success': False,
-                'message': 'Debes iniciar sesión'
-            }), 401
-        return f(*args, **kwargs)
-    return decorated_function
-
-
-# ============================================
-# ENDPOINTS DE AUTENTICACIÓN
-# ============================================
-
-@api.route('/register', methods=['POST'])
-def register():
-    """
-    Endpoint de registro de usuario
-    
-    Body JSON:
-        {
-            "username": "juan123",
-            "email": "juan@example.com",
-            "password": "SecurePass123!"
-        }
-    """
-    try:
-        data = request.get_json()
-        
-        # Validar datos recibidos
-        if not data:
-            return jsonify({
-                'success': False,
-                'message': 'No se recibieron datos'
-            }), 400
-        
-        username = data.get('username', '').strip().lower()
-        email = data.get('email', '').strip().lower()
-        password = data.get('password', '')
-        
-        # Validar username
-        is_valid, message = validate_username(username)
-        if not is_valid:
-            return jsonify({'success': False, 'message': message}), 400
-        
-        # Validar email
-        if not validate_email(email):
-            return jsonify({
-                'success': False,
-                'message': 'Formato de email inválido'
-            }), 400
-        
-        # Validar contraseña
-        is_valid, message = validate_password(password)
-        if not is_valid:
-            return jsonify({'success': False, 'message': message}), 400
-        
-        # Verificar si el usuario ya existe
-        if firebase_service.user_exists(username=username):
-            return jsonify({
-                'success': False,
-                'message': 'El usuario ya existe'
-            }), 400
-        
-        if firebase_service.user_exists(email=email):
-            return jsonify({
-                'success': False,
-                'message': 'El email ya está registrado'
-            }), 400
-        
-        # Crear usuario en Firebase
-        success, message, user_id = firebase_service.create_user(email, password, username)
-        
-        if success:
-            # Guardar sesión
-            session['user_id'] = user_id
-            session['username'] = username
-            
-            return jsonify({
-                'success': True,
-                'message': 'Usuario registrado exitosamente',
-                'user': {
-                    'id': user_id,
-                    'username': username,
-                    'email': email
-                }
-            }), 201
-        else:
-            return jsonify({'success': False, 'message': message}), 400
-            
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error en el servidor: {str(e)}'
-        }), 500
-
-
-@api.route('/login', methods=['POST'])
-def login():
-    """
-    Endpoint de inicio de sesión
-    
-    Body JSON:
-        {
-            "identifier": "juan123 o juan@example.com",
-            "password": "SecurePass123!"
-        }
-    """
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'message': 'No se recibieron datos'
-            }), 400
-        
-        identifier = data.get('identifier', '').strip().lower()
-        password = data.get('password', '')
-        
-        # Determinar si es email o username
-        if '@' in identifier:
-            # Es un email
-            success, message, user_data = firebase_service.verify_user(identifier, password)
-        else:
-            # Es un username
-            user = firebase_service.get_user_by_username(identifier)
-            if user:
-                success, message, user_data = firebase_service.verify_user(user['email'], password)
-            else:
-                return jsonify({
-                    'success': False,
-                    'message': 'Usuario no encontrado'
-                }), 404
-        
-        if success:
-            # Guardar sesión
-            session['user_id'] = user_data['uid']
-            session['username'] = user_data['username']
-            
-            return jsonify({
-                'success': True,
-                'message': 'Login exitoso',
-                'user': {
-                    'id': user_data['uid'],
-                    'username': user_data['username'],
-                    'email': user_data['email']
-                }
-            }), 200
-        else:
-            return jsonify({'success': False, 'message': message}), 401
-            
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error en el servidor: {str(e)}'
-        }), 500
-
-
-@api.route('/logout', methods=['POST'])
-@login_required
-def logout():
-    """Cerrar sesión"""
-    username = session.get('username', 'Usuario')
-    session.clear()
-    
-    return jsonify({
-        'success': True,
-        'message': f'Hasta luego, {username}!'
-    }), 200
-
-
-@api.route('/me', methods=['GET'])
-@login_required
-def get_current_user():
-    """Obtener información del usuario actual"""
-    user_id = session.get('user_id')
-    username = session.get('username')
-    
-    # Obtener progreso del usuario
-    progress = firebase_service.get_user_progress(user_id)
-    
-    return jsonify({
-        'success': True,
-        'user': {
-            'id': user_id,
-            'username': username,
-            'progress': progress
-        }
-    }), 200
-
-
-# ============================================
-# ENDPOINTS DE LECCIONES
-# ============================================
-
-@api.route('/lessons', methods=['GET'])
-@login_required
-def get_lessons():
-    """
-    Obtener todas las lecciones o filtradas por categoría
-    
-    Query params:
-        ?category=Python Básico
-    """
-    category = request.args.get('category')
-    
-    if category:
-        lessons = firebase_service.get_lessons_by_category(category)
-    else:
-        lessons = firebase_service.get_all_lessons()
-    
-    return jsonify({
-        'success': True,
-        'lessons': lessons,
-        'count': len(lessons)
-    }), 200
-
-
-@api.route('/lessons/<lesson_id>', methods=['GET'])
-@login_required
-def get_lesson(lesson_id):
-    """Obtener una lección específica"""
-    lesson = firebase_service.get_lesson_by_id(lesson_id)
-    
-    if lesson:
-        return jsonify({
-            'success': True,
-            'lesson': lesson
-        }), 200
-    else:
-        return jsonify({
-            'success': False,
-            'message': 'Lección no encontrada'
-        }), 404
-
-
-@api.route('/lessons/categories', methods=['GET'])
-@login_required
-def get_categories():
-    """Obtener lista de categorías disponibles"""
-    from config import Config
-    
-    return jsonify({
-        'success': True,
-        'categories': Config.LESSON_CATEGORIES
-    }), 200
-
-
-# ============================================
-# ENDPOINTS DE PROGRESO
-# ============================================
-
-@api.route('/progress', methods=['GET'])
-@login_required
-def get_progress():
-    """Obtener progreso del usuario actual"""
-    user_id = session.get('user_id')
-    progress = firebase_service.get_user_progress(user_id)
-    
-    return jsonify({
-        'success': True,
-        'progress': progress
-    }), 200
-
-
-@api.route('/progress/complete/<lesson_id>', methods=['POST'])
-@login_required
-def complete_lesson(lesson_id):
-    """Marcar una lección como completada"""
-    user_id = session.get('user_id')
-    
-    success, message = firebase_service.update_user_progress(user_id, lesson_id, completed=True)
-    
-    if success:
-        # Obtener progreso actualizado
-        progress = firebase_service.get_user_progress(user_id)
-        
-        return jsonify({
-            'success': True,
-            'message': '¡Lección completada! +10 puntos',
-            'progress': progress
-        }), 200
-    else:
-        return jsonify({
-            'success': False,
-            'message': message
-        }), 400
-
-
-# ============================================
-# ENDPOINT DE SALUD
-# ============================================
-
-@api.route('/health', methods=['GET'])
-def health_check():
-    """Verificar que la API está funcionando"""
-    return jsonify({
-        'success': True,
-        'message': 'API funcionando correctamente',
-        'version': '1.0.0'
-    }), 200
\ No newline at end of file
+"""
+Rutas y endpoints de la API Flask
+
+La validación, los ETag, la copia del progreso en la sesión y el contenido
+de cada respuesta están en backend/api_common.py, compartidos con las rutas
+del modo asíncrono (backend/async_routes.py).
+"""
+from flask import Blueprint, request, jsonify, session, current_app, redirect, url_for
+from backend.firebase_service import firebase_service
+from backend.progress import serialize_progress
+from backend.catalog_snapshot import CatalogSnapshots
+from backend import api_common
+from functools import wraps
+
+# Crear Blueprint para las rutas de la API
+api = Blueprint('api', __name__, url_prefix='/api')
+
+# Catálogo precompilado por import_lessons.py (static/catalog/)
+catalog_snapshots = CatalogSnapshots()
+
+
+def respond(result):
+    """Convertir el (payload, status) de api_common en una respuesta JSON"""
+    payload, status = result
+    return jsonify(payload), status
+
+
+# ============================================
+# DECORADOR DE AUTENTICACIÓN
+# ============================================
+
+def login_required(f):
+    """Decorador para proteger rutas que requieren autenticación"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return respond(api_common.error('Debes iniciar sesión', 401))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# ============================================
+# PROGRESO EN LA SESIÓN
+# ============================================
+
+def load_user_progress(user_id):
+    """
+    Progreso serializado del usuario actual
+    
+    Usa la copia de la sesión mientras sea válida
+    (api_common.valid_progress_snapshot); en otro caso lo lee del
+    almacenamiento y renueva la copia.
+    
+    Returns:
+        dict: Progreso tal como lo recibe el navegador (serialize_progress)
+    """
+    if api_common.has_progress_snapshot(session):
+        snapshot = api_common.valid_progress_snapshot(session, firebase_service.progress_version(user_id))
+        if snapshot is not None:
+            return snapshot
+    
+    progress = serialize_progress(firebase_service.get_user_progress(user_id))
+    api_common.store_progress_snapshot(session, progress)
+    return progress
+
+
+# ============================================
+# ENDPOINTS DE AUTENTICACIÓN
+# ============================================
+
+@api.route('/register', methods=['POST'])
+def register():
+    """
+    Endpoint de registro de usuario
+    
+    Body JSON:
+        {
+            "username": "juan123",
+            "email": "juan@example.com",
+            "password": "SecurePass123!"
+        }
+    """
+    try:
+        fields, failure = api_common.parse_registration(request.get_json())
+        if failure:
+            return respond(failure)
+        username, email, password = fields
+        
+        # Crear usuario (el backend rechaza el usuario o el email repetidos
+        # de forma atómica, sin consultas previas)
+        success, message, user_id = firebase_service.create_user(email, password, username)
+        
+        if success:
+            api_common.start_session(session, user_id, username, api_common.new_user_progress())
+            return respond(api_common.registration_response(user_id, username, email))
+        else:
+            return respond(api_common.error(message, 400))
+    
+    except Exception as e:
+        return respond(api_common.error(f'Error en el servidor: {str(e)}', 500))
+
+
+@api.route('/login', methods=['POST'])
+def login():
+    """
+    Endpoint de inicio de sesión
+    
+    Body JSON:
+        {
+            "identifier": "juan123 o juan@example.com",
+            "password": "SecurePass123!"
+        }
+    """
+    try:
+        fields, failure = api_common.parse_login(request.get_json())
+        if failure:
+            return respond(failure)
+        identifier, password = fields
+        
+        # Determinar si es email o username
+        if api_common.is_email(identifier):
+            success, message, user_data = firebase_service.verify_user(identifier, password)
+        else:
+            user = firebase_service.get_user_by_username(identifier)
+            if user:
+                success, message, user_data = firebase_service.verify_user(user['email'], password)
+            else:
+                return respond(api_common.error('Usuario no encontrado', 404))
+        
+        if success:
+            api_common.start_session(session, user_data['uid'], user_data['username'])
+            return respond(api_common.login_response(user_data))
+        else:
+            return respond(api_common.error(message, 401))
+    
+    except Exception as e:
+        return respond(api_common.error(f'Error en el servidor: {str(e)}', 500))
+
+
+@api.route('/logout', methods=['POST'])
+@login_required
+def logout():
+    """Cerrar sesión"""
+    username = session.get('username', 'Usuario')
+    session.clear()
+    
+    return respond(api_common.logout_response(username))
+
+
+@api.route('/me', methods=['GET'])
+@login_required
+def get_current_user():
+    """Obtener información del usuario actual"""
+    user_id = session.get('user_id')
+    
+    # Obtener progreso del usuario (bitmap compacto para el navegador)
+    progress = load_user_progress(user_id)
+    
+    return respond(api_common.current_user_response(user_id, session.get('username'), progress))
+
+
+# ============================================
+# ENDPOINTS DE LECCIONES
+# ============================================
+
+def lesson_etag(*parts):
+    """ETag de una respuesta de lecciones (ver api_common.lesson_etag)"""
+    return api_common.lesson_etag(firebase_service.catalog_version(), *parts)
+
+
+def conditional_response(etag, build_response):
+    """
+    Responder 304 si el navegador ya tiene la versión actual
+    
+    Args:
+        etag (str or None): ETag de la respuesta
+        build_response (callable): Construye la respuesta completa (payload, status)
+    
+    Returns:
+        Response: 304 sin cuerpo, o la respuesta completa con ETag y Cache-Control
+    """
+    if api_common.is_not_modified(request.if_none_match, etag):
+        response = current_app.response_class(status=304)
+    else:
+        payload, status = build_response()
+        response = jsonify(payload)
+        response.status_code = status
+        if status != 200:
+            return response
+    
+    return api_common.set_lesson_cache_headers(response, etag)
+
+
+@api.route('/lessons', methods=['GET'])
+@login_required
+def get_lessons():
+    """
+    Obtener una página de lecciones, de todas o filtradas por categoría
+    
+    Admite If-None-Match: si el catálogo no cambió responde 304 sin leer
+    las lecciones.
+    
+    Query params:
+        ?category=Python Básico
+        ?limit=50 (máximo LESSONS_MAX_PAGE_SIZE)
+        ?after=<next_cursor de la página anterior>
+        ?view=full (por defecto solo numero_leccion, titulo y categoria;
+                    el contenido completo está en /api/lessons/<lesson_id>)
+    """
+    query, failure = api_common.parse_lessons_query(request.args)
+    if failure:
+        return respond(failure)
+    
+    def build_response():
+        return api_common.lessons_page_response(*firebase_service.get_lessons_page(**query))
+    
+    return conditional_response(lesson_etag(*api_common.lessons_etag_parts(query)), build_response)
+
+
+@api.route('/lessons/catalog', methods=['GET'])
+@login_required
+def get_lessons_catalog():
+    """
+    Redirigir al catálogo estático (vista resumida) si está al día
+    
+    Los archivos de static/catalog/ llevan el hash en el nombre y se sirven
+    con caché inmutable. Si no se han generado o el catálogo cambió después,
+    responde 404 y el navegador usa /api/lessons paginado.
+    
+    Query params:
+        ?category=Python Básico
+    """
+    version = firebase_service.catalog_version()
+    filename = catalog_snapshots.snapshot_file(request.args.get('category'), version) if version else None
+    
+    if filename is None:
+        return respond(api_common.catalog_unavailable_response())
+    
+    return redirect(url_for('static', filename=filename))
+
+
+@api.route('/lessons/<lesson_id>', methods=['GET'])
+@login_required
+def get_lesson(lesson_id):
+    """Obtener una lección específica (admite If-None-Match con el ETag de su contenido)"""
+    lesson = firebase_service.get_lesson_by_id(lesson_id)
+    
+    def build_response():
+        return api_common.lesson_response(lesson)
+    
+    return conditional_response(api_common.single_lesson_etag(lesson), build_response)
+
+
+@api.route('/lessons/categories', methods=['GET'])
+@login_required
+def get_categories():
+    """Obtener lista de categorías disponibles"""
+    return respond(api_common.categories_response())
+
+
+# ============================================
+# ENDPOINTS DE PROGRESO
+# ============================================
+
+@api.route('/progress', methods=['GET'])
+@login_required
+def get_progress():
+    """Obtener progreso del usuario actual"""
+    return respond(api_common.progress_response(load_user_progress(session.get('user_id'))))
+
+
+@api.route('/progress/complete/<lesson_id>', methods=['POST'])
+@login_required
+def complete_lesson(lesson_id):
+    """Marcar una lección como completada"""
+    user_id = session.get('user_id')
+    
+    # Un único commit atómico que ya devuelve los contadores actualizados
+    success, message, progress = firebase_service.complete_lesson(user_id, lesson_id)
+    
+    if success and api_common.has_progress_snapshot(session):
+        api_common.update_progress_snapshot(session, firebase_service.get_lesson_by_id(lesson_id), progress)
+    
+    return respond(api_common.completion_response(success, message, progress))
+
+
+# ============================================
+# ENDPOINT DE SALUD
+# ============================================
+
+@api.route('/health', methods=['GET'])
+def health_check():
+    """Verificar que la API está funcionando"""
+    return respond(api_common.health_response(firebase_service))
@@ -0,0 +1,823 @@
+"""
+Interfaz común de almacenamiento (usuarios, lecciones y progreso)
+
+Las rutas de la API solo dependen de los métodos públicos de StorageBackend,
+de modo que Firestore puede sustituirse por un almacenamiento local
+(memoria o SQLite) para pruebas de carga y desarrollo sin credenciales.
+"""
+from config import Config
+from backend.catalog import SUMMARY_FIELDS, lesson_document_id, lesson_content_hash, catalog_version
+from backend.progress import POINTS_PER_LESSON, new_progress, is_legacy_progress, migrate_legacy_progress
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import threading
+import time
+
+
+class TTLCache:
+    """Caché en memoria con tiempo de vida (TTL) y expulsión LRU"""
+    
+    def __init__(self, ttl, max_entries):
+        """
+        Args:
+            ttl (int): Segundos que una entrada permanece válida (0 desactiva la caché)
+            max_entries (int): Número máximo de entradas antes de expulsar la menos usada
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        """
+        Obtener un valor de la caché
+        
+        Returns:
+            tuple: (found, value)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+    
+    def set(self, key, value):
+        """Guardar un valor en la caché, expulsando la entrada más antigua si está llena"""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def delete(self, key):
+        """Invalidar una entrada (si existe)"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        """Invalidar todas las entradas"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """
+        Obtener contadores de uso de la caché
+        
+        Returns:
+            dict: Aciertos, fallos, expulsiones y tamaño actual
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
+
+
+class StorageBackend:
+    """
+    Clase base de los backends de almacenamiento
+    
+    Las lecturas de lecciones pasan por una caché compartida; cada backend
+    solo implementa las consultas reales (_fetch_*, _insert_lesson, ...).
+    """
+    
+    # Puntos otorgados por cada lección completada
+    POINTS_PER_LESSON = POINTS_PER_LESSON
+    
+    # Máximo de operaciones por escritura en lote (límite de Firestore)
+    MAX_BATCH_SIZE = 500
+    
+    def __init__(self):
+        self.lesson_cache = TTLCache(Config.LESSON_CACHE_TTL, Config.LESSON_CACHE_MAX_ENTRIES)
+        # Última versión del progreso de cada usuario vista por este proceso
+        self.progress_versions = TTLCache(Config.PROGRESS_SNAPSHOT_TTL, Config.USER_CACHE_MAX_ENTRIES)
+        # Una sola escritura de la versión del catálogo a la vez (hilos escritores de import_lessons.py)
+        self._catalog_lock = threading.Lock()
+    
+    @staticmethod
+    def new_user_document(username, email, created_at):
+        """
+        Documento inicial de un usuario recién registrado
+        
+        Args:
+            username (str): Nombre de usuario
+            email (str): Email
+            created_at: Marca de tiempo de creación (depende del backend)
+        
+        Returns:
+            dict: Perfil con el progreso vacío
+        """
+        return {
+            'username': username,
+            'email': email,
+            'created_at': created_at,
+            'progress': new_progress()
+        }
+    
+    @staticmethod
+    def progress_summary(progress):
+        """
+        Resumen del progreso que devuelve una lección completada
+        
+        Args:
+            progress (dict): Progreso del usuario
+        
+        Returns:
+            dict: total_points, completed_count, category_counts y version
+        """
+        return {
+            'total_points': progress.get('total_points', 0),
+            'completed_count': progress.get('completed_count', 0),
+            'category_counts': dict(progress.get('category_counts', {})),
+            'version': progress.get('version', 0)
+        }
+    
+    # ============================================
+    # OPERACIONES DE AUTENTICACIÓN
+    # ============================================
+    
+    def create_user(self, email, password, username):
+        """
+        Crear un nuevo usuario
+        
+        Returns:
+            tuple: (success, message, user_id)
+        """
+        raise NotImplementedError
+    
+    def verify_user(self, email, password):
+        """
+        Verificar credenciales de usuario
+        
+        Returns:
+            tuple: (success, message, user_data)
+        """
+        raise NotImplementedError
+    
+    def get_user_by_username(self, username):
+        """
+        Buscar usuario por nombre de usuario
+        
+        Returns:
+            dict or None: username, uid y email del usuario o None si no existe
+        """
+        raise NotImplementedError
+    
+    def migrate_username_index(self):
+        """
+        Completar el índice de nombres de usuario (si el backend lo necesita)
+        
+        Returns:
+            tuple: (success, message, indexed_users)
+        """
+        return True, "No hay nada que migrar", 0
+    
+    def warm_up(self):
+        """
+        Preparar el backend antes de la primera petición
+        
+        Se llama en cada proceso del servidor después del fork; por defecto solo
+        carga la versión del catálogo en la caché.
+        """
+        self.catalog_version()
+    
+    def email_exists(self, email):
+        """
+        Verificar si un email ya está registrado
+        
+        Returns:
+            bool: True si existe
+        """
+        raise NotImplementedError
+    
+    def user_exists(self, username=None, email=None):
+        """
+        Verificar si un usuario o email ya existe
+        
+        Args:
+            username (str, optional): Nombre de usuario
+            email (str, optional): Email
+        
+        Returns:
+            bool: True si existe, False si no
+        """
+        try:
+            if username:
+                return self.get_user_by_username(username) is not None
+            
+            if email:
+                return self.email_exists(email)
+            
+            return False
+        
+        except Exception as e:
+            print(f"Error al verificar existencia: {str(e)}")
+            return False
+    
+    # ============================================
+    # OPERACIONES DE LECCIONES
+    # ============================================
+    
+    def _insert_lesson(self, lesson_data):
+        """Guardar una lección y devolver su ID"""
+        raise NotImplementedError
+    
+    def _delete_lesson(self, lesson_id):
+        """Eliminar una lección por ID"""
+        raise NotImplementedError
+    
+    def _fetch_lessons_by_category(self, category, fields=None):
+        """Consultar las lecciones de una categoría ordenadas por número (solo fields si se indica)"""
+        raise NotImplementedError
+    
+    def _fetch_all_lessons(self, fields=None):
+        """Consultar todas las lecciones ordenadas por número (solo fields si se indica)"""
+        raise NotImplementedError
+    
+    def _fetch_lesson(self, lesson_id):
+        """Consultar una lección por ID (None si no existe)"""
+        raise NotImplementedError
+    
+    def _fetch_lessons_page(self, category, limit, after, fields=None):
+        """Consultar hasta limit lecciones con numero_leccion > after (de una categoría o de todas)"""
+        raise NotImplementedError
+    
+    def _new_lesson_id(self):
+        """Generar el ID de documento de una lección nueva"""
+        raise NotImplementedError
+    
+    def _write_lessons_chunk(self, items):
+        """Guardar en una sola operación una lista de (lesson_id, lesson_data)"""
+        raise NotImplementedError
+    
+    def _delete_lessons_chunk(self, lesson_ids):
+        """Eliminar en una sola operación una lista de lecciones"""
+        for lesson_id in lesson_ids:
+            self._delete_lesson(lesson_id)
+    
+    def _fetch_lesson_hashes(self):
+        """Consultar {lesson_id: content_hash} de todo el catálogo (sin el contenido)"""
+        raise NotImplementedError
+    
+    def _iter_lesson_id_pages(self, category, page_size):
+        """Recorrer los IDs de las lecciones (de una categoría o de todas) página a página"""
+        raise NotImplementedError
+    
+    def _fetch_catalog_version(self):
+        """Consultar la versión guardada del catálogo (None si aún no se guardó)"""
+        raise NotImplementedError
+    
+    def _store_catalog_version(self, version):
+        """Guardar la versión del catálogo (un solo documento o fila)"""
+        raise NotImplementedError
+    
+    def _catalog_changed(self, lesson_hashes=None):
+        """
+        Guardar la nueva versión del catálogo e invalidar la caché de lecciones
+        
+        Se llama después de cada escritura del catálogo, también si falló a
+        medias. La versión se calcula con los content_hash de lesson_hashes o,
+        si no se indican, consultándolos (solo en altas y borrados sueltos).
+        Consulta y escritura van bajo _catalog_lock para que un hilo no guarde
+        una versión calculada antes de la escritura de otro.
+        """
+        try:
+            with self._catalog_lock:
+                hashes = self._fetch_lesson_hashes() if lesson_hashes is None else lesson_hashes
+                self._store_catalog_version(catalog_version(hashes))
+        except Exception as e:
+            print(f"Error al guardar la versión del catálogo: {str(e)}")
+        finally:
+            self.lesson_cache.clear()
+    
+    def get_lesson_hashes(self):
+        """
+        content_hash de todas las lecciones del catálogo (una lectura por lección)
+        
+        Returns:
+            dict or None: {lesson_id: content_hash} o None si no se pudo consultar
+        """
+        try:
+            return self._fetch_lesson_hashes()
+        except Exception as e:
+            print(f"Error al consultar los hashes del catálogo: {str(e)}")
+            return None
+    
+    def update_catalog_version(self, lesson_hashes=None):
+        """
+        Guardar la versión del catálogo tras escribirlo con add_lessons_bulk(update_version=False)
+        
+        Args:
+            lesson_hashes (dict, optional): {lesson_id: content_hash} de todo el
+                catálogo (si no se indica se consultan)
+        """
+        self._catalog_changed(lesson_hashes)
+    
+    def add_lesson(self, lesson_data):
+        """
+        Agregar una lección
+        
+        Args:
+            lesson_data (dict): Datos de la lección
+        
+        Returns:
+            tuple: (success, message, lesson_id)
+        """
+        try:
+            lesson_id = self._insert_lesson(lesson_data)
+            return True, "Lección agregada exitosamente", lesson_id
+        except Exception as e:
+            return False, f"Error al agregar lección: {str(e)}", None
+        finally:
+            self._catalog_changed()
+    
+    def add_lessons_bulk(self, lessons, chunk_size=None, max_retries=None, progress_callback=None,
+                         update_version=True):
+        """
+        Agregar muchas lecciones agrupadas en escrituras por lotes
+        
+        Cada bloque se guarda en una sola operación y se reintenta con espera
+        exponencial. Los IDs se generan antes del primer intento, así que
+        reintentar un bloque nunca crea lecciones duplicadas. Cada lección se
+        guarda con su content_hash (lesson_content_hash).
+        
+        Args:
+            lessons (list): Datos de las lecciones
+            chunk_size (int, optional): Lecciones por bloque (por defecto Config.IMPORT_CHUNK_SIZE)
+            max_retries (int, optional): Reintentos por bloque (por defecto Config.IMPORT_MAX_RETRIES)
+            progress_callback (callable, optional): Función (escritas, total) llamada tras cada bloque
+            update_version (bool): Recalcular la versión del catálogo al terminar
+                (consulta el catálogo entero). Con False solo se invalida la caché
+                y el llamador guarda la versión con update_catalog_version
+        
+        Returns:
+            tuple: (success, message, lesson_ids)
+        """
+        chunk_size = max(1, min(chunk_size or Config.IMPORT_CHUNK_SIZE, self.MAX_BATCH_SIZE))
+        max_retries = Config.IMPORT_MAX_RETRIES if max_retries is None else max_retries
+        
+        items = [
+            (self._new_lesson_id(), {**lesson, 'content_hash': lesson_content_hash(lesson)})
+            for lesson in lessons
+        ]
+        lesson_ids = []
+        
+        try:
+            for start in range(0, len(items), chunk_size):
+                chunk = items[start:start + chunk_size]
+                self._write_chunk_with_retry(chunk, max_retries)
+                lesson_ids.extend(lesson_id for lesson_id, _ in chunk)
+                
+                if progress_callback:
+                    progress_callback(len(lesson_ids), len(items))
+            
+            return True, f"{len(lesson_ids)} lecciones agregadas", lesson_ids
+        except Exception as e:
+            return False, f"Error al agregar lecciones: {str(e)}", lesson_ids
+        finally:
+            if update_version:
+                self._catalog_changed()
+            else:
+                self.lesson_cache.clear()
+    
+    def sync_lessons(self, lessons, chunk_size=None, max_retries=None, progress_callback=None):
+        """
+        Sincronizar el catálogo de forma idempotente e incremental
+        
+        Cada lección se guarda con un ID determinista (categoría + número) y un
+        content_hash. Solo se escriben las lecciones nuevas o modificadas y solo
+        se eliminan las que ya no existen, así que repetir la sincronización con
+        los mismos datos no escribe nada.
+        
+        Si hay que eliminar lecciones (por ejemplo, las importadas con IDs
+        aleatorios antes de los IDs deterministas), antes de escribir nada se
+        migra el progreso de los usuarios (migrate_progress) con el catálogo
+        actual: las listas completed_lessons pasan a números de lección
+        mientras sus IDs antiguos todavía existen. Si la migración falla, no se
+        sincroniza.
+        
+        Args:
+            lessons (iterable): Datos de las lecciones (el catálogo completo)
+            chunk_size (int, optional): Operaciones por lote (por defecto Config.IMPORT_CHUNK_SIZE)
+            max_retries (int, optional): Reintentos por lote (por defecto Config.IMPORT_MAX_RETRIES)
+            progress_callback (callable, optional): Función (hechas, total) llamada tras cada lote
+        
+        Returns:
+            tuple: (success, message, stats) con stats = {'added', 'updated', 'deleted', 'unchanged'}
+        """
+        chunk_size = max(1, min(chunk_size or Config.IMPORT_CHUNK_SIZE, self.MAX_BATCH_SIZE))
+        max_retries = Config.IMPORT_MAX_RETRIES if max_retries is None else max_retries
+        stats = {'added': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        synced_hashes = None
+        
+        try:
+            desired = {}
+            for lesson in lessons:
+                document = {**lesson, 'content_hash': lesson_content_hash(lesson)}
+                desired[lesson_document_id(lesson)] = document
+            
+            existing = self._fetch_lesson_hashes()
+            
+            to_write = []
+            for lesson_id, document in desired.items():
+                if lesson_id not in existing:
+                    stats['added'] += 1
+                elif existing[lesson_id] != document['content_hash']:
+                    stats['updated'] += 1
+                else:
+                    stats['unchanged'] += 1
+                    continue
+                to_write.append((lesson_id, document))
+            
+            to_delete = [lesson_id for lesson_id in existing if lesson_id not in desired]
+            
+            if to_delete:
+                # Progreso con IDs que van a desaparecer: convertirlo mientras el catálogo los tenga
+                self.lesson_cache.clear()
+                migrated_ok, message, _ = self.migrate_progress()
+                if not migrated_ok:
+                    return False, f"No se sincronizó: {message}", dict.fromkeys(stats, 0)
+            
+            total = len(to_write) + len(to_delete)
+            done = 0
+            
+            for start in range(0, len(to_write), chunk_size):
+                chunk = to_write[start:start + chunk_size]
+                self._write_chunk_with_retry(chunk, max_retries)
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, total)
+            
+            for start in range(0, len(to_delete), chunk_size):
+                chunk = to_delete[start:start + chunk_size]
+                self._with_retry(self._delete_lessons_chunk, chunk, max_retries)
+                stats['deleted'] += len(chunk)
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, total)
+            
+            synced_hashes = {lesson_id: document['content_hash'] for lesson_id, document in desired.items()}
+            return True, "Catálogo sincronizado", stats
+        except Exception as e:
+            return False, f"Error al sincronizar lecciones: {str(e)}", stats
+        finally:
+            # Tras una sincronización completa el catálogo es exactamente desired
+            self._catalog_changed(synced_hashes)
+    
+    def _write_chunk_with_retry(self, chunk, max_retries):
+        """Escribir un bloque reintentando con espera exponencial"""
+        self._with_retry(self._write_lessons_chunk, chunk, max_retries)
+    
+    def _with_retry(self, operation, chunk, max_retries):
+        """Ejecutar una operación por lotes reintentando con espera exponencial"""
+        for attempt in range(max_retries + 1):
+            try:
+                operation(chunk)
+                return
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                delay = Config.IMPORT_RETRY_BACKOFF * (2 ** attempt)
+                print(f"   ⚠️  Reintentando bloque de {len(chunk)} lecciones en {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+    
+    def delete_lessons(self, lesson_ids):
+        """
+        Eliminar un conjunto de lecciones
+        
+        Args:
+            lesson_ids (list): IDs de las lecciones a eliminar
+        
+        Returns:
+            tuple: (success, message, deleted_count)
+        """
+        deleted = 0
+        try:
+            for lesson_id in lesson_ids:
+                self._delete_lesson(lesson_id)
+                deleted += 1
+            return True, "Lecciones eliminadas", deleted
+        except Exception as e:
+            return False, f"Error al eliminar lecciones: {str(e)}", deleted
+        finally:
+            self._catalog_changed()
+    
+    def delete_all_lessons(self, category=None, page_size=None, max_workers=None, progress_callback=None):
+        """
+        Eliminar todas las lecciones (o las de una categoría) en streaming
+        
+        Solo se leen los IDs de los documentos, página a página, y cada página
+        se elimina con un commit por lotes. Como mucho max_workers lotes están
+        en curso a la vez, así que la memoria y el número de peticiones
+        simultáneas no crecen con el tamaño de la colección.
+        
+        Args:
+            category (str, optional): Categoría a eliminar (None elimina todo el catálogo)
+            page_size (int, optional): IDs por página y lote (por defecto Config.DELETE_PAGE_SIZE)
+            max_workers (int, optional): Lotes en paralelo (por defecto Config.DELETE_MAX_WORKERS)
+            progress_callback (callable, optional): Función (eliminadas) llamada tras cada lote
+        
+        Returns:
+            tuple: (success, message, deleted_count)
+        """
+        page_size = max(1, min(page_size or Config.DELETE_PAGE_SIZE, self.MAX_BATCH_SIZE))
+        max_workers = max(1, max_workers or Config.DELETE_MAX_WORKERS)
+        deleted = 0
+        
+        def collect(futures):
+            nonlocal deleted
+            for future in futures:
+                deleted += future.result()
+                if progress_callback:
+                    progress_callback(deleted)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                pending = set()
+                for page in self._iter_lesson_id_pages(category, page_size):
+                    if len(pending) >= max_workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(executor.submit(self._delete_page, page))
+                collect(wait(pending).done)
+            
+            return True, "Lecciones eliminadas", deleted
+        except Exception as e:
+            return False, f"Error al eliminar lecciones: {str(e)}", deleted
+        finally:
+            self._catalog_changed()
+    
+    def _delete_page(self, lesson_ids):
+        """Eliminar una página de IDs con reintentos y devolver cuántas se eliminaron"""
+        self._with_retry(self._delete_lessons_chunk, lesson_ids, Config.IMPORT_MAX_RETRIES)
+        return len(lesson_ids)
+    
+    def catalog_version(self):
+        """
+        Versión actual del catálogo de lecciones (para ETags)
+        
+        Es una sola lectura: las escrituras del catálogo guardan la versión
+        (calculada con los content_hash de las lecciones) en su propio
+        documento. Se guarda en la caché de lecciones, que se invalida con cada
+        escritura del catálogo. Un catálogo escrito antes de existir ese
+        documento se recorre una vez para calcularla y guardarla.
+        
+        Returns:
+            str or None: Versión del catálogo o None si no se pudo consultar
+        """
+        cache_key = ('version',)
+        found, cached = self.lesson_cache.get(cache_key)
+        if found:
+            return cached
+        
+        try:
+            version = self._fetch_catalog_version()
+            if version is None:
+                version = catalog_version(self._fetch_lesson_hashes())
+                self._store_catalog_version(version)
+            self.lesson_cache.set(cache_key, version)
+            return version
+        except Exception as e:
+            print(f"Error al calcular la versión del catálogo: {str(e)}")
+            return None
+    
+    def get_lessons_by_category(self, category, summary=False):
+        """
+        Obtener lecciones por categoría
+        
+        Args:
+            category (str): Categoría (Python Básico, Intermedio, Avanzado)
+            summary (bool): Solo los campos de SUMMARY_FIELDS (sin el contenido)
+        
+        Returns:
+            list: Lista de lecciones
+        """
+        cache_key = ('category', category, summary)
+        found, cached = self.lesson_cache.get(cache_key)
+        if found:
+            return cached
+        
+        try:
+            result = self._fetch_lessons_by_category(category, SUMMARY_FIELDS if summary else None)
+            self.lesson_cache.set(cache_key, result)
+            return result
+        except Exception as e:
+            print(f"Error al obtener lecciones: {str(e)}")
+            return []
+    
+    def get_all_lessons(self, summary=False):
+        """
+        Obtener todas las lecciones
+        
+        Args:
+            summary (bool): Solo los campos de SUMMARY_FIELDS (sin el contenido)
+        
+        Returns:
+            list: Lista de todas las lecciones
+        """
+        cache_key = ('all', summary)
+        found, cached = self.lesson_cache.get(cache_key)
+        if found:
+            return cached
+        
+        try:
+            result = self._fetch_all_lessons(SUMMARY_FIELDS if summary else None)
+            self.lesson_cache.set(cache_key, result)
+            return result
+        except Exception as e:
+            print(f"Error al obtener lecciones: {str(e)}")
+            return []
+    
+    def get_lessons_page(self, category=None, limit=50, after=None, summary=False):
+        """
+        Obtener una página de lecciones ordenadas por número
+        
+        La paginación usa numero_leccion como cursor: cada página solo lee
+        sus lecciones, sin recorrer las anteriores.
+        
+        Args:
+            category (str, optional): Categoría (todas si es None)
+            limit (int): Lecciones por página
+            after (int, optional): numero_leccion de la última lección ya recibida
+            summary (bool): Solo los campos de SUMMARY_FIELDS (sin el contenido)
+        
+        Returns:
+            tuple: (lessons, next_cursor) con next_cursor None en la última página
+        """
+        cache_key = ('page', category, limit, after, summary)
+        found, cached = self.lesson_cache.get(cache_key)
+        if found:
+            return cached
+        
+        try:
+            # Se pide una lección de más para saber si hay otra página
+            lessons = self._fetch_lessons_page(category, limit + 1, after, SUMMARY_FIELDS if summary else None)
+            next_cursor = lessons[limit - 1]['numero_leccion'] if len(lessons) > limit else None
+            result = (lessons[:limit], next_cursor)
+            self.lesson_cache.set(cache_key, result)
+            return result
+        except Exception as e:
+            print(f"Error al obtener lecciones: {str(e)}")
+            return [], None
+    
+    def get_lesson_by_id(self, lesson_id):
+        """
+        Obtener una lección específica
+        
+        Args:
+            lesson_id (str): ID de la lección
+        
+        Returns:
+            dict or None: Datos de la lección
+        """
+        cache_key = ('lesson', lesson_id)
+        found, cached = self.lesson_cache.get(cache_key)
+        if found:
+            return cached
+        
+        try:
+            result = self._fetch_lesson(lesson_id)
+            if result is not None:
+                self.lesson_cache.set(cache_key, result)
+            return result
+        except Exception as e:
+            print(f"Error al obtener lección: {str(e)}")
+            return None
+    
+    # ============================================
+    # OPERACIONES DE PROGRESO DEL USUARIO
+    # ============================================
+    
+    def _complete_lesson(self, user_id, lesson):
+        """Registrar una lección completada (lesson incluye id, numero_leccion y categoria)"""
+        raise NotImplementedError
+    
+    def _fetch_user_progress(self, user_id):
+        """Consultar el progreso guardado de un usuario (None si no existe)"""
+        raise NotImplementedError
+    
+    def _save_migrated_progress(self, user_id, progress, completed_lessons):
+        """
+        Guardar el progreso convertido al leerlo (por defecto no se guarda)
+        
+        Los backends locales convierten el progreso dentro de su propia
+        transacción al completar una lección; Firestore completa sin leer, así
+        que necesita el progreso ya convertido.
+        """
+    
+    def complete_lesson(self, user_id, lesson_id):
+        """
+        Marcar una lección como completada de forma atómica
+        
+        Completar dos veces la misma lección (por ejemplo desde dos pestañas
+        a la vez) solo suma los puntos una vez. La lección se obtiene de la
+        caché del catálogo para conocer su número y su categoría.
+        
+        Args:
+            user_id (str): ID del usuario
+            lesson_id (str): ID de la lección
+        
+        Returns:
+            tuple: (success, message, progress) con el resumen de progress_summary
+        """
+        lesson = self.get_lesson_by_id(lesson_id)
+        if lesson is None:
+            return False, "Lección no encontrada", None
+        
+        success, message, progress = self._complete_lesson(user_id, lesson)
+        if success:
+            self._remember_progress_version(user_id, progress)
+        return success, message, progress
+    
+    def _remember_progress_version(self, user_id, progress):
+        """Recordar la versión más reciente del progreso que ha visto este proceso"""
+        version = progress.get('version', 0)
+        found, known = self.progress_versions.get(user_id)
+        if not found or version > known:
+            self.progress_versions.set(user_id, version)
+    
+    def progress_version(self, user_id):
+        """
+        Versión del progreso de un usuario sin consultar el almacenamiento remoto
+        
+        Por defecto es la última que escribió o leyó este proceso; los backends
+        locales devuelven la versión guardada.
+        
+        Args:
+            user_id (str): ID del usuario
+        
+        Returns:
+            int or None: Versión o None si no se conoce
+        """
+        found, version = self.progress_versions.get(user_id)
+        return version if found else None
+    
+    def update_user_progress(self, user_id, lesson_id, completed=True):
+        """
+        Actualizar el progreso de un usuario
+        
+        Args:
+            user_id (str): ID del usuario
+            lesson_id (str): ID de la lección
+            completed (bool): Si completó la lección
+        
+        Returns:
+            tuple: (success, message)
+        """
+        if not completed:
+            return True, "Sin cambios"
+        
+        success, message, _ = self.complete_lesson(user_id, lesson_id)
+        return success, message
+    
+    def migrate_progress(self):
+        """
+        Migrar el progreso guardado con formatos anteriores
+        
+        Returns:
+            tuple: (success, message, migrated_users)
+        """
+        return True, "No hay nada que migrar", 0
+    
+    def get_user_progress(self, user_id):
+        """
+        Obtener el progreso de un usuario
+        
+        Los documentos que aún no se migraron (con completed_lessons) se
+        convierten al formato compacto al leerlos, usando el catálogo en caché,
+        y el backend puede guardar el resultado (_save_migrated_progress).
+        
+        Args:
+            user_id (str): ID del usuario
+        
+        Returns:
+            dict: Progreso del usuario (formato de backend.progress)
+        """
+        try:
+            progress = self._fetch_user_progress(user_id)
+            if progress is None:
+                return {}
+            if is_legacy_progress(progress):
+                progress, completed_lessons = migrate_legacy_progress(progress, self.get_all_lessons())
+                self._save_migrated_progress(user_id, progress, completed_lessons)
+            self._remember_progress_version(user_id, progress)
+            return progress
+        except Exception as e:
+            print(f"Error al obtener progreso: {str(e)}")
+            return {}
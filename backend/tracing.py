@@ -0,0 +1,224 @@
+"""
+Trazas de las operaciones de Firestore y Authentication de cada petición
+
+FirebaseService envuelve cada lectura, escritura y llamada a Authentication
+en un span (tipo de operación, colección, documentos y duración) que se
+añade a la traza de la petición en curso. Al terminar la petición se
+calcula un resumen (lecturas, escrituras, llamadas a Authentication y tiempo
+total) y se avisa en el log si supera TRACE_READ_BUDGET lecturas o repite la
+misma lectura de un documento.
+
+La traza actual vive en un ContextVar: fuera de una petición (scripts de
+importación y migración) los spans no se registran.
+"""
+from config import Config
+from contextlib import contextmanager
+import contextvars
+import threading
+import time
+
+
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+
+# Funciones que reciben el resumen de cada petición (ver add_listener)
+_listeners = []
+
+
+class Span:
+    """Una operación contra Firebase"""
+    
+    __slots__ = ('kind', 'operation', 'collection', 'target', 'documents', 'duration')
+    
+    def __init__(self, kind, operation, collection, target=None):
+        self.kind = kind
+        self.operation = operation
+        self.collection = collection
+        self.target = target
+        self.documents = 0
+        self.duration = 0.0
+    
+    @property
+    def billed_reads(self):
+        """Lecturas facturadas (una consulta sin resultados cuenta como una lectura)"""
+        if self.kind != 'read':
+            return 0
+        return max(1, self.documents)
+    
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'operation': self.operation,
+            'collection': self.collection,
+            'target': self.target,
+            'documents': self.documents,
+            'ms': round(self.duration * 1000, 2)
+        }
+
+
+class RequestTrace:
+    """Spans de una petición (se pueden añadir desde varios hilos)"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.wall_time = None
+    
+    def record(self, span):
+        with self._lock:
+            self.spans.append(span)
+    
+    def finish(self):
+        self.wall_time = time.perf_counter() - self._start
+    
+    def repeated_lookups(self):
+        """Documentos leídos más de una vez en la petición"""
+        seen = {}
+        for span in self.spans:
+            if span.kind == 'read' and span.target is not None:
+                seen[span.target] = seen.get(span.target, 0) + 1
+        return {target: count for target, count in seen.items() if count > 1}
+    
+    def summary(self):
+        """
+        Resumen de la petición
+        
+        Returns:
+            dict: Lecturas, escrituras, llamadas a Authentication, tiempos y spans
+        """
+        with self._lock:
+            spans = list(self.spans)
+        
+        wall_time = self.wall_time if self.wall_time is not None else time.perf_counter() - self._start
+        return {
+            'request': self.name,
+            'reads': sum(span.billed_reads for span in spans),
+            'writes': sum(span.documents for span in spans if span.kind == 'write'),
+            'auth_calls': sum(1 for span in spans if span.kind == 'auth'),
+            'operations': len(spans),
+            'firebase_ms': round(sum(span.duration for span in spans) * 1000, 2),
+            'wall_ms': round(wall_time * 1000, 2),
+            'repeated_lookups': self.repeated_lookups(),
+            'spans': [span.to_dict() for span in spans]
+        }
+
+
+@contextmanager
+def span(kind, operation, collection, target=None):
+    """
+    Medir una operación y añadirla a la traza de la petición en curso
+    
+    Args:
+        kind (str): 'read', 'write' o 'auth'
+        operation (str): get, query, commit, create_user...
+        collection (str): Colección afectada
+        target (str, optional): Ruta del documento (para detectar lecturas repetidas)
+    
+    Yields:
+        Span: El que llama anota en documents cuántos documentos leyó o escribió
+    """
+    current = Span(kind, operation, collection, target)
+    trace = _current_trace.get()
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - start
+        if trace is not None:
+            trace.record(current)
+
+
+def current_trace():
+    """Traza de la petición en curso (None fuera de una petición)"""
+    return _current_trace.get()
+
+
+def add_listener(callback):
+    """Recibir el resumen de cada petición trazada: callback(summary)"""
+    _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def start_request_trace(name):
+    """
+    Abrir la traza de una petición en el contexto actual
+    
+    Returns:
+        tuple: (trace, token) para finish_request_trace
+    """
+    trace = RequestTrace(name)
+    return trace, _current_trace.set(trace)
+
+
+def finish_request_trace(trace, token, logger):
+    """Cerrar la traza de una petición, avisar si gasta de más y avisar a los listeners"""
+    _current_trace.reset(token)
+    trace.finish()
+    
+    if not trace.spans and not _listeners:
+        return
+    
+    summary = trace.summary()
+    over_budget = 0 < Config.TRACE_READ_BUDGET < summary['reads']
+    
+    if over_budget:
+        logger.warning(
+            "%s: %d lecturas de Firestore (presupuesto %d)",
+            summary['request'], summary['reads'], Config.TRACE_READ_BUDGET
+        )
+    for target, count in summary['repeated_lookups'].items():
+        logger.warning("%s: %s se leyó %d veces", summary['request'], target, count)
+    if Config.TRACE_LOG_REQUESTS:
+        logger.info(
+            "%s: %d lecturas, %d escrituras, %d llamadas a Authentication, %.1f ms (%.1f ms en Firebase)",
+            summary['request'], summary['reads'], summary['writes'], summary['auth_calls'],
+            summary['wall_ms'], summary['firebase_ms']
+        )
+    
+    for callback in list(_listeners):
+        callback(summary)
+
+
+def init_tracing(app):
+    """Abrir una traza por petición y avisar de las que gastan de más"""
+    if not Config.TRACING_ENABLED:
+        return
+    
+    from flask import g, request
+    
+    @app.before_request
+    def start_trace():
+        g.trace, g.trace_token = start_request_trace(f"{request.method} {request.endpoint or request.path}")
+    
+    @app.teardown_request
+    def finish_trace(error):
+        trace = g.pop('trace', None)
+        token = g.pop('trace_token', None)
+        if trace is not None:
+            finish_request_trace(trace, token, app.logger)
+
+
+def init_tracing_async(app):
+    """Lo mismo que init_tracing para la aplicación Quart (asgi.py)"""
+    if not Config.TRACING_ENABLED:
+        return
+    
+    from quart import g, request
+    
+    # Funciones async: Quart ejecuta las síncronas en otro hilo con una copia
+    # del contexto y la traza no llegaría a la vista
+    @app.before_request
+    async def start_trace():
+        g.trace, g.trace_token = start_request_trace(f"{request.method} {request.endpoint or request.path}")
+    
+    @app.teardown_request
+    async def finish_trace(error):
+        trace = g.pop('trace', None)
+        token = g.pop('trace_token', None)
+        if trace is not None:
+            finish_request_trace(trace, token, app.logger)
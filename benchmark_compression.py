@@ -0,0 +1,80 @@
+"""
+Medición de la compresión de la respuesta de /api/lessons
+
+Construye el JSON de todas las lecciones del catálogo incluido en data/ (el
+mismo cuerpo que devuelve /api/lessons sin filtros) y mide, para cada
+codificación y nivel, el tamaño resultante y el tiempo de CPU por respuesta.
+
+Uso:
+    python benchmark_compression.py [repeticiones]
+"""
+import json
+import os
+import sys
+import time
+from backend import compression
+from backend.catalog import lesson_document_id
+from backend.lesson_reader import iter_lessons_csv
+
+
+# Los mismos CSV que importa import_lessons.py
+SOURCE_CSVS = [
+    os.path.join('data', 'python_python_básico.csv'),
+    os.path.join('data', 'python_python_intermedio.csv'),
+    os.path.join('data', 'python_python_avanzado.csv')
+]
+
+
+def build_lessons_payload():
+    """
+    Cuerpo JSON de /api/lessons con todo el catálogo
+    
+    Returns:
+        bytes: JSON como lo envía Flask
+    """
+    lessons = []
+    for filepath in SOURCE_CSVS:
+        for lesson in iter_lessons_csv(filepath):
+            lessons.append({**lesson, 'id': lesson_document_id(lesson)})
+    
+    body = {'success': True, 'lessons': lessons, 'count': len(lessons)}
+    return json.dumps(body, ensure_ascii=True).encode('utf-8')
+
+
+def run_benchmark(repetitions=50):
+    """
+    Comprimir el cuerpo varias veces con cada configuración e imprimir los resultados
+    
+    Args:
+        repetitions (int): Compresiones por configuración (se promedia el tiempo)
+    """
+    payload = build_lessons_payload()
+    
+    configurations = [('gzip', level) for level in (1, 6, 9)]
+    if compression.brotli is not None:
+        configurations += [('br', quality) for quality in (1, 5, 11)]
+    
+    print("\n" + "="*60)
+    print("⏱️  BENCHMARK DE COMPRESIÓN (/api/lessons)")
+    print("="*60)
+    print(f"Sin comprimir: {len(payload):,} bytes")
+    print("-" * 60)
+    
+    for encoding, level in configurations:
+        start = time.thread_time()
+        for _ in range(repetitions):
+            compressed = compression.compress(payload, encoding, level)
+        cpu_ms = (time.thread_time() - start) * 1000 / repetitions
+        
+        saved = 1 - len(compressed) / len(payload)
+        print(f"  {encoding:<5} nivel {level:<3} {len(compressed):>9,} bytes  "
+              f"({saved:6.1%} menos)  {cpu_ms:7.2f} ms CPU/respuesta")
+    
+    if compression.brotli is None:
+        print("  (brotli no está instalado: pip install brotli)")
+    
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    run_benchmark(repetitions=int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark de los lectores de lecciones CSV
+
+Compara el lector en streaming (csv + generadores), el lector vectorizado
+(pandas por columnas) y el método anterior (pandas + iterrows) sobre
+data/python_w3schools.csv replicado N veces (1000 por defecto).
+
+Uso:
+    python benchmark_lesson_reader.py [repeticiones] [--skip-iterrows]
+"""
+import os
+import sys
+import tempfile
+import time
+from backend.lesson_reader import iter_lessons_csv, read_lessons_dataframe
+
+
+SOURCE_CSV = os.path.join('data', 'python_w3schools.csv')
+
+
+def build_scaled_csv(source, repetitions, destination):
+    """
+    Crear un CSV con las filas del original repetidas varias veces
+    
+    Returns:
+        int: Tamaño del archivo generado en bytes
+    """
+    with open(source, encoding='utf-8-sig', newline='') as f:
+        header = f.readline()
+        body = f.read()
+    
+    if not body.endswith('\n'):
+        body += '\n'
+    
+    with open(destination, 'w', encoding='utf-8', newline='') as f:
+        f.write(header)
+        for _ in range(repetitions):
+            f.write(body)
+    
+    return os.path.getsize(destination)
+
+
+def read_with_iterrows(filepath):
+    """Lector anterior del importador (pandas + iterrows), como referencia"""
+    import pandas as pd
+    
+    df = pd.read_csv(filepath, encoding='utf-8-sig')
+    lessons = []
+    for index, row in df.iterrows():
+        lessons.append({
+            'numero_leccion': int(row.get('numero_leccion', index + 1)),
+            'titulo': str(row.get('titulo', 'Sin título')),
+            'descripcion': str(row.get('descripcion', ''))[:500],
+            'ejemplos_codigo': str(row.get('ejemplos_codigo', ''))[:1000],
+            'categoria': str(row.get('categoria', 'Python Básico')),
+            'url': str(row.get('url', '')) if pd.notna(row.get('url')) else ''
+        })
+    return lessons
+
+
+def consume_stream(filepath):
+    """Recorrer el generador sin acumular las lecciones (memoria constante)"""
+    count = 0
+    for _ in iter_lessons_csv(filepath):
+        count += 1
+    return count
+
+
+def run_benchmark(repetitions=1000, include_iterrows=True):
+    """
+    Ejecutar el benchmark e imprimir el rendimiento de cada lector
+    
+    Args:
+        repetitions (int): Veces que se replica el CSV original
+        include_iterrows (bool): Medir también el lector anterior (lento)
+    """
+    readers = [
+        ('streaming (csv)', consume_stream),
+        ('vectorizado (pandas)', lambda path: len(read_lessons_dataframe(path)))
+    ]
+    if include_iterrows:
+        readers.append(('iterrows (anterior)', lambda path: len(read_with_iterrows(path))))
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scaled_csv = os.path.join(tmp_dir, 'lessons_scaled.csv')
+        size = build_scaled_csv(SOURCE_CSV, repetitions, scaled_csv)
+        
+        print("\n" + "="*60)
+        print("⏱️  BENCHMARK DE LECTORES DE LECCIONES")
+        print("="*60)
+        print(f"Archivo: {SOURCE_CSV} x{repetitions} ({size / 1_000_000:.1f} MB)")
+        print("-" * 60)
+        
+        for name, reader in readers:
+            start = time.perf_counter()
+            rows = reader(scaled_csv)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<22} {rows:>9} filas  {elapsed:7.2f}s  {rows / elapsed:>10,.0f} filas/s")
+        
+        print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    run_benchmark(
+        repetitions=int(args[0]) if args else 1000,
+        include_iterrows='--skip-iterrows' not in sys.argv
+    )
@@ -0,0 +1,88 @@
+"""
+Medición del arranque de la aplicación
+
+Cada escenario se ejecuta en un proceso nuevo (arranque en frío) y mide:
+- import: importar app.py (incluye backend.routes y el backend de almacenamiento)
+- create_app: construir la aplicación Flask
+- warm_up: abrir las conexiones del almacenamiento (app.warm_up)
+- primera petición: GET /api/lessons con sesión iniciada
+
+Se compara la primera petición con y sin warm-up. Usa el backend de
+STORAGE_BACKEND (con 'firestore' las lecturas van a la red).
+
+Uso:
+    python benchmark_startup.py [repeticiones]
+"""
+import json
+import subprocess
+import sys
+
+
+# Código que se ejecuta en cada proceso hijo; imprime los tiempos en JSON
+SCENARIO = '''
+import json, sys, time
+start = time.perf_counter()
+import app as application
+timings = {'import': time.perf_counter() - start}
+
+start = time.perf_counter()
+flask_app = application.create_app()
+timings['create_app'] = time.perf_counter() - start
+
+if sys.argv[1] == 'warm':
+    start = time.perf_counter()
+    application.firebase_service.warm_up()
+    timings['warm_up'] = time.perf_counter() - start
+
+client = flask_app.test_client()
+with client.session_transaction() as session:
+    session['user_id'] = 'benchmark'
+start = time.perf_counter()
+client.get('/api/lessons')
+timings['first_request'] = time.perf_counter() - start
+print(json.dumps(timings))
+'''
+
+
+def run_scenario(mode):
+    """
+    Arrancar la aplicación en un proceso nuevo
+    
+    Args:
+        mode (str): 'cold' (sin warm-up) o 'warm'
+    
+    Returns:
+        dict: Segundos de cada fase
+    """
+    result = subprocess.run(
+        [sys.executable, '-c', SCENARIO, mode],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(repetitions=3):
+    """
+    Ejecutar cada escenario varias veces e imprimir la media de cada fase
+    
+    Args:
+        repetitions (int): Procesos por escenario
+    """
+    print("\n" + "="*60)
+    print("⏱️  BENCHMARK DE ARRANQUE")
+    print("="*60)
+    
+    for mode, title in (('cold', 'Sin warm-up'), ('warm', 'Con warm-up')):
+        runs = [run_scenario(mode) for _ in range(repetitions)]
+        print(f"{title}:")
+        for phase in ('import', 'create_app', 'warm_up', 'first_request'):
+            values = [run[phase] for run in runs if phase in run]
+            if values:
+                print(f"  {phase:<15} {sum(values) * 1000 / len(values):9.1f} ms")
+        print("-" * 60)
+    
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    run_benchmark(repetitions=int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,555 @@
+"""
+Control del coste en Firestore de cada endpoint de la API
+
+Ejecuta las rutas de la API contra FirebaseService conectado a un Firestore
+y un Authentication locales (en memoria, instrumentados) y cuenta, por
+petición, las lecturas y escrituras de documentos facturables y las llamadas
+remotas (RPC de Firestore y llamadas a Authentication).
+
+Cada endpoint se mide dos veces: en frío (cachés vacías) y en caliente (la
+misma petición repetida). Se imprime la tabla de costes y se compara con el
+presupuesto declarado en BUDGETS, que es exactamente el coste medido: si
+algún endpoint lo supera, o queda por debajo y hay que ajustar BUDGETS, el
+script termina con código 1. Así un cambio que añade una lectura a una ruta
+caliente se ve en la revisión. tests/test_read_budget.py ejecuta la misma
+comprobación con pytest.
+
+Uso:
+    python check_read_budget.py
+    python -m pytest tests/test_read_budget.py
+"""
+import os
+import sys
+import copy
+import itertools
+import json
+from types import SimpleNamespace
+from unittest import mock
+from firebase_admin import auth, firestore
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1.field_path import FieldPath
+from backend.firebase_service import FirebaseService
+from backend.lesson_reader import iter_lessons_csv
+from config import Config
+
+
+# Lecciones del catálogo de prueba (las primeras de cada CSV)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SOURCE_CSVS = [
+    os.path.join(DATA_DIR, 'python_python_básico.csv'),
+    os.path.join(DATA_DIR, 'python_python_intermedio.csv'),
+    os.path.join(DATA_DIR, 'python_python_avanzado.csv')
+]
+LESSONS_PER_CSV = 3
+CATALOG_SIZE = LESSONS_PER_CSV * len(SOURCE_CSVS)
+
+# El coste se mide sobre el código de Firestore (el singleton de FirebaseService),
+# que run_checks pone en las rutas sea cual sea STORAGE_BACKEND
+firebase_service = FirebaseService()
+
+# Presupuesto por endpoint: {'cold' | 'warm': (lecturas, escrituras, llamadas remotas)},
+# igual al coste medido. En frío, la versión del catálogo (ETag de los listados)
+# es una lectura de metadata/catalog; una lección suelta usa el hash de su contenido
+BUDGETS = {
+    'POST /api/register': {'cold': (0, 2, 2), 'warm': (0, 2, 2)},
+    # El email repetido lo rechaza Authentication antes de escribir en Firestore
+    'POST /api/register (email repetido)': {'cold': (0, 0, 1), 'warm': (0, 0, 1)},
+    'POST /api/login (email)': {'cold': (1, 0, 2), 'warm': (0, 0, 1)},
+    'POST /api/login (usuario)': {'cold': (2, 0, 3), 'warm': (0, 0, 1)},
+    'GET /api/me': {'cold': (1, 0, 1), 'warm': (1, 0, 1)},
+    'GET /api/progress': {'cold': (1, 0, 1), 'warm': (1, 0, 1)},
+    'GET /api/lessons': {'cold': (CATALOG_SIZE + 1, 0, 2), 'warm': (0, 0, 0)},
+    'GET /api/lessons?category': {'cold': (LESSONS_PER_CSV + 1, 0, 2), 'warm': (0, 0, 0)},
+    'GET /api/lessons/catalog': {'cold': (1, 0, 1), 'warm': (0, 0, 0)},
+    'GET /api/lessons/<id>': {'cold': (1, 0, 1), 'warm': (0, 0, 0)},
+    'GET /api/lessons/categories': {'cold': (0, 0, 0), 'warm': (0, 0, 0)},
+    # Una lección que no está en caché: su lectura y un commit sin lecturas
+    # previas con dos escrituras, el marcador de la lección (create) y el
+    # progreso con Increment (ver FirebaseService._complete_lesson)
+    'POST /api/progress/complete/<id>': {'cold': (1, 2, 2), 'warm': (1, 2, 2)},
+    # Caso habitual: la lección se acaba de abrir y sale de la caché
+    'POST /api/progress/complete (abierta)': {'cold': (0, 2, 1), 'warm': (0, 2, 1)},
+    'POST /api/logout': {'cold': (0, 0, 0), 'warm': (0, 0, 0)},
+    'GET /api/health': {'cold': (0, 0, 0), 'warm': (0, 0, 0)}
+}
+
+
+# ============================================
+# FIRESTORE Y AUTHENTICATION LOCALES
+# ============================================
+
+class Usage:
+    """Coste acumulado desde el último reset()"""
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.reads = 0
+        self.writes = 0
+        self.calls = 0
+    
+    def as_tuple(self):
+        return self.reads, self.writes, self.calls
+
+
+class LocalSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+    
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+class LocalQuery:
+    """Consulta sobre una colección (where ==, order_by, select, start_after, limit)"""
+    
+    def __init__(self, client, path, filters=(), order=None, fields=None, after=None, limit=None):
+        self._client = client
+        self._path = path
+        self._filters = filters
+        self._order = order
+        self._fields = fields
+        self._after = after
+        self._limit = limit
+    
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, order=self._order, fields=self._fields,
+                     after=self._after, limit=self._limit)
+        state.update(changes)
+        return LocalQuery(self._client, self._path, **state)
+    
+    def where(self, field, op, value):
+        assert op == '==', f"Operador no soportado: {op}"
+        return self._copy(filters=self._filters + ((field, value),))
+    
+    def order_by(self, field):
+        return self._copy(order=field)
+    
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+    
+    def start_after(self, cursor):
+        if isinstance(cursor, LocalSnapshot):
+            cursor = self._sort_key(cursor.id, self._client.documents[cursor.reference.path])
+        else:
+            cursor = cursor[self._order]
+        return self._copy(after=cursor)
+    
+    def limit(self, count):
+        return self._copy(limit=count)
+    
+    def _sort_key(self, document_id, data):
+        return document_id if self._order in (None, '__name__') else data.get(self._order)
+    
+    def get(self):
+        results = []
+        prefix = self._path + '/'
+        for path, data in self._client.documents.items():
+            document_id = path[len(prefix):]
+            if not path.startswith(prefix) or '/' in document_id:
+                continue
+            if any(data.get(field) != value for field, value in self._filters):
+                continue
+            results.append((self._sort_key(document_id, data), path, data))
+        
+        results.sort(key=lambda item: item[0])
+        if self._after is not None:
+            results = [item for item in results if item[0] > self._after]
+        if self._limit is not None:
+            results = results[:self._limit]
+        
+        self._client.usage.calls += 1
+        self._client.usage.reads += max(1, len(results))
+        
+        snapshots = []
+        for _, path, data in results:
+            if self._fields is not None:
+                data = {field: data[field] for field in self._fields if field in data}
+            snapshots.append(LocalSnapshot(LocalDocument(self._client, path), copy.deepcopy(data)))
+        return snapshots
+    
+    def stream(self):
+        return iter(self.get())
+
+
+class LocalCollection(LocalQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.id = path.split('/')[-1]
+    
+    def document(self, document_id=None):
+        return LocalDocument(self._client, f"{self._path}/{document_id or self._client.new_id()}")
+    
+    def add(self, data):
+        reference = self.document()
+        self._client.usage.calls += 1
+        self._client.usage.writes += 1
+        self._client.documents[reference.path] = copy.deepcopy(data)
+        return None, reference
+
+
+class LocalDocument:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.split('/')[-1]
+    
+    @property
+    def parent(self):
+        return LocalCollection(self._client, self.path.rsplit('/', 1)[0])
+    
+    def collection(self, name):
+        return LocalCollection(self._client, f"{self.path}/{name}")
+    
+    def get(self, transaction=None):
+        self._client.usage.calls += 1
+        self._client.usage.reads += 1
+        return LocalSnapshot(self, copy.deepcopy(self._client.documents.get(self.path)))
+    
+    def set(self, data):
+        self._client.usage.calls += 1
+        self._client.usage.writes += 1
+        self._client.documents[self.path] = copy.deepcopy(data)
+    
+    def delete(self):
+        self._client.usage.calls += 1
+        self._client.usage.writes += 1
+        self._client.documents.pop(self.path, None)
+
+
+class LocalBatch:
+    """Escritura en lote atómica: create, set, update (con Increment y ArrayUnion) y delete"""
+    
+    def __init__(self, client):
+        self._client = client
+        self._operations = []
+    
+    def __len__(self):
+        return len(self._operations)
+    
+    def create(self, reference, data):
+        self._operations.append(('create', reference, data))
+    
+    def set(self, reference, data):
+        self._operations.append(('set', reference, data))
+    
+    def update(self, reference, data):
+        self._operations.append(('update', reference, data))
+    
+    def delete(self, reference):
+        self._operations.append(('delete', reference, None))
+    
+    def commit(self):
+        documents = self._client.documents
+        self._client.usage.calls += 1
+        
+        for operation, reference, _ in self._operations:
+            if operation == 'create' and reference.path in documents:
+                raise AlreadyExists(f"Document already exists: {reference.path}")
+            if operation == 'update' and reference.path not in documents:
+                raise NotFound(f"No document to update: {reference.path}")
+        
+        self._client.usage.writes += len(self._operations)
+        results = []
+        for operation, reference, data in self._operations:
+            transform_results = []
+            if operation == 'delete':
+                documents.pop(reference.path, None)
+            elif operation == 'update':
+                transform_results = self._apply_update(documents[reference.path], data)
+            else:
+                documents[reference.path] = copy.deepcopy(data)
+            results.append(SimpleNamespace(transform_results=transform_results))
+        return results
+    
+    @staticmethod
+    def _apply_update(document, changes):
+        # Los resultados de las transformaciones se devuelven ordenados por ruta
+        transform_results = []
+        for path in sorted(changes, key=lambda path: FieldPath.from_api_repr(path).parts):
+            *parents, field = FieldPath.from_api_repr(path).parts
+            target = document
+            for part in parents:
+                target = target.setdefault(part, {})
+            
+            value = changes[path]
+            if isinstance(value, firestore.Increment):
+                target[field] = target.get(field, 0) + value.value
+                transform_results.append(SimpleNamespace(integer_value=target[field]))
+            elif isinstance(value, firestore.ArrayUnion):
+                current = target.setdefault(field, [])
+                current.extend(item for item in value.values if item not in current)
+                transform_results.append(SimpleNamespace(integer_value=0))
+            else:
+                target[field] = copy.deepcopy(value)
+        return transform_results
+
+
+class LocalFirestore:
+    """Cliente de Firestore en memoria con el subconjunto que usa FirebaseService"""
+    
+    def __init__(self, usage):
+        self.usage = usage
+        self.documents = {}
+        self._ids = itertools.count(1)
+    
+    def new_id(self):
+        return f"doc{next(self._ids):06d}"
+    
+    def collection(self, name):
+        return LocalCollection(self, name)
+    
+    def batch(self):
+        return LocalBatch(self)
+
+
+class LocalAuth:
+    """Authentication en memoria (create_user, get_user_by_email, delete_user)"""
+    
+    def __init__(self, usage):
+        self.usage = usage
+        self.users = {}
+    
+    def create_user(self, uid, email, password, display_name, app=None):
+        self.usage.calls += 1
+        if email in self.users:
+            raise auth.EmailAlreadyExistsError("Email ya registrado", None, None)
+        self.users[email] = SimpleNamespace(uid=uid, email=email, display_name=display_name)
+        return self.users[email]
+    
+    def get_user_by_email(self, email, app=None):
+        self.usage.calls += 1
+        if email not in self.users:
+            raise auth.UserNotFoundError("Usuario no encontrado")
+        return self.users[email]
+    
+    def delete_user(self, uid, app=None):
+        self.usage.calls += 1
+        for email, user in list(self.users.items()):
+            if user.uid == uid:
+                del self.users[email]
+
+
+# ============================================
+# CASOS
+# ============================================
+
+def clear_caches():
+    firebase_service.lesson_cache.clear()
+    firebase_service.user_cache.clear()
+    firebase_service.unknown_user_cache.clear()
+    firebase_service.progress_versions.clear()
+
+
+def login(client, identifier):
+    return client.post('/api/login', json={'identifier': identifier, 'password': 'Secreto123!'})
+
+
+def build_cases(lesson_ids):
+    """
+    Peticiones a medir: (nombre, preparar(client, i), petición(client, i))
+    
+    i es 0 en frío y 1 en caliente; las peticiones que no se pueden repetir
+    (registro, completar) usan un usuario o una lección distintos en cada una.
+    """
+    first = lesson_ids[0]
+    return [
+        ('POST /api/register', None, lambda c, i: c.post('/api/register', json={
+            'username': f'estudiante{i}', 'email': f'estudiante{i}@example.com', 'password': 'Secreto123!'
+        })),
+        ('POST /api/register (email repetido)', None, lambda c, i: c.post('/api/register', json={
+            'username': f'otro{i}', 'email': 'estudiante0@example.com', 'password': 'Secreto123!'
+        })),
+        ('POST /api/login (email)', None, lambda c, i: login(c, 'estudiante0@example.com')),
+        ('POST /api/login (usuario)', None, lambda c, i: login(c, 'estudiante0')),
+        ('GET /api/me', None, lambda c, i: c.get('/api/me')),
+        ('GET /api/progress', None, lambda c, i: c.get('/api/progress')),
+        ('GET /api/lessons', None, lambda c, i: c.get('/api/lessons')),
+        ('GET /api/lessons?category', None,
+         lambda c, i: c.get('/api/lessons', query_string={'category': Config.LESSON_CATEGORIES[0]})),
+        ('GET /api/lessons/catalog', None, lambda c, i: c.get('/api/lessons/catalog')),
+        ('GET /api/lessons/<id>', None, lambda c, i: c.get(f'/api/lessons/{first}')),
+        ('GET /api/lessons/categories', None, lambda c, i: c.get('/api/lessons/categories')),
+        ('POST /api/progress/complete/<id>', None,
+         lambda c, i: c.post(f'/api/progress/complete/{lesson_ids[i + 1]}')),
+        ('POST /api/progress/complete (abierta)',
+         lambda c, i: c.get(f'/api/lessons/{lesson_ids[i + 3]}'),
+         lambda c, i: c.post(f'/api/progress/complete/{lesson_ids[i + 3]}')),
+        ('POST /api/logout', lambda c, i: login(c, 'estudiante0'), lambda c, i: c.post('/api/logout')),
+        ('GET /api/health', None, lambda c, i: c.get('/api/health'))
+    ]
+
+
+def completion_outcomes(storage, lessons, set_progress):
+    """
+    Completar lecciones repetidas con un usuario nuevo y con uno sin migrar
+    
+    Args:
+        storage (StorageBackend): Backend con el catálogo de prueba ya cargado
+        lessons (list): Lecciones del catálogo (con id)
+        set_progress (callable): Sustituye el progreso guardado de un usuario (uid, progress)
+    
+    Returns:
+        list: (mensaje, total_points) de cada intento
+    """
+    first, second = lessons[0]['id'], lessons[1]['id']
+    _, _, new_user = storage.create_user('repite@example.com', 'Secreto123!', 'repite')
+    _, _, legacy_user = storage.create_user('antiguo@example.com', 'Secreto123!', 'antiguo')
+    # Formato anterior: lista de IDs y puntos acumulados
+    set_progress(legacy_user, {'completed_lessons': [first], 'total_points': 10, 'current_level': 'Python Básico'})
+    # /api/me lee el progreso (y lo convierte) antes de que se pueda completar nada
+    storage.get_user_progress(legacy_user)
+    
+    attempts = [(new_user, first), (new_user, first), (legacy_user, first), (legacy_user, second)]
+    outcomes = []
+    for user_id, lesson_id in attempts:
+        _, message, progress = storage.complete_lesson(user_id, lesson_id)
+        outcomes.append((message, progress['total_points']))
+    return outcomes
+
+
+def check_repeat_completion(local_firestore, lessons):
+    """
+    Comprobar que todos los backends tratan igual una lección ya completada
+    
+    Returns:
+        list: Problemas encontrados (vacía si todos coinciden con lo esperado)
+    """
+    from backend.local_storage import MemoryStorage, SQLiteStorage
+    
+    expected = [("Progreso actualizado", 10), ("Sin cambios", 10), ("Sin cambios", 10), ("Progreso actualizado", 20)]
+    
+    def firestore_progress(uid, progress):
+        local_firestore.documents[f"{Config.USERS_COLLECTION}/{uid}"]['progress'] = progress
+    
+    memory = MemoryStorage()
+    sqlite = SQLiteStorage(':memory:')
+    backends = [
+        ('firestore', firebase_service, firestore_progress),
+        ('memory', memory, lambda uid, progress: memory._users[uid].update(progress=progress)),
+        ('sqlite', sqlite, lambda uid, progress: sqlite._conn.execute(
+            'UPDATE users SET progress = ? WHERE uid = ?', (json.dumps(progress), uid)))
+    ]
+    
+    problems = []
+    for name, storage, set_progress in backends:
+        if storage is not firebase_service:
+            storage.sync_lessons(lessons)
+        catalog = storage.get_all_lessons(summary=True)
+        outcomes = completion_outcomes(storage, catalog, set_progress)
+        print(f"Lección repetida ({name}): {outcomes}")
+        if outcomes != expected:
+            problems.append(f"lección repetida en {name}: {outcomes} (esperado {expected})")
+    return problems
+
+
+def budget_mismatches(measured, budget):
+    """
+    Columnas (lecturas, escrituras, llamadas) que no coinciden con el presupuesto
+    
+    Returns:
+        list: 'lecturas 2 > 1' si se supera, 'lecturas 0 < 1' si hay que bajar el presupuesto
+    """
+    names = ('lecturas', 'escrituras', 'llamadas')
+    return [f"{name} {value} {'>' if value > limit else '<'} {limit}"
+            for name, value, limit in zip(names, measured, budget) if value != limit]
+
+
+def run_checks():
+    """
+    Medir cada endpoint en frío y en caliente e imprimir la tabla de costes
+    
+    El cliente de Firestore, Authentication y el backend de las rutas solo se
+    sustituyen dentro de esta función (mock.patch los restaura al salir) y las
+    cachés se vacían al terminar, de modo que lo que se ejecute después, como
+    otros tests de pytest, no ve los datos de prueba.
+    
+    Returns:
+        list: (endpoint, problemas) de los que no coinciden con su presupuesto
+            o tratan mal una lección repetida (vacía si todo está bien)
+    """
+    usage = Usage()
+    local_firestore = LocalFirestore(usage)
+    local_auth = LocalAuth(usage)
+    
+    with mock.patch('backend.firebase_service.get_firebase_app'), \
+            mock.patch.multiple(auth, create_user=local_auth.create_user,
+                                get_user_by_email=local_auth.get_user_by_email,
+                                delete_user=local_auth.delete_user), \
+            mock.patch.object(firebase_service, '_db', local_firestore), \
+            mock.patch('backend.routes.firebase_service', firebase_service), \
+            mock.patch('app.firebase_service', firebase_service):
+        try:
+            return _measure(usage, local_firestore)
+        finally:
+            clear_caches()
+
+
+def _measure(usage, local_firestore):
+    """Cargar el catálogo de prueba y medir los endpoints (ver run_checks)"""
+    from app import create_app
+    
+    lessons = []
+    for filepath in SOURCE_CSVS:
+        lessons.extend(itertools.islice(iter_lessons_csv(filepath), LESSONS_PER_CSV))
+    firebase_service.sync_lessons(lessons)
+    lesson_ids = [lesson['id'] for lesson in firebase_service.get_all_lessons(summary=True)]
+    
+    app = create_app()
+    client = app.test_client()
+    
+    print("\n" + "="*82)
+    print("💰 COSTE EN FIRESTORE POR ENDPOINT (lecturas / escrituras / llamadas remotas)")
+    print("="*82)
+    print(f"{'Endpoint':<38} {'Estado':>6}  {'En frío':>10}  {'En caliente':>11}  Presupuesto (caliente)")
+    print("-" * 82)
+    
+    failures = []
+    for name, prepare, make_request in build_cases(lesson_ids):
+        measured = {}
+        statuses = []
+        for i, phase in enumerate(('cold', 'warm')):
+            if phase == 'cold':
+                clear_caches()
+            if prepare:
+                prepare(client, i)
+            usage.reset()
+            statuses.append(make_request(client, i).status_code)
+            measured[phase] = usage.as_tuple()
+        
+        budget = BUDGETS.get(name)
+        problems = []
+        if budget is None:
+            problems.append('sin presupuesto declarado')
+        else:
+            for phase in ('cold', 'warm'):
+                mismatches = budget_mismatches(measured[phase], budget[phase])
+                if mismatches:
+                    problems.append(f"{'frío' if phase == 'cold' else 'caliente'}: {', '.join(mismatches)}")
+        
+        cells = ['/'.join(str(value) for value in measured[phase]) for phase in ('cold', 'warm')]
+        status = '✅' if not problems else '❌'
+        limits = '/'.join(str(value) for value in budget['warm']) if budget else '-'
+        print(f"{name:<38} {statuses[-1]:>6}  {cells[0]:>10}  {cells[1]:>11}  {status} {limits}")
+        if problems:
+            failures.append((name, problems))
+    
+    print("-" * 82)
+    print(f"Catálogo de prueba: {len(lesson_ids)} lecciones")
+    
+    problems = check_repeat_completion(local_firestore, lessons)
+    if problems:
+        failures.append(('POST /api/progress/complete/<id>', problems))
+    for name, problems in failures:
+        print(f"❌ {name}: {'; '.join(problems)}")
+    print("="*82 + "\n")
+    
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run_checks() else 0)
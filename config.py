@@ -1,30 +1,123 @@
-"""
-Configuración centralizada de Firebase y la aplicación Flask
-"""
-import os
-from dotenv import load_dotenv
-
-# Cargar variables de entorno
-load_dotenv()
-
-class Config:
-    """Configuración general de la aplicación"""
-    
-    # Flask
-    SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
-    DEBUG = os.getenv('FLASK_ENV', 'development') == 'development'
-    
-    # Firebase
-    FIREBASE_CREDENTIALS = os.getenv('FIREBASE_CREDENTIALS_PATH', 'firebase-credentials.json')
-    
-    # Configuración de la base de datos
-    # Nombres de las colecciones en Firestore
-    USERS_COLLECTION = 'users'
-    LESSONS_COLLECTION = 'lessons'
-    PROGRESS_COLLECTION = 'user_progress'
-    
-    # Configuración del curso
-    LESSON_CATEGORIES = ['Python Básico', 'Python Intermedio', 'Python Avanzado']
-    
-    # CORS (permitir peticiones desde el frontend)
+"""
+Configuración centralizada de Firebase y la aplicación Flask
+"""
+import os
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+class Config:
+    """Configuración general de la aplicación"""
+    
+    # Flask
+    SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
+    DEBUG = os.getenv('FLASK_ENV', 'development') == 'development'
+    
+    # Firebase
+    FIREBASE_CREDENTIALS = os.getenv('FIREBASE_CREDENTIALS_PATH', 'firebase-credentials.json')
+    
+    # Configuración de la base de datos
+    # Backend de almacenamiento: 'firestore', 'memory' o 'sqlite'
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firestore')
+    SQLITE_DATABASE = os.getenv('SQLITE_DATABASE_PATH', 'learncode.db')
+    # Hash de contraseñas de los backends locales (formato de werkzeug.security);
+    # el scrypt por defecto tarda cientos de ms y load_test.py usa uno barato
+    LOCAL_PASSWORD_HASH_METHOD = os.getenv('LOCAL_PASSWORD_HASH_METHOD', 'scrypt')
+    
+    # Nombres de las colecciones en Firestore
+    USERS_COLLECTION = 'users'
+    LESSONS_COLLECTION = 'lessons'
+    PROGRESS_COLLECTION = 'user_progress'
+    # Índice usernames/{username} -> {uid, email} (reserva única del nombre)
+    USERNAMES_COLLECTION = 'usernames'
+    # Marcadores users/{uid}/completions/{numero_leccion} de las lecciones completadas
+    COMPLETIONS_SUBCOLLECTION = 'completions'
+    # Documentos de control (metadata/catalog guarda la versión del catálogo)
+    METADATA_COLLECTION = 'metadata'
+    CATALOG_METADATA_DOCUMENT = 'catalog'
+    
+    # Caché en memoria de lecciones (segundos de vida y número máximo de entradas)
+    LESSON_CACHE_TTL = int(os.getenv('LESSON_CACHE_TTL', '300'))
+    LESSON_CACHE_MAX_ENTRIES = int(os.getenv('LESSON_CACHE_MAX_ENTRIES', '256'))
+    
+    # Caché de búsquedas del login en FirebaseService (usuario -> uid/email, uid -> perfil)
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))
+    USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', '4096'))
+    # Identificadores desconocidos (caché negativa, más corta)
+    USER_NEGATIVE_CACHE_TTL = int(os.getenv('USER_NEGATIVE_CACHE_TTL', '30'))
+    
+    # Copia del progreso en la sesión (cookie firmada) para no leer Firestore en cada
+    # petición; se vuelve a leer si su versión es anterior a la última que conoce el
+    # proceso o pasados PROGRESS_SNAPSHOT_TTL segundos (cambios desde otro dispositivo)
+    SESSION_PROGRESS_SNAPSHOT = os.getenv('SESSION_PROGRESS_SNAPSHOT', 'false').lower() == 'true'
+    PROGRESS_SNAPSHOT_TTL = int(os.getenv('PROGRESS_SNAPSHOT_TTL', '300'))
+    
+    # Cache-Control de las respuestas de lecciones (con ETag; el navegador revalida con 304)
+    LESSON_CACHE_CONTROL = os.getenv('LESSON_CACHE_CONTROL', 'private, no-cache')
+    
+    # Compresión de respuestas (gzip, y brotli si está instalado)
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '6'))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '5'))
+    # Bytes ya comprimidos de las respuestas con ETag
+    COMPRESSION_CACHE_TTL = int(os.getenv('COMPRESSION_CACHE_TTL', '3600'))
+    COMPRESSION_CACHE_MAX_ENTRIES = int(os.getenv('COMPRESSION_CACHE_MAX_ENTRIES', '128'))
+    
+    # Paginación de /api/lessons (lecciones por página por defecto y máximo)
+    LESSONS_PAGE_SIZE = int(os.getenv('LESSONS_PAGE_SIZE', '50'))
+    LESSONS_MAX_PAGE_SIZE = int(os.getenv('LESSONS_MAX_PAGE_SIZE', '200'))
+    
+    # Catálogo precompilado que genera import_lessons.py (archivos estáticos inmutables)
+    STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    CATALOG_SNAPSHOT_DIR = os.path.join(STATIC_DIR, 'catalog')
+    
+    # Métricas en /metrics (formato de Prometheus); con varios workers, carpeta
+    # compartida donde cada proceso vuelca las suyas cada METRICS_FLUSH_INTERVAL segundos
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_DIR = os.getenv('METRICS_DIR', '')
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+    # Token que Prometheus envía en 'Authorization: Bearer ...' (vacío: solo administradores)
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+    
+    # Trazas de Firestore por petición: aviso en el log si una petición supera
+    # TRACE_READ_BUDGET lecturas (0 lo desactiva) o lee dos veces el mismo documento
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+    TRACE_READ_BUDGET = int(os.getenv('TRACE_READ_BUDGET', '25'))
+    TRACE_LOG_REQUESTS = os.getenv('TRACE_LOG_REQUESTS', 'false').lower() == 'true'
+    
+    # Perfilado de peticiones con cProfile (solo staging o local): a petición con
+    # X-Profile: 1 como administrador o con X-Profile-Token igual a PROFILE_TOKEN,
+    # y una fracción al azar. PROFILE_MAX_PATHS limita los caminos del .collapsed
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+    PROFILE_MAX_PATHS = int(os.getenv('PROFILE_MAX_PATHS', '50000'))
+    ADMIN_USERNAMES = [name for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name]
+    
+    # Importación de lecciones en lotes (máximo 500 por lote en Firestore)
+    IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '400'))
+    IMPORT_MAX_RETRIES = int(os.getenv('IMPORT_MAX_RETRIES', '3'))
+    IMPORT_RETRY_BACKOFF = float(os.getenv('IMPORT_RETRY_BACKOFF', '1.0'))
+    IMPORT_WRITERS = int(os.getenv('IMPORT_WRITERS', '4'))
+    IMPORT_QUEUE_SIZE = int(os.getenv('IMPORT_QUEUE_SIZE', '8'))
+    
+    # Borrado masivo de lecciones (IDs por página y lotes en paralelo)
+    DELETE_PAGE_SIZE = int(os.getenv('DELETE_PAGE_SIZE', '500'))
+    DELETE_MAX_WORKERS = int(os.getenv('DELETE_MAX_WORKERS', '4'))
+    
+    # Hilos por proceso del modo asíncrono (asgi.py) para Authentication, que no tiene
+    # API asíncrona, y para los backends locales (Firestore usa el cliente asíncrono)
+    FIREBASE_MAX_WORKERS = int(os.getenv('FIREBASE_MAX_WORKERS', '8'))
+    
+    # Abrir la conexión del almacenamiento al arrancar cada proceso del servidor
+    # (después del fork) en lugar de en la primera petición
+    STORAGE_WARM_UP = os.getenv('STORAGE_WARM_UP', 'true').lower() == 'true'
+    
+    # Configuración del curso
+    LESSON_CATEGORIES = ['Python Básico', 'Python Intermedio', 'Python Avanzado']
+    
+    # CORS (permitir peticiones desde el frontend)
     CORS_ORIGINS = ['http://localhost:5000', 'http://127.0.0.1:5000']
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""
+Configuración de gunicorn para producción
+
+Uso:
+    gunicorn "app:create_app()"
+
+Con preload_app la aplicación se importa una sola vez en el proceso maestro
+y los workers la heredan con el fork. Importarla no abre ninguna conexión con
+Firebase (el canal gRPC no sobrevive a un fork): cada worker abre la suya en
+post_fork.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Abrir las conexiones del almacenamiento en el worker recién creado"""
+    from app import warm_up
+    
+    elapsed = warm_up()
+    if elapsed is not None:
+        server.log.info("Worker %s: almacenamiento preparado en %.0f ms", worker.pid, elapsed * 1000)
+
+
+def child_exit(server, worker):
+    """Sumar las métricas del worker terminado al agregado de METRICS_DIR y borrar su archivo"""
+    from backend.metrics import retire_worker
+    
+    retire_worker(worker.pid)
@@ -1,182 +1,400 @@
-"""
-Script para importar lecciones desde archivos CSV a Firebase Firestore
-"""
-import pandas as pd
-import os
-from backend.firebase_service import firebase_service
-from config import Config
-
-
-def import_lessons_from_csv():
-    """
-    Importa todas las lecciones desde los archivos CSV a Firestore
-    """
-    print("\n" + "="*60)
-    print("📚 IMPORTADOR DE LECCIONES A FIREBASE")
-    print("="*60 + "\n")
-    
-    # Directorio donde están los CSV
-    data_dir = 'data'
-    
-    # Lista de archivos CSV
-    csv_files = [
-        'python_python_básico.csv',
-        'python_python_intermedio.csv',
-        'python_python_avanzado.csv',
-        # 'python_w3schools.csv'  # Este contiene todas las lecciones
-    ]
-    
-    total_imported = 0
-    
-    # Verificar si el directorio existe
-    if not os.path.exists(data_dir):
-        print(f"❌ No se encontró el directorio '{data_dir}'")
-        print("   Copiando archivos CSV desde uploads...")
-        
-        # Crear directorio
-        os.makedirs(data_dir, exist_ok=True)
-        
-        # Copiar archivos desde uploads
-        import shutil
-        for csv_file in csv_files:
-            src = f'/mnt/user-data/uploads/{csv_file}'
-            dst = f'{data_dir}/{csv_file}'
-            if os.path.exists(src):
-                shutil.copy(src, dst)
-                print(f"   ✅ Copiado: {csv_file}")
-    
-    # Procesar cada archivo CSV
-    for csv_file in csv_files:
-        filepath = os.path.join(data_dir, csv_file)
-        
-        if not os.path.exists(filepath):
-            print(f"⚠️  Archivo no encontrado: {csv_file}")
-            continue
-        
-        print(f"\n📂 Procesando: {csv_file}")
-        print("-" * 60)
-        
-        try:
-            # Leer CSV
-            df = pd.read_csv(filepath, encoding='utf-8-sig')
-            
-            print(f"   Lecciones encontradas: {len(df)}")
-            
-            # Importar cada lección
-            for index, row in df.iterrows():
-                lesson_data = {
-                    'numero_leccion': int(row.get('numero_leccion', index + 1)),
-                    'titulo': str(row.get('titulo', 'Sin título')),
-                    'descripcion': str(row.get('descripcion', ''))[:500],  # Limitar a 500 chars
-                    'ejemplos_codigo': str(row.get('ejemplos_codigo', ''))[:1000],  # Limitar a 1000 chars
-                    'categoria': str(row.get('categoria', 'Python Básico')),
-                    'url': str(row.get('url', '')) if pd.notna(row.get('url')) else ''
-                }
-                
-                # Agregar a Firestore
-                success, message, lesson_id = firebase_service.add_lesson(lesson_data)
-                
-                if success:
-                    total_imported += 1
-                    if (index + 1) % 10 == 0:  # Mostrar progreso cada 10 lecciones
-                        print(f"   ✅ {index + 1}/{len(df)} lecciones importadas...")
-                else:
-                    print(f"   ❌ Error en lección {index + 1}: {message}")
-            
-            print(f"   ✅ Completado: {len(df)} lecciones de {csv_file}")
-            
-        except Exception as e:
-            print(f"   ❌ Error al procesar {csv_file}: {str(e)}")
-            continue
-    
-    print("\n" + "="*60)
-    print(f"✅ IMPORTACIÓN COMPLETADA")
-    print(f"📊 Total de lecciones importadas: {total_imported}")
-    print("="*60 + "\n")
-
-
-def verify_import():
-    """
-    Verificar que las lecciones se importaron correctamente
-    """
-    print("\n🔍 Verificando importación...")
-    print("-" * 60)
-    
-    # Obtener todas las lecciones
-    lessons = firebase_service.get_all_lessons()
-    
-    print(f"Total de lecciones en Firestore: {len(lessons)}")
-    
-    # Contar por categoría
-    categories = {}
-    for lesson in lessons:
-        cat = lesson.get('categoria', 'Sin categoría')
-        categories[cat] = categories.get(cat, 0) + 1
-    
-    print("\nLecciones por categoría:")
-    for cat, count in categories.items():
-        print(f"  • {cat}: {count} lecciones")
-    
-    # Mostrar primeras 5 lecciones
-    print("\n📚 Primeras 5 lecciones:")
-    for i, lesson in enumerate(lessons[:5], 1):
-        print(f"  {i}. [{lesson.get('categoria')}] {lesson.get('titulo')}")
-    
-    print("-" * 60)
-
-
-def clear_all_lessons():
-    """
-    Eliminar todas las lecciones de Firestore (usar con precaución)
-    """
-    print("\n⚠️  ADVERTENCIA: Esto eliminará TODAS las lecciones de Firestore")
-    confirm = input("¿Estás seguro? (escribe 'SI' para confirmar): ")
-    
-    if confirm != 'SI':
-        print("❌ Operación cancelada")
-        return
-    
-    print("\n🗑️  Eliminando lecciones...")
-    
-    try:
-        # Obtener todas las lecciones
-        lessons = firebase_service.get_all_lessons()
-        
-        # Eliminar cada una
-        for lesson in lessons:
-            firebase_service.db.collection(Config.LESSONS_COLLECTION).document(
-                lesson['id']
-            ).delete()
-        
-        print(f"✅ {len(lessons)} lecciones eliminadas")
-        
-    except Exception as e:
-        print(f"❌ Error al eliminar: {str(e)}")
-
-
-if __name__ == "__main__":
-    import sys
-    
-    print("\n" + "="*60)
-    print("🔥 FIREBASE - GESTIÓN DE LECCIONES")
-    print("="*60)
-    print("\nOpciones:")
-    print("1. Importar lecciones desde CSV")
-    print("2. Verificar lecciones importadas")
-    print("3. Eliminar todas las lecciones (¡CUIDADO!)")
-    print("4. Salir")
-    print("="*60)
-    
-    opcion = input("\nSelecciona una opción (1-4): ").strip()
-    
-    if opcion == "1":
-        import_lessons_from_csv()
-        verify_import()
-    elif opcion == "2":
-        verify_import()
-    elif opcion == "3":
-        clear_all_lessons()
-    elif opcion == "4":
-        print("\n👋 ¡Hasta pronto!")
-    else:
+"""
+Script para importar lecciones desde archivos CSV a Firebase Firestore
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from backend.firebase_service import firebase_service
+from backend.lesson_reader import iter_lessons_csv
+from backend.catalog import lesson_content_hash
+from backend.catalog_snapshot import write_catalog_snapshots
+from config import Config
+
+
+# Directorio donde están los CSV
+DATA_DIR = 'data'
+
+# Lista de archivos CSV
+CSV_FILES = [
+    'python_python_básico.csv',
+    'python_python_intermedio.csv',
+    'python_python_avanzado.csv',
+    # 'python_w3schools.csv'  # Este contiene todas las lecciones
+]
+
+
+def find_csv_files(data_dir=DATA_DIR, csv_files=CSV_FILES):
+    """
+    Localizar los CSV del curso (copiándolos desde uploads si falta el directorio)
+    
+    Returns:
+        dict: {nombre_archivo: ruta} de los archivos encontrados
+    """
+    # Verificar si el directorio existe
+    if not os.path.exists(data_dir):
+        print(f"❌ No se encontró el directorio '{data_dir}'")
+        print("   Copiando archivos CSV desde uploads...")
+        
+        # Crear directorio
+        os.makedirs(data_dir, exist_ok=True)
+        
+        # Copiar archivos desde uploads
+        import shutil
+        for csv_file in csv_files:
+            src = f'/mnt/user-data/uploads/{csv_file}'
+            dst = f'{data_dir}/{csv_file}'
+            if os.path.exists(src):
+                shutil.copy(src, dst)
+                print(f"   ✅ Copiado: {csv_file}")
+    
+    filepaths = {}
+    for csv_file in csv_files:
+        filepath = os.path.join(data_dir, csv_file)
+        if os.path.exists(filepath):
+            filepaths[csv_file] = filepath
+        else:
+            print(f"⚠️  Archivo no encontrado: {csv_file}")
+    return filepaths
+
+
+# Marca de fin de la cola de escritura (una por cada hilo escritor)
+_END_OF_STREAM = object()
+
+
+class ImportProgress:
+    """Contador de progreso compartido por los hilos escritores"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.imported = 0
+        self.errors = []
+        # {lesson_id: content_hash} de las lecciones escritas (para la versión del catálogo)
+        self.lesson_hashes = {}
+    
+    def log(self, message):
+        """Imprimir un mensaje sin mezclarlo con el de otros hilos"""
+        with self._lock:
+            print(message)
+    
+    def record(self, lesson_hashes, error=None):
+        """Registrar las lecciones escritas de un bloque (y su error, si lo hubo)"""
+        with self._lock:
+            self.imported += len(lesson_hashes)
+            self.lesson_hashes.update(lesson_hashes)
+            if error:
+                self.errors.append(error)
+                print(f"   ❌ {error}")
+            else:
+                print(f"   ✅ {self.imported} lecciones importadas...")
+
+
+def _read_into_queue(filepath, chunk_size, work_queue):
+    """Leer un CSV en streaming y encolar sus lecciones en bloques (se bloquea si la cola está llena)"""
+    total = 0
+    chunk = []
+    for lesson in iter_lessons_csv(filepath):
+        chunk.append(lesson)
+        if len(chunk) == chunk_size:
+            work_queue.put(chunk)
+            total += len(chunk)
+            chunk = []
+    
+    if chunk:
+        work_queue.put(chunk)
+        total += len(chunk)
+    return total
+
+
+def _write_from_queue(work_queue, progress):
+    """
+    Consumir bloques de la cola y guardarlos con una escritura en lote cada uno
+    
+    La versión del catálogo no se toca aquí: la guarda import_lessons_from_csv
+    una sola vez, cuando han terminado todos los escritores.
+    """
+    while True:
+        chunk = work_queue.get()
+        if chunk is _END_OF_STREAM:
+            return
+        
+        success, message, lesson_ids = firebase_service.add_lessons_bulk(
+            chunk, chunk_size=len(chunk), update_version=False
+        )
+        # lesson_ids sigue el orden del bloque (vacío si el commit falló)
+        progress.record(
+            {lesson_id: lesson_content_hash(lesson) for lesson_id, lesson in zip(lesson_ids, chunk)},
+            None if success else message
+        )
+
+
+def import_lessons_from_csv(chunk_size=None, writers=None, queue_size=None):
+    """
+    Importa todas las lecciones desde los archivos CSV a Firestore
+    
+    Los CSV se leen y normalizan en paralelo y alimentan una cola acotada que
+    consume un grupo de hilos escritores. El orden del catálogo no depende del
+    orden de escritura: cada lección conserva su numero_leccion del CSV.
+    
+    La versión del catálogo se guarda una vez al final, con los content_hash
+    de las lecciones que ya había (una consulta antes de empezar) y de las
+    escritas, en lugar de recorrer el catálogo después de cada bloque.
+    
+    Args:
+        chunk_size (int, optional): Lecciones por escritura en lote (por defecto Config.IMPORT_CHUNK_SIZE)
+        writers (int, optional): Hilos escritores (por defecto Config.IMPORT_WRITERS)
+        queue_size (int, optional): Bloques máximos en cola (por defecto Config.IMPORT_QUEUE_SIZE)
+    """
+    print("\n" + "="*60)
+    print("📚 IMPORTADOR DE LECCIONES A FIREBASE")
+    print("="*60 + "\n")
+    
+    chunk_size = max(1, min(chunk_size or Config.IMPORT_CHUNK_SIZE, firebase_service.MAX_BATCH_SIZE))
+    writers = max(1, writers or Config.IMPORT_WRITERS)
+    queue_size = max(1, queue_size or Config.IMPORT_QUEUE_SIZE)
+    
+    filepaths = find_csv_files()
+    
+    print(f"⚙️  {len(filepaths)} archivos, {writers} escritores, bloques de {chunk_size} lecciones")
+    print("-" * 60)
+    
+    start_time = time.perf_counter()
+    existing_hashes = firebase_service.get_lesson_hashes()
+    work_queue = queue.Queue(maxsize=queue_size)
+    progress = ImportProgress()
+    
+    # Arrancar los escritores antes que los lectores para no llenar la cola
+    writer_threads = [
+        threading.Thread(target=_write_from_queue, args=(work_queue, progress), daemon=True)
+        for _ in range(writers)
+    ]
+    for thread in writer_threads:
+        thread.start()
+    
+    # Leer y normalizar todos los CSV en paralelo
+    with ThreadPoolExecutor(max_workers=max(1, len(filepaths))) as readers:
+        futures = {
+            readers.submit(_read_into_queue, filepath, chunk_size, work_queue): csv_file
+            for csv_file, filepath in filepaths.items()
+        }
+        for future in as_completed(futures):
+            csv_file = futures[future]
+            try:
+                progress.log(f"📂 Leído: {csv_file} ({future.result()} lecciones)")
+            except Exception as e:
+                progress.log(f"   ❌ Error al procesar {csv_file}: {str(e)}")
+    
+    # Avisar a cada escritor de que no hay más bloques y esperar a que terminen
+    for _ in writer_threads:
+        work_queue.put(_END_OF_STREAM)
+    for thread in writer_threads:
+        thread.join()
+    
+    # Versión del catálogo completo (si no se pudieron leer los hashes previos, se consultan ahora)
+    firebase_service.update_catalog_version(
+        None if existing_hashes is None else {**existing_hashes, **progress.lesson_hashes}
+    )
+    
+    elapsed = time.perf_counter() - start_time
+    
+    print("\n" + "="*60)
+    print(f"✅ IMPORTACIÓN COMPLETADA")
+    print(f"📊 Total de lecciones importadas: {progress.imported}")
+    print(f"⏱️  Tiempo total: {elapsed:.2f}s")
+    if progress.errors:
+        print(f"⚠️  Bloques con errores: {len(progress.errors)}")
+    print("="*60 + "\n")
+    
+    return progress.imported
+
+
+def sync_lessons_from_csv(chunk_size=None):
+    """
+    Sincroniza incrementalmente el catálogo de Firestore con los CSV
+    
+    A diferencia de la importación completa, usa IDs deterministas y compara
+    el hash del contenido: solo escribe lecciones nuevas o modificadas y solo
+    elimina las que ya no están en los CSV. Se puede repetir sin duplicar nada.
+    
+    La primera sincronización de un catálogo importado con la opción 1 (IDs
+    aleatorios) sustituye todos sus IDs; antes de eliminar los antiguos,
+    sync_lessons migra el progreso de los usuarios (como migrate_progress.py)
+    para no perder las lecciones completadas.
+    
+    Args:
+        chunk_size (int, optional): Operaciones por escritura en lote (por defecto Config.IMPORT_CHUNK_SIZE)
+    """
+    print("\n" + "="*60)
+    print("🔄 SINCRONIZACIÓN INCREMENTAL DE LECCIONES")
+    print("="*60 + "\n")
+    
+    lessons = []
+    for csv_file, filepath in find_csv_files().items():
+        file_lessons = list(iter_lessons_csv(filepath))
+        print(f"📂 Leído: {csv_file} ({len(file_lessons)} lecciones)")
+        lessons.extend(file_lessons)
+    
+    start_time = time.perf_counter()
+    success, message, stats = firebase_service.sync_lessons(
+        lessons,
+        chunk_size=chunk_size,
+        progress_callback=lambda done, total: print(f"   ✅ {done}/{total} cambios aplicados...")
+    )
+    elapsed = time.perf_counter() - start_time
+    
+    print("\n" + "="*60)
+    print(f"{'✅' if success else '❌'} {message}")
+    print(f"📊 Nuevas: {stats['added']} | Modificadas: {stats['updated']} | "
+          f"Eliminadas: {stats['deleted']} | Sin cambios: {stats['unchanged']}")
+    print(f"⏱️  Tiempo total: {elapsed:.2f}s")
+    print("="*60 + "\n")
+    
+    return stats
+
+
+def verify_import():
+    """
+    Verificar que las lecciones se importaron correctamente
+    """
+    print("\n🔍 Verificando importación...")
+    print("-" * 60)
+    
+    # Obtener todas las lecciones
+    lessons = firebase_service.get_all_lessons()
+    
+    print(f"Total de lecciones en Firestore: {len(lessons)}")
+    
+    # Contar por categoría
+    categories = {}
+    for lesson in lessons:
+        cat = lesson.get('categoria', 'Sin categoría')
+        categories[cat] = categories.get(cat, 0) + 1
+    
+    print("\nLecciones por categoría:")
+    for cat, count in categories.items():
+        print(f"  • {cat}: {count} lecciones")
+    
+    # Mostrar primeras 5 lecciones
+    print("\n📚 Primeras 5 lecciones:")
+    for i, lesson in enumerate(lessons[:5], 1):
+        print(f"  {i}. [{lesson.get('categoria')}] {lesson.get('titulo')}")
+    
+    print("-" * 60)
+
+
+def clear_all_lessons(category=None):
+    """
+    Eliminar todas las lecciones de Firestore, o solo las de una categoría (usar con precaución)
+    
+    Args:
+        category (str, optional): Categoría a eliminar (None elimina todas)
+    """
+    target = f"las lecciones de '{category}'" if category else "TODAS las lecciones"
+    print(f"\n⚠️  ADVERTENCIA: Esto eliminará {target} de Firestore")
+    confirm = input("¿Estás seguro? (escribe 'SI' para confirmar): ")
+    
+    if confirm != 'SI':
+        print("❌ Operación cancelada")
+        return
+    
+    print("\n🗑️  Eliminando lecciones...")
+    
+    start_time = time.perf_counter()
+    
+    # Se leen solo los IDs por páginas y se eliminan en lotes (invalida también la caché)
+    success, message, deleted = firebase_service.delete_all_lessons(
+        category=category,
+        progress_callback=lambda deleted: print(f"   🗑️  {deleted} lecciones eliminadas...")
+    )
+    
+    elapsed = time.perf_counter() - start_time
+    
+    if success:
+        print(f"✅ {deleted} lecciones eliminadas en {elapsed:.2f}s")
+    else:
+        print(f"❌ Error al eliminar: {message}")
+
+
+def build_catalog_snapshot():
+    """
+    Generar el catálogo estático (static/catalog/) con las lecciones actuales
+    
+    La API redirige a estos archivos mientras la versión del catálogo no cambie.
+    """
+    lessons = firebase_service.get_all_lessons(summary=True)
+    version = firebase_service.catalog_version()
+    
+    if version is None:
+        print("❌ No se pudo calcular la versión del catálogo")
+        return None
+    
+    manifest = write_catalog_snapshots(lessons, version)
+    
+    print(f"\n📦 Catálogo estático generado (versión {version}, {len(lessons)} lecciones)")
+    for category, filename in manifest['files'].items():
+        print(f"  • {category or 'Todas'}: {filename}")
+    
+    return manifest
+
+
+def choose_category():
+    """
+    Pedir al usuario una de las categorías del curso
+    
+    Returns:
+        str or None: Categoría elegida o None si la opción no es válida
+    """
+    for i, category in enumerate(Config.LESSON_CATEGORIES, 1):
+        print(f"  {i}. {category}")
+    
+    choice = input("\nCategoría: ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(Config.LESSON_CATEGORIES):
+        return Config.LESSON_CATEGORIES[int(choice) - 1]
+    return None
+
+
+if __name__ == "__main__":
+    import sys
+    
+    print("\n" + "="*60)
+    print("🔥 FIREBASE - GESTIÓN DE LECCIONES")
+    print("="*60)
+    print("\nOpciones:")
+    print("1. Importar lecciones desde CSV")
+    print("2. Sincronizar lecciones desde CSV (incremental, sin duplicados)")
+    print("3. Verificar lecciones importadas")
+    print("4. Eliminar todas las lecciones (¡CUIDADO!)")
+    print("5. Eliminar las lecciones de una categoría")
+    print("6. Generar el catálogo estático")
+    print("7. Salir")
+    print("="*60)
+    
+    opcion = input("\nSelecciona una opción (1-7): ").strip()
+    
+    if opcion == "1":
+        import_lessons_from_csv()
+        verify_import()
+        build_catalog_snapshot()
+    elif opcion == "2":
+        sync_lessons_from_csv()
+        verify_import()
+        build_catalog_snapshot()
+    elif opcion == "3":
+        verify_import()
+    elif opcion == "4":
+        clear_all_lessons()
+        build_catalog_snapshot()
+    elif opcion == "5":
+        category = choose_category()
+        if category:
+            clear_all_lessons(category)
+            build_catalog_snapshot()
+        else:
+            print("\n❌ Categoría inválida")
+    elif opcion == "6":
+        build_catalog_snapshot()
+    elif opcion == "7":
+        print("\n👋 ¡Hasta pronto!")
+    else:
         print("\n❌ Opción inválida")
\ No newline at end of file
@@ -0,0 +1,287 @@
+"""
+Prueba de carga: una cohorte de estudiantes usando la aplicación
+
+Cada estudiante virtual recorre una sesión real contra la aplicación Flask
+(create_app) en este mismo proceso: se registra o inicia sesión, abre el
+curso, consulta su progreso, lista las lecciones de una categoría, abre y
+completa varias lecciones y cierra sesión. El almacenamiento es un backend
+local (memoria o SQLite), así que se mide el coste de la propia aplicación
+sin red. Las contraseñas se guardan con un hash barato (--password-hash):
+con el scrypt por defecto de los backends locales, el registro y el login
+tardan cientos de ms y dominan los percentiles (en producción las verifica
+Firebase Authentication, no la aplicación).
+
+Al terminar imprime el rendimiento (peticiones y sesiones por segundo) y los
+percentiles p50/p95/p99 por endpoint, y guarda el resultado en JSON en
+loadtest_results/ para comparar ejecuciones entre commits (--compare).
+
+Uso:
+    python load_test.py [--students 50] [--concurrency 10] [--think-time 0.05]
+                        [--lessons 3] [--returning 0.5] [--backend memory|sqlite]
+                        [--password-hash pbkdf2:sha256:1]
+                        [--compare loadtest_results/anterior.json]
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+RESULTS_DIR = 'loadtest_results'
+
+# Los mismos CSV que importa import_lessons.py
+SOURCE_CSVS = [
+    os.path.join('data', 'python_python_básico.csv'),
+    os.path.join('data', 'python_python_intermedio.csv'),
+    os.path.join('data', 'python_python_avanzado.csv')
+]
+
+PASSWORD = 'Secreto123!'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga con una cohorte de estudiantes")
+    parser.add_argument('--students', type=int, default=50, help="Tamaño de la cohorte (sesiones)")
+    parser.add_argument('--concurrency', type=int, default=10, help="Estudiantes simultáneos")
+    parser.add_argument('--think-time', type=float, default=0.05,
+                        help="Pausa media entre acciones en segundos (exponencial)")
+    parser.add_argument('--lessons', type=int, default=3, help="Lecciones que completa cada estudiante")
+    parser.add_argument('--returning', type=float, default=0.5,
+                        help="Fracción de estudiantes ya registrados (inician sesión)")
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--password-hash', default='pbkdf2:sha256:1',
+                        help="Método de werkzeug para las contraseñas (scrypt para medir el coste real)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--compare', help="Resultado anterior (JSON) con el que comparar")
+    return parser.parse_args(argv)
+
+
+class Recorder:
+    """Latencias por endpoint (compartido entre los hilos de los estudiantes)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+    
+    def record(self, endpoint, status, seconds):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if status >= 400:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+class Student:
+    """Un estudiante virtual con su propio cliente (y su cookie de sesión)"""
+    
+    def __init__(self, app, number, registered, config, recorder):
+        self.client = app.test_client()
+        self.username = f"estudiante{number:05d}"
+        self.email = f"{self.username}@example.com"
+        self.registered = registered
+        self.config = config
+        self.recorder = recorder
+        self.random = random.Random(config.seed * 100003 + number)
+    
+    def request(self, endpoint, method, path, **kwargs):
+        """Hacer una petición como el navegador y medir su latencia"""
+        start = time.perf_counter()
+        response = self.client.open(path, method=method, headers={'Accept-Encoding': 'gzip'}, **kwargs)
+        self.recorder.record(endpoint, response.status_code, time.perf_counter() - start)
+        return response
+    
+    @staticmethod
+    def json(response):
+        """Cuerpo JSON de una respuesta (descomprimido si llegó con gzip)"""
+        data = response.get_data()
+        if response.headers.get('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        return json.loads(data) if data else {}
+    
+    def think(self):
+        if self.config.think_time > 0:
+            time.sleep(self.random.expovariate(1 / self.config.think_time))
+    
+    def run_session(self):
+        if self.registered:
+            self.request('POST /api/login', 'POST', '/api/login',
+                         json={'identifier': self.username, 'password': PASSWORD})
+        else:
+            self.request('POST /api/register', 'POST', '/api/register',
+                         json={'username': self.username, 'email': self.email, 'password': PASSWORD})
+        self.think()
+        
+        self.request('GET /course', 'GET', '/course')
+        self.request('GET /api/me', 'GET', '/api/me')
+        self.request('GET /api/progress', 'GET', '/api/progress')
+        self.think()
+        
+        category = self.random.choice(self.config.categories)
+        response = self.request('GET /api/lessons?category', 'GET', '/api/lessons',
+                                query_string={'category': category})
+        lessons = self.json(response).get('lessons', [])
+        self.think()
+        
+        for lesson in self.random.sample(lessons, min(self.config.lessons, len(lessons))):
+            self.request('GET /api/lessons/<id>', 'GET', f"/api/lessons/{lesson['id']}")
+            self.think()
+            self.request('POST /api/progress/complete/<id>', 'POST', f"/api/progress/complete/{lesson['id']}")
+        
+        self.request('POST /api/logout', 'POST', '/api/logout')
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por rango más cercano de una lista ordenada"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder, elapsed):
+    """
+    Resumen por endpoint
+    
+    Returns:
+        dict: {endpoint: {requests, errors, rps, p50_ms, p95_ms, p99_ms, max_ms}}
+    """
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        ordered = sorted(samples)
+        endpoints[endpoint] = {
+            'requests': len(ordered),
+            'errors': recorder.errors.get(endpoint, 0),
+            'rps': round(len(ordered) / elapsed, 2),
+            'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+            'max_ms': round(ordered[-1] * 1000, 2)
+        }
+    return endpoints
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+def run_load_test(config):
+    """
+    Preparar la aplicación, ejecutar la cohorte y devolver el resultado
+    
+    Returns:
+        dict: Configuración, totales y resumen por endpoint
+    """
+    # El backend se elige antes de importar la aplicación (config lee el entorno)
+    os.environ['STORAGE_BACKEND'] = config.backend
+    os.environ['LOCAL_PASSWORD_HASH_METHOD'] = config.password_hash
+    os.environ.setdefault('SQLITE_DATABASE_PATH', ':memory:')
+    
+    from app import create_app
+    from backend.firebase_service import firebase_service
+    from backend.lesson_reader import iter_lessons_csv
+    
+    lessons = [lesson for filepath in SOURCE_CSVS for lesson in iter_lessons_csv(filepath)]
+    firebase_service.sync_lessons(lessons)
+    config.categories = sorted({lesson['categoria'] for lesson in lessons})
+    
+    app = create_app()
+    rng = random.Random(config.seed)
+    returning = set(rng.sample(range(config.students), int(config.students * config.returning)))
+    for number in returning:
+        username = f"estudiante{number:05d}"
+        firebase_service.create_user(f"{username}@example.com", PASSWORD, username)
+    
+    recorder = Recorder()
+    students = [Student(app, number, number in returning, config, recorder) for number in range(config.students)]
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+        for future in [executor.submit(student.run_session) for student in students]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    
+    total_requests = sum(len(samples) for samples in recorder.samples.values())
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'config': {
+            'students': config.students,
+            'concurrency': config.concurrency,
+            'think_time': config.think_time,
+            'lessons': config.lessons,
+            'returning': config.returning,
+            'backend': config.backend,
+            'password_hash': config.password_hash,
+            'seed': config.seed
+        },
+        'elapsed_s': round(elapsed, 3),
+        'requests': total_requests,
+        'errors': sum(recorder.errors.values()),
+        'rps': round(total_requests / elapsed, 2),
+        'sessions_per_s': round(config.students / elapsed, 2),
+        'endpoints': summarize(recorder, elapsed)
+    }
+
+
+def print_report(result, previous=None):
+    """Imprimir la tabla por endpoint (con la diferencia de p95 respecto a previous)"""
+    print("\n" + "="*88)
+    print(f"🏋️  PRUEBA DE CARGA ({result['config']['students']} estudiantes, "
+          f"{result['config']['concurrency']} simultáneos, backend {result['config']['backend']}, "
+          f"hash {result['config'].get('password_hash', 'scrypt')}, commit {result['commit']})")
+    print("="*88)
+    print(f"{'Endpoint':<34} {'Peticiones':>10} {'Errores':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'Δ p95':>8}")
+    print("-" * 88)
+    
+    for endpoint, stats in result['endpoints'].items():
+        delta = ''
+        before = (previous or {}).get('endpoints', {}).get(endpoint)
+        if before and before['p95_ms']:
+            delta = f"{(stats['p95_ms'] / before['p95_ms'] - 1):+.0%}"
+        print(f"{endpoint:<34} {stats['requests']:>10} {stats['errors']:>8} {stats['p50_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {delta:>8}")
+    
+    print("-" * 88)
+    print(f"Total: {result['requests']} peticiones en {result['elapsed_s']:.2f} s  "
+          f"→ {result['rps']:.1f} peticiones/s, {result['sessions_per_s']:.2f} sesiones/s, "
+          f"{result['errors']} errores")
+    if previous:
+        print(f"Anterior ({previous['commit']}): {previous['rps']:.1f} peticiones/s, "
+              f"{previous['sessions_per_s']:.2f} sesiones/s")
+    print("="*88 + "\n")
+
+
+def save_result(result, directory=RESULTS_DIR):
+    """Guardar el resultado como <fecha>-<commit>.json y devolver la ruta"""
+    os.makedirs(directory, exist_ok=True)
+    stamp = result['timestamp'].replace(':', '').replace('-', '').replace('T', '-')
+    path = os.path.join(directory, f"{stamp}-{result['commit']}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return path
+
+
+if __name__ == "__main__":
+    config = parse_args()
+    
+    previous = None
+    if config.compare:
+        with open(config.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+    
+    result = run_load_test(config)
+    print_report(result, previous)
+    print(f"💾 Resultado guardado en {save_result(result)}")
+    sys.exit(1 if result['errors'] else 0)
@@ -0,0 +1,34 @@
+"""
+Script para migrar el progreso de los usuarios al formato actual
+y completar el índice de nombres de usuario
+"""
+from backend.firebase_service import firebase_service
+
+
+def migrate_progress():
+    """
+    Migrar el progreso de todos los usuarios (se puede ejecutar varias veces)
+    """
+    print("\n" + "="*60)
+    print("🔧 MIGRACIÓN DEL PROGRESO DE USUARIOS")
+    print("="*60 + "\n")
+    
+    success, message, migrated = firebase_service.migrate_progress()
+    
+    if success:
+        print(f"✅ {message}: {migrated} usuarios")
+    else:
+        print(f"❌ {message}")
+    
+    success, message, indexed = firebase_service.migrate_username_index()
+    
+    if success:
+        print(f"✅ {message}: {indexed} usuarios")
+    else:
+        print(f"❌ {message}")
+    
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    migrate_progress()
@@ -0,0 +1,28 @@
+"""
+Coste en Firestore de cada endpoint de la API (ver check_read_budget.py)
+
+Falla si algún endpoint lee, escribe o llama a Firebase más (o menos) de lo
+declarado en check_read_budget.BUDGETS, o si algún backend suma dos veces
+los puntos de una lección repetida.
+"""
+import os
+import check_read_budget
+from backend import routes
+
+
+def test_endpoints_match_read_budget():
+    failures = check_read_budget.run_checks()
+    assert not failures, '\n'.join(f"{name}: {'; '.join(problems)}" for name, problems in failures)
+
+
+def test_run_checks_restores_global_state():
+    environ = dict(os.environ)
+    service = routes.firebase_service
+    client = check_read_budget.firebase_service._db
+    
+    check_read_budget.run_checks()
+    
+    assert dict(os.environ) == environ
+    assert routes.firebase_service is service
+    assert check_read_budget.firebase_service._db is client
+    assert check_read_budget.firebase_service.lesson_cache.get(('version',)) == (False, None)